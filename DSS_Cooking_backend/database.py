@@ -0,0 +1,85 @@
+# Cấu hình CSDL dựng từ biến môi trường:
+# - DATABASE_URL: CSDL chính (PostgreSQL). Bắt buộc khi DEBUG tắt; chỉ khi phát triển (DEBUG=true),
+#   chạy test hoặc đặt SQLITE_PATH (đo hiệu năng) mới dùng SQLite cục bộ thay thế.
+# - DATABASE_REPLICA_URLS: danh sách URL bản sao chỉ đọc, cách nhau bởi dấu phẩy.
+# - DB_CONN_MAX_AGE: giữ kết nối bao nhiêu giây giữa các request (mặc định 60, 0 = mở mới mỗi request).
+# - DB_POOL=true: dùng connection pool có sẵn của Django 5.x (cần psycopg 3 và psycopg-pool),
+#   kích thước qua DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT.
+
+import importlib.util
+import os
+import warnings
+
+import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
+
+
+def _env_int(env, name, default):
+    return int(env.get(name, default))
+
+
+def pool_available():
+    # Pool của Django chỉ có với driver psycopg 3, requirements.txt hiện dùng psycopg2
+    return importlib.util.find_spec('psycopg') is not None and importlib.util.find_spec('psycopg_pool') is not None
+
+
+def database_config(url, env):
+    config = dj_database_url.parse(
+        url,
+        conn_max_age=_env_int(env, 'DB_CONN_MAX_AGE', 60),
+        # Kiểm tra kết nối cũ trước khi dùng lại, tránh lỗi khi Postgres/PgBouncer đã đóng nó
+        conn_health_checks=True,
+    )
+    if config['ENGINE'] != 'django.db.backends.postgresql':
+        return config
+
+    if env.get('DB_POOL', 'False').lower() == 'true':
+        if pool_available():
+            config.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': _env_int(env, 'DB_POOL_MIN_SIZE', 2),
+                'max_size': _env_int(env, 'DB_POOL_MAX_SIZE', 10),
+                'timeout': _env_int(env, 'DB_POOL_TIMEOUT', 10),
+            }
+            # Django không cho dùng đồng thời pool và kết nối bền vững
+            config['CONN_MAX_AGE'] = 0
+            config['CONN_HEALTH_CHECKS'] = False
+        else:
+            warnings.warn('DB_POOL=true nhưng chưa cài psycopg[pool]; dùng kết nối bền vững (CONN_MAX_AGE) thay thế.')
+    return config
+
+
+def build_databases(base_dir, env=None, allow_sqlite=True):
+    env = os.environ if env is None else env
+    url = env.get('DATABASE_URL')
+    if url:
+        databases = {'default': database_config(url, env)}
+    else:
+        # Quên DATABASE_URL trên server thì dừng ngay, không âm thầm chạy trên một file SQLite rỗng
+        if not allow_sqlite and not env.get('SQLITE_PATH'):
+            raise ImproperlyConfigured(
+                'Chưa đặt DATABASE_URL. SQLite cục bộ chỉ dùng khi DEBUG=true, khi chạy test hoặc khi đặt SQLITE_PATH.'
+            )
+        databases = {
+            'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': env.get('SQLITE_PATH') or str(base_dir / 'db.sqlite3'),
+            }
+        }
+
+    # Bản sao cũng có thể là file SQLite (sqlite:////duong/dan.sqlite3) để thử router ở máy cục bộ
+    replica_urls = [value.strip() for value in env.get('DATABASE_REPLICA_URLS', '').split(',') if value.strip()]
+    for index, replica_url in enumerate(replica_urls, start=1):
+        replica = database_config(replica_url, env)
+        # Khi chạy test, bản sao trỏ về CSDL chính thay vì tạo CSDL test riêng
+        replica['TEST'] = {'MIRROR': 'default'}
+        databases[f'replica_{index}'] = replica
+    return databases
+
+
+def replica_aliases(databases):
+    return [alias for alias in databases if alias.startswith('replica_')]
+
+
+def uses_sqlite_fallback(databases):
+    return databases['default']['ENGINE'] == 'django.db.backends.sqlite3'
+
@@ -12,13 +12,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-import dj_database_url
+import sys
 from dotenv import load_dotenv
-from urllib.parse import urlparse, parse_qsl
 
-load_dotenv()
+from .database import build_databases, replica_aliases, uses_sqlite_fallback
 
-tmpPostgres = urlparse(os.getenv("DATABASE_URL"))
+load_dotenv()
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -61,17 +60,90 @@ REST_FRAMEWORK = {
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    # Phân trang keyset cho mọi endpoint danh sách (xem api/pagination.py)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    # JSON mã hóa / giải mã bằng orjson khi có cài, nếu không dùng json chuẩn (api/fast_json.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.fast_json.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+FAST_JSON_ENABLED = os.environ.get('FAST_JSON_ENABLED', 'True').lower() == 'true'
+
+# Giới hạn cứng cho ?page_size= trên mọi endpoint
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', '200'))
+
+# Chỉ mục đề xuất trong bộ nhớ (api/suggestion_engine.py) được dựng lại toàn bộ
+# sau số giây này, để thay đổi từ worker khác cũng được cập nhật.
+SUGGESTION_INDEX_TTL = int(os.environ.get('SUGGESTION_INDEX_TTL', '300'))
+
+# Đề xuất tính sẵn bởi tiến trình nền `python manage.py suggestion_worker` (api/suggestion_worker.py):
+# tính lại khi đã yên SUGGESTION_PRECOMPUTE_DEBOUNCE giây sau thay đổi cuối (muộn nhất
+# SUGGESTION_PRECOMPUTE_MAX_DELAY giây), lưu SUGGESTION_PRECOMPUTE_TOP món đầu. Khi catalog đã đổi
+# quá SUGGESTION_PRECOMPUTE_MAX_STALENESS giây mà chưa tính lại, SuggestionView tự tính đồng bộ.
+SUGGESTION_PRECOMPUTE_DEBOUNCE = float(os.environ.get('SUGGESTION_PRECOMPUTE_DEBOUNCE', '2'))
+SUGGESTION_PRECOMPUTE_MAX_DELAY = float(os.environ.get('SUGGESTION_PRECOMPUTE_MAX_DELAY', '30'))
+SUGGESTION_PRECOMPUTE_MAX_STALENESS = int(os.environ.get('SUGGESTION_PRECOMPUTE_MAX_STALENESS', '60'))
+SUGGESTION_PRECOMPUTE_TOP = int(os.environ.get('SUGGESTION_PRECOMPUTE_TOP', '200'))
+
+# Chỉ mục gợi ý tên nguyên liệu (api/autocomplete.py) dựng lại toàn bộ sau số giây này,
+# cũng là độ trễ tối đa của thứ hạng theo độ phổ biến.
+AUTOCOMPLETE_INDEX_TTL = int(os.environ.get('AUTOCOMPLETE_INDEX_TTL', '300'))
+
+# Số kết quả đề xuất tối đa được nhớ theo người dùng (LRU, api/suggestion_cache.py)
+SUGGESTION_CACHE_SIZE = int(os.environ.get('SUGGESTION_CACHE_SIZE', '1024'))
+
+# Cache phản hồi GET công khai (api/cache.py).
+# Mặc định LocMemCache: LRU trong từng tiến trình, mỗi worker tự làm mới khi chính nó ghi dữ liệu,
+# worker khác chậm nhất API_CACHE_TIMEOUT giây. Đặt CACHE_URL=redis://... (cần cài gói redis)
+# hoặc memcached://host:port (cần pymemcache) để dùng cache chung giữa các worker.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('memcached://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache', 'LOCATION': CACHE_URL[len('memcached://'):]}}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dss-cooking',
+            'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', '5000'))},
+        }
+    }
+API_CACHE_TIMEOUT = int(os.environ.get('API_CACHE_TIMEOUT', '300'))
+
+# Đồng bộ tăng dần /api/sync/ (api/sync.py): chỉ trả các thay đổi đã ghi quá SYNC_SETTLE_SECONDS giây,
+# tối đa SYNC_PAGE_SIZE dòng nhật ký mỗi lần; lệnh prune_change_log xóa nhật ký cũ hơn SYNC_RETENTION_DAYS ngày.
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', '2'))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '1000'))
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', '30'))
+
+# Đo thời gian/số câu SQL theo request (api/metrics.py). Số liệu đọc ở /api/stats/requests/
+# và /api/metrics/ (Prometheus) bởi quản trị viên hoặc với header X-Metrics-Token.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', '5'))
+
+# Nén gzip/brotli phản hồi từ số byte này trở lên (api/compression.py; brotli cần gói brotli)
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', '1024'))
 
 MIDDLEWARE = [
+    'api.metrics.RequestMetricsMiddleware',
+    'api.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.static_files.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.replicas.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -118,17 +190,31 @@ WSGI_APPLICATION = 'DSS_Cooking_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': tmpPostgres.path.replace('/', ''),
-        'USER': tmpPostgres.username,
-        'PASSWORD': tmpPostgres.password,
-        'HOST': tmpPostgres.hostname,
-        'PORT': 5432,
-        'OPTIONS': dict(parse_qsl(tmpPostgres.query)),
-    }
-}
+# Dựng từ DATABASE_URL, kết nối bền vững + kiểm tra sức khỏe, pool và bản sao tùy chọn
+# (xem DSS_Cooking_backend/database.py). Thiếu DATABASE_URL khi DEBUG tắt là lỗi cấu hình,
+# trừ khi đang chạy test.
+RUNNING_TESTS = sys.argv[1:2] == ['test']
+DATABASES = build_databases(BASE_DIR, allow_sqlite=DEBUG or RUNNING_TESTS)
+
+# Request chỉ đọc vào /api/ dùng bản sao (nếu có), người vừa ghi thì đọc từ CSDL chính
+# trong REPLICA_STICKY_SECONDS giây; bản sao lỗi hoặc trễ quá REPLICA_MAX_LAG giây bị bỏ qua
+# (xem api/replicas.py). Dùng bản sao thì phải có CACHE_URL (Redis/Memcached) để dấu "vừa ghi"
+# có hiệu lực trên mọi worker.
+if replica_aliases(DATABASES):
+    DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+REPLICA_MAX_LAG = int(os.environ.get('REPLICA_MAX_LAG', '30'))
+REPLICA_HEALTH_INTERVAL = int(os.environ.get('REPLICA_HEALTH_INTERVAL', '5'))
+
+# Không có DATABASE_URL: dùng SQLite cục bộ. Các bảng của app api vốn tạo từ database.sql,
+# nên ở chế độ này Django tự tạo chúng từ model: python manage.py migrate --run-syncdb
+API_LOCAL_SCHEMA = uses_sqlite_fallback(DATABASES)
+if API_LOCAL_SCHEMA:
+    MIGRATION_MODULES = {'api': None}
+
+
+# Các bảng của app api không do Django quản lý, xem api/test_runner.py
+TEST_RUNNER = 'api.test_runner.UnmanagedModelTestRunner'
 
 
 # Password validation
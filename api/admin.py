@@ -1,13 +1,24 @@
 # api/admin.py
 from django.contrib import admin
+from django.utils import timezone
 from .models import (
     Recipes, Ingredients, PantryItems, 
-    RecipeIngredients, ShoppingListItems, FavoriteRecipes
+    RecipeIngredients, ShoppingListItems, FavoriteRecipes, CatalogImports
 )
+from .signals import recipes_changed, ingredients_changed, batched_changes
+
+
+class BatchedDeleteMixin:
+    # Xóa nhiều dòng cùng lúc: gom việc làm mới recipe_profiles / chỉ mục đề xuất
+    # thành một lần cho cả lựa chọn thay vì một lần cho mỗi dòng
+    def delete_queryset(self, request, queryset):
+        with batched_changes():
+            super().delete_queryset(request, queryset)
+
 
 # --- TÙY CHỈNH CHO TRANG QUẢN LÝ CÔNG THỨC ---
 @admin.register(Recipes)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(BatchedDeleteMixin, admin.ModelAdmin):
     # Hiển thị các cột này trong danh sách
     list_display = ('title', 'author', 'status', 'created_at')
     # Thêm bộ lọc bên cạnh
@@ -20,20 +31,26 @@ class RecipeAdmin(admin.ModelAdmin):
     # Hàm hành động để duyệt
     def make_public(self, request, queryset):
         # queryset chứa tất cả các đối tượng đã được chọn
-        updated_count = queryset.update(status='public')
+        recipe_ids = list(queryset.values_list('id', flat=True))
+        # queryset.update() bỏ qua auto_now và không phát post_save: tự đặt updated_at (để
+        # ?updated_since của API xuất dữ liệu thấy thay đổi) và tự báo thay đổi
+        updated_count = queryset.update(status='public', updated_at=timezone.now())
+        recipes_changed.send(sender=Recipes, recipe_ids=recipe_ids)
         self.message_user(request, f"{updated_count} công thức đã được duyệt và công khai.")
     make_public.short_description = "Duyệt và Công khai các Công thức đã chọn"
 
     # Hàm hành động để từ chối
     def make_rejected(self, request, queryset):
-        updated_count = queryset.update(status='rejected')
+        recipe_ids = list(queryset.values_list('id', flat=True))
+        updated_count = queryset.update(status='rejected', updated_at=timezone.now())
+        recipes_changed.send(sender=Recipes, recipe_ids=recipe_ids)
         self.message_user(request, f"{updated_count} công thức đã bị từ chối.")
     make_rejected.short_description = "Từ chối các Công thức đã chọn"
 
 
 # --- TÙY CHỈNH CHO TRANG QUẢN LÝ NGUYÊN LIỆU ---
 @admin.register(Ingredients)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(BatchedDeleteMixin, admin.ModelAdmin):
     list_display = ('name', 'submitted_by', 'status', 'created_at')
     list_filter = ('status',)
     search_fields = ('name', 'submitted_by__username')
@@ -41,14 +58,29 @@ class IngredientAdmin(admin.ModelAdmin):
 
     # Hàm hành động để duyệt
     def make_approved(self, request, queryset):
-        updated_count = queryset.update(status='approved')
+        ingredient_ids = list(queryset.values_list('id', flat=True))
+        updated_count = queryset.update(status='approved', updated_at=timezone.now())
+        ingredients_changed.send(sender=Ingredients, ingredient_ids=ingredient_ids)
         self.message_user(request, f"{updated_count} nguyên liệu đã được duyệt.")
     make_approved.short_description = "Duyệt các Nguyên liệu đã chọn"
 
     # Hàm hành động để từ chối
     def make_rejected(self, request, queryset):
-        updated_count = queryset.update(status='rejected')
+        ingredient_ids = list(queryset.values_list('id', flat=True))
+        updated_count = queryset.update(status='rejected', updated_at=timezone.now())
+        ingredients_changed.send(sender=Ingredients, ingredient_ids=ingredient_ids)
         self.message_user(request, f"{updated_count} nguyên liệu đã bị từ chối.")
     make_rejected.short_description = "Từ chối các Nguyên liệu đã chọn"
 
-admin.site.register(RecipeIngredients)
\ No newline at end of file
+admin.site.register(RecipeIngredients)
+
+# --- THEO DÕI CÁC LẦN NHẬP CATALOG (chỉ xem) ---
+@admin.register(CatalogImports)
+class CatalogImportAdmin(admin.ModelAdmin):
+    list_display = ('source_name', 'format', 'status', 'records_done', 'recipes_created', 'ingredients_created', 'rows_skipped', 'updated_at')
+    list_filter = ('status', 'format')
+    readonly_fields = [field.name for field in CatalogImports._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
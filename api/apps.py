@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Đăng ký các receiver tín hiệu
+        from . import signals  # noqa: F401
+
+        # Đếm câu SQL cho số liệu request trên mọi kết nối, kể cả kết nối mở trong
+        # luồng của view async (xem api/metrics.py)
+        from django.db.backends.signals import connection_created
+        from .metrics import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='api.metrics.install_query_recorder')
+
+        # CSDL SQLite cục bộ (không có DATABASE_URL): để Django tự tạo các bảng vốn
+        # được tạo từ database.sql (xem DSS_Cooking_backend/settings.py)
+        from django.conf import settings
+        if getattr(settings, 'API_LOCAL_SCHEMA', False):
+            for model in self.get_models():
+                model._meta.managed = True
@@ -0,0 +1,153 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .fast_json import FastJSONRenderer
+from .models import Recipes
+from .suggestion_worker import load_precomputed
+from .views import (
+    RecipeListCreateView, RecipeDetailUpdateDestroyView, SuggestionView,
+    pantry_ingredient_ids_query, favorite_author_ids_query, parse_excluded_ingredient_ids, rank_suggestions,
+    suggestible_recipes,
+)
+
+# Phiên bản async (chỉ GET) của các endpoint đọc nhiều nhất, chạy dưới ASGI
+# (DSS_Cooking_backend/asgi.py). DRF chưa hỗ trợ view async nên đây là view async của Django,
+# nhưng dùng lại queryset, bộ lọc, phân trang và serializer của view DRF tương ứng để
+# phản hồi giống hệt bản đồng bộ. Trong lúc chờ CSDL, worker ASGI phục vụ request khác
+# thay vì giữ một luồng cho mỗi request.
+
+
+# --- TIỆN ÍCH ---
+def _json_response(data, status=200, headers=None):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status, headers=headers)
+
+
+def _error_response(exc, request=None):
+    # Cùng dạng phản hồi lỗi với rest_framework.views.exception_handler
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    headers = None
+    if isinstance(exc, (AuthenticationFailed, NotAuthenticated)) and request is not None:
+        headers = {'WWW-Authenticate': JWTAuthentication().authenticate_header(request)}
+    return _json_response(data, status=exc.status_code, headers=headers)
+
+
+async def authenticate(request):
+    # Xác thực JWT như JWTAuthentication: kiểm tra chữ ký không cần CSDL, chỉ nạp user bằng ORM async
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    if header is None:
+        return AnonymousUser()
+    raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        return AnonymousUser()
+    validated_token = authentication.get_validated_token(raw_token)
+    try:
+        user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+def _drf_view(view_class, request, user, **kwargs):
+    # Dựng view DRF (không chạy dispatch) để dùng lại get_queryset / filter_queryset / serializer
+    drf_request = Request(request)
+    drf_request.user = user
+    view = view_class()
+    view.setup(drf_request, **kwargs)
+    view.format_kwarg = None
+    return view
+
+
+class AsyncAPIView(View):
+    # Chuyển lỗi DRF (xác thực, cursor sai, bộ lọc sai) thành phản hồi JSON như view DRF
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            user = await authenticate(request)
+            return await self.aget(request, user, *args, **kwargs)
+        except APIException as exc:
+            return _error_response(exc, request)
+
+
+# --- CÔNG THỨC ---
+class AsyncRecipeListView(AsyncAPIView):
+    # GET /api/async/recipes/: như RecipeListCreateView (lọc, tìm kiếm, sắp xếp, phân trang keyset)
+    async def aget(self, request, user):
+        view = _drf_view(RecipeListCreateView, request, user)
+        # django-filter kiểm tra ?author= bằng một truy vấn nên dựng queryset trong luồng đồng bộ
+        queryset = await sync_to_async(view.filter_queryset)(view.get_queryset())
+        paginator = view.paginator
+        page = await paginator.apaginate_queryset(queryset, view.request, view)
+        serializer = view.get_serializer(page, many=True)
+        return _json_response(paginator.get_paginated_data(serializer.data))
+
+
+class AsyncRecipeDetailView(AsyncAPIView):
+    # GET /api/async/recipes/<pk>/: như RecipeDetailUpdateDestroyView
+    async def aget(self, request, user, pk):
+        view = _drf_view(RecipeDetailUpdateDestroyView, request, user, pk=pk)
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            recipe = await queryset.aget(pk=pk)
+        except Recipes.DoesNotExist:
+            raise NotFound('No Recipes matches the given query.')
+        return _json_response(view.get_serializer(recipe).data)
+
+
+# --- CÔNG CỤ ĐỀ XUẤT ---
+async def _values(queryset):
+    return [value async for value in queryset.aiterator()]
+
+
+class AsyncSuggestionView(AsyncAPIView):
+    # GET /api/async/suggestions/: như SuggestionView
+    async def aget(self, request, user):
+        if not user.is_authenticated:
+            raise NotAuthenticated()
+        view = _drf_view(SuggestionView, request, user)
+        mode = view.request.query_params.get('mode', 'strict')
+        # Như SuggestionView: dùng kết quả tính sẵn nếu còn dùng được và không có danh sách đen
+        excluded_ingredient_ids = parse_excluded_ingredient_ids(view.request.query_params)
+        precomputed = None
+        if not excluded_ingredient_ids:
+            precomputed = await sync_to_async(load_precomputed)(user.id, mode)
+
+        paginator = view.paginator
+        if precomputed is not None:
+            ranked, truncated = precomputed
+            page = paginator.paginate_queryset(ranked, view.request, view)
+            if truncated and not paginator.has_next:
+                precomputed = None
+        if precomputed is None:
+            # Tủ lạnh và tác giả yêu thích là hai truy vấn độc lập
+            pantry_ingredient_ids, favorite_author_ids = await asyncio.gather(
+                _values(pantry_ingredient_ids_query(user)),
+                _values(favorite_author_ids_query(user)),
+            )
+            # Chấm điểm tốn CPU và có thể dựng lại chỉ mục từ CSDL, nên chạy ngoài event loop
+            ranked = await sync_to_async(rank_suggestions)(user.id, mode, pantry_ingredient_ids, favorite_author_ids, excluded_ingredient_ids)
+            page = paginator.paginate_queryset(ranked, view.request, view)
+        scores = dict(page)
+        recipes = {recipe.id: recipe async for recipe in suggestible_recipes(user).filter(id__in=list(scores)).only(*view.get_compact_columns()).aiterator()}
+        results = []
+        for recipe_id, score in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.score = score
+                results.append(recipe)
+        serializer = view.get_serializer(results, many=True)
+        return _json_response(paginator.get_paginated_data(serializer.data))
@@ -0,0 +1,197 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import Ingredients, RecipeIngredients
+from .text import fold_text
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Truy vấn ngắn hơn độ dài này không sửa lỗi gõ (quá nhiều kết quả gần đúng vô nghĩa)
+TYPO_MIN_LENGTH = 3
+# Kết quả của các tiền tố ngắn (khớp rất nhiều tên) được nhớ lại cho tới lần dữ liệu đổi
+SHORT_PREFIX_LENGTH = 2
+# Mọi ký tự lớn hơn ký tự có thể có trong khóa đã bỏ dấu, dùng làm cận trên khi tìm tiền tố
+_PREFIX_END = '\uffff'
+
+
+def _keys(name):
+    # Mỗi tên có một khóa cho mỗi vị trí bắt đầu từ, để "bo" tìm được cả "Thịt bò xay".
+    # Ví dụ: "Thịt bò xay" -> "thit bo xay", "bo xay", "xay"
+    words = fold_text(name).split()
+    return [' '.join(words[start:]) for start in range(len(words))]
+
+
+class IngredientAutocomplete:
+    # Chỉ mục gợi ý tên nguyên liệu đã duyệt, giữ trong bộ nhớ tiến trình.
+    # Các khóa đã bỏ dấu được giữ trong một mảng sắp xếp (song song với mảng id), nên tìm
+    # theo tiền tố chỉ là hai lần chia đôi. Kết quả xếp theo độ phổ biến (số công thức dùng
+    # nguyên liệu, đếm từ recipe_ingredients), rồi tên ngắn trước.
+    # Khi khớp tiền tố không đủ kết quả, thử thêm các biến thể sai một ký tự của truy vấn
+    # (thiếu, thừa, sai, đảo hai ký tự liền nhau) — mỗi biến thể cũng là một lần tìm tiền tố.
+    # Nguyên liệu được cập nhật từng phần qua tín hiệu (xem api/signals.py); toàn bộ chỉ mục,
+    # kể cả độ phổ biến, được dựng lại sau AUTOCOMPLETE_INDEX_TTL giây.
+
+    def __init__(self, ttl=None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._built_at = None
+        self._keys = []
+        self._ids = []
+        self._names = {}
+        self._popularity = {}
+        self._short_results = {}
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 300)
+
+    # --- DỰNG CHỈ MỤC ---
+    def rebuild(self):
+        names = dict(Ingredients.objects.filter(status=Ingredients.Status.APPROVED).values_list('id', 'name'))
+        popularity = dict(
+            RecipeIngredients.objects.filter(ingredient_id__isnull=False)
+            .values_list('ingredient_id')
+            .annotate(usage=Count('id'))
+            .values_list('ingredient_id', 'usage')
+        )
+        entries = sorted((key, ingredient_id) for ingredient_id, name in names.items() for key in _keys(name))
+
+        with self._lock:
+            self._names = names
+            self._popularity = popularity
+            self._keys = [key for key, _ in entries]
+            self._ids = [ingredient_id for _, ingredient_id in entries]
+            self._short_results = {}
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self.rebuild()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _put(self, ingredient_id, name):
+        self._names[ingredient_id] = name
+        for key in _keys(name):
+            position = bisect_left(self._keys, key)
+            self._keys.insert(position, key)
+            self._ids.insert(position, ingredient_id)
+
+    def _drop(self, ingredient_id):
+        name = self._names.pop(ingredient_id, None)
+        if name is None:
+            return
+        for key in _keys(name):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == ingredient_id:
+                    del self._keys[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    # --- CẬP NHẬT TỪNG PHẦN (gọi từ tín hiệu, ví dụ IngredientAdmin.make_approved) ---
+    def refresh_ingredients(self, ingredient_ids):
+        ingredient_ids = set(ingredient_ids)
+        if not ingredient_ids or self._built_at is None:
+            return
+        names = dict(Ingredients.objects.filter(id__in=ingredient_ids, status=Ingredients.Status.APPROVED).values_list('id', 'name'))
+        popularity = dict(
+            RecipeIngredients.objects.filter(ingredient_id__in=list(names))
+            .values_list('ingredient_id')
+            .annotate(usage=Count('id'))
+            .values_list('ingredient_id', 'usage')
+        ) if names else {}
+
+        with self._lock:
+            for ingredient_id in ingredient_ids:
+                # Đổi tên, bị từ chối hay bị xóa đều gỡ khóa cũ trước
+                self._drop(ingredient_id)
+                self._popularity.pop(ingredient_id, None)
+                if ingredient_id in names:
+                    self._put(ingredient_id, names[ingredient_id])
+                    self._popularity[ingredient_id] = popularity.get(ingredient_id, 0)
+            self._short_results = {}
+
+    # --- TRA CỨU ---
+    def _prefix_ids(self, prefix):
+        start = bisect_left(self._keys, prefix)
+        end = bisect_left(self._keys, prefix + _PREFIX_END, start)
+        return self._ids[start:end]
+
+    def _rank_key(self, ingredient_id):
+        name = self._names[ingredient_id]
+        return (-self._popularity.get(ingredient_id, 0), len(name), name, ingredient_id)
+
+    def _top(self, ingredient_ids, limit, exclude=()):
+        return heapq.nsmallest(limit, set(ingredient_ids).difference(exclude), key=self._rank_key)
+
+    def _next_chars(self, position, start, end):
+        # Các ký tự khác nhau ở vị trí `position` của những khóa trong [start, end) (cùng tiền tố),
+        # lấy bằng cách nhảy qua từng nhóm ký tự thay vì duyệt hết
+        while start < end:
+            key = self._keys[start]
+            if len(key) <= position:
+                start += 1
+                continue
+            yield key[position]
+            start = bisect_left(self._keys, key[:position + 1] + _PREFIX_END, start, end)
+
+    def _typo_ids(self, query):
+        # Nguyên liệu khớp tiền tố với một chuỗi cách query đúng một thao tác sửa (thiếu, thừa,
+        # sai, đảo hai ký tự liền nhau). Chỉ thử ký tự thật sự có trong chỉ mục ở vị trí sửa,
+        # và dừng ngay khi phần đầu không sửa của query không còn khớp khóa nào.
+        ingredient_ids = []
+        for position in range(len(query) + 1):
+            head, tail = query[:position], query[position:]
+            start = bisect_left(self._keys, head)
+            end = bisect_left(self._keys, head + _PREFIX_END, start)
+            if start == end:
+                break
+            variants = set()
+            if tail:
+                variants.add(head + tail[1:])
+                if len(tail) > 1:
+                    variants.add(head + tail[1] + tail[0] + tail[2:])
+            for char in self._next_chars(position, start, end):
+                variants.add(head + char + tail)
+                if tail:
+                    variants.add(head + char + tail[1:])
+            variants.discard(query)
+            for variant in variants:
+                ingredient_ids.extend(self._prefix_ids(variant))
+        return ingredient_ids
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        # Trả về danh sách (id, tên) tối đa `limit` nguyên liệu
+        query = fold_text(query)
+        if not query:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        self._ensure_fresh()
+
+        with self._lock:
+            short = len(query) <= SHORT_PREFIX_LENGTH
+            if short and (query, limit) in self._short_results:
+                return self._short_results[(query, limit)]
+
+            results = self._top(self._prefix_ids(query), limit)
+            if len(results) < limit and len(query) >= TYPO_MIN_LENGTH:
+                results += self._top(self._typo_ids(query), limit - len(results), exclude=results)
+
+            results = [(ingredient_id, self._names[ingredient_id]) for ingredient_id in results]
+            if short:
+                self._short_results[(query, limit)] = results
+            return results
+
+
+ingredient_autocomplete = IngredientAutocomplete()
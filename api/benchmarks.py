@@ -0,0 +1,666 @@
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections, transaction
+from django.db.models import Count
+from django.db.backends.signals import connection_created
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .compact import compact_serializer
+from .compression import available_encodings, compress
+from .fast_json import FastJSONRenderer, fast_json_available
+from .mixins import RECIPE_INGREDIENTS_PREFETCH
+from .models import Recipes, Ingredients, PantryItems, ShoppingListItems
+from .serializers import RecipeSerializer, MyRecipeSerializer, RecipeDetailSerializer
+
+
+# --- DỮ LIỆU MẪU CHO CÁC ROUTE ---
+class BenchmarkContext:
+    # Các đối tượng mẫu để điền tham số đường dẫn và thân request
+
+    def __init__(self, user, password=None):
+        self.user = user
+        self.password = password
+        self.public_recipe = Recipes.objects.filter(status=Recipes.Status.PUBLIC).order_by('id').first()
+        self.private_recipe = Recipes.objects.filter(author=user, status=Recipes.Status.PRIVATE).order_by('id').first()
+        self.pantry_item = PantryItems.objects.filter(user=user).order_by('id').first()
+        self.shopping_item = ShoppingListItems.objects.filter(user=user).order_by('id').first()
+        self.ingredient_ids = list(Ingredients.objects.filter(status=Ingredients.Status.APPROVED).order_by('id').values_list('id', flat=True)[:20])
+        self.ingredient_names = list(Ingredients.objects.order_by('id').values_list('name', flat=True)[:50])
+        self.search_term = self.public_recipe.title.split()[0] if self.public_recipe else 'ga'
+        self.planned_recipe_ids = list(Recipes.objects.filter(status=Recipes.Status.PUBLIC).order_by('id').values_list('id', flat=True)[:10]) or None
+
+
+class BenchmarkCase:
+    # Một phép đo: route (tên trong api/urls.py), phương thức, cách dựng URL và thân request.
+    # write=True: mỗi lần chạy nằm trong transaction bị rollback để dữ liệu không đổi.
+    # anonymous=True: gọi không đăng nhập (đo cả cache phản hồi công khai).
+    # token=True: đăng nhập bằng header JWT thật (view async không đi qua xác thực của DRF).
+    # gzip=True: gửi Accept-Encoding: gzip. format='multipart': gửi thân request dạng form có file.
+
+    def __init__(self, name, route, method='get', kwargs=None, params=None, data=None, write=False, anonymous=False, admin=False, token=False, gzip=False, format='json', requires=()):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.kwargs = kwargs
+        self.params = params
+        self.data = data
+        self.write = write
+        self.anonymous = anonymous
+        self.admin = admin
+        self.token = token
+        self.gzip = gzip
+        self.format = format
+        self.requires = requires
+
+    def missing(self, context):
+        missing = [name for name in self.requires if getattr(context, name) is None]
+        if self.admin and not context.user.is_staff:
+            missing.append('is_staff')
+        return missing
+
+    def build(self, context):
+        url = reverse(self.route, kwargs=self.kwargs(context) if self.kwargs else None)
+        params = self.params(context) if callable(self.params) else self.params
+        data = self.data(context) if callable(self.data) else self.data
+        return url, params, data
+
+
+def _catalog_ndjson(count, ingredient_names):
+    # File nhập mẫu: mỗi công thức 6 nguyên liệu, một phần đã có trong catalog, một phần mới
+    lines = []
+    for index in range(count):
+        names = [ingredient_names[(index + offset) % len(ingredient_names)] for offset in range(4)] if ingredient_names else []
+        names += [f'Nguyên liệu nhập {index % 20}', f'Nguyên liệu nhập {(index + 7) % 20}']
+        lines.append(json.dumps({
+            'title': f'Món nhập {index}', 'instructions': 'Nấu', 'difficulty': 'easy', 'cooking_time_minutes': 20,
+            'ingredients': [{'name': name, 'quantity': '1'} for name in names],
+        }, ensure_ascii=False))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+BENCHMARK_CASES = [
+    BenchmarkCase('recipes.list', 'recipe-list-create'),
+    BenchmarkCase('recipes.list.anonymous', 'recipe-list-create', anonymous=True),
+    BenchmarkCase('recipes.search', 'recipe-list-create', params=lambda c: {'search': c.search_term}),
+    BenchmarkCase('recipes.create', 'recipe-list-create', method='post', write=True, requires=('ingredient_ids',), data=lambda c: {
+        'title': 'Món đo hiệu năng', 'instructions': 'Nấu',
+        'ingredients': [{'ingredient': ingredient_id, 'quantity': '1'} for ingredient_id in c.ingredient_ids[:8]],
+    }),
+    BenchmarkCase('recipes.detail', 'recipe-detail-update-destroy', kwargs=lambda c: {'pk': c.public_recipe.pk}, requires=('public_recipe',)),
+    BenchmarkCase('recipes.detail.anonymous', 'recipe-detail-update-destroy', kwargs=lambda c: {'pk': c.public_recipe.pk}, anonymous=True, requires=('public_recipe',)),
+    BenchmarkCase('recipes.mine', 'my-recipe-list'),
+    BenchmarkCase('recipes.submit_review', 'submit-review', method='post', write=True, kwargs=lambda c: {'pk': c.private_recipe.pk}, requires=('private_recipe',)),
+    BenchmarkCase('favorites.toggle', 'recipe-favorite-toggle', method='post', write=True, kwargs=lambda c: {'pk': c.public_recipe.pk}, requires=('public_recipe',)),
+    BenchmarkCase('favorites.list', 'favorite-list'),
+    BenchmarkCase('shopping_list.list', 'shopping-list'),
+    BenchmarkCase('shopping_list.generate', 'shopping-list-generate', method='post', write=True, requires=('planned_recipe_ids',), data=lambda c: {'recipe_ids': c.planned_recipe_ids}),
+    BenchmarkCase('shopping_list.detail', 'shopping-list-detail', kwargs=lambda c: {'pk': c.shopping_item.pk}, requires=('shopping_item',)),
+    BenchmarkCase('users.register', 'register', method='post', write=True, anonymous=True, data={
+        'username': 'benchmark_register', 'email': 'benchmark_register@example.com', 'password': 'benchmark123',
+    }),
+    BenchmarkCase('users.login', 'login', method='post', anonymous=True, requires=('password',), data=lambda c: {'username': c.user.username, 'password': c.password}),
+    BenchmarkCase('users.me', 'user-detail'),
+    BenchmarkCase('users.token_refresh', 'token_refresh', method='post', anonymous=True, data=lambda c: {'refresh': str(RefreshToken.for_user(c.user))}),
+    BenchmarkCase('pantry.list', 'pantry'),
+    BenchmarkCase('pantry.detail', 'pantry-detail', kwargs=lambda c: {'pk': c.pantry_item.pk}, requires=('pantry_item',)),
+    BenchmarkCase('pantry.bulk', 'pantry-bulk', method='post', write=True, requires=('ingredient_ids',), data=lambda c: {
+        'items': [{'ingredient': ingredient_id, 'quantity': '2'} for ingredient_id in c.ingredient_ids],
+    }),
+    BenchmarkCase('ingredients.list', 'ingredient-list'),
+    BenchmarkCase('ingredients.list.anonymous', 'ingredient-list', anonymous=True),
+    BenchmarkCase('ingredients.autocomplete', 'ingredient-autocomplete', params=lambda c: {'q': c.ingredient_names[0][:3] if c.ingredient_names else 'ga'}, anonymous=True),
+    BenchmarkCase('suggestions.strict', 'suggestions', params={'mode': 'strict'}),
+    BenchmarkCase('suggestions.flexible', 'suggestions', params={'mode': 'flexible'}),
+    BenchmarkCase('export.recipes', 'export-recipes', anonymous=True),
+    BenchmarkCase('export.recipes.ndjson_gzip', 'export-recipes', params={'format': 'ndjson'}, anonymous=True, gzip=True),
+    BenchmarkCase('export.me', 'export-me'),
+    BenchmarkCase('sync.delta', 'sync', params={'cursor': '0'}),
+    BenchmarkCase('catalog.import', 'import-catalog', method='post', write=True, admin=True, format='multipart', data=lambda c: {
+        'file': SimpleUploadedFile('benchmark.ndjson', _catalog_ndjson(100, c.ingredient_names), content_type='application/x-ndjson'),
+    }),
+    BenchmarkCase('async.recipes.list', 'async-recipe-list', token=True),
+    BenchmarkCase('async.recipes.detail', 'async-recipe-detail', kwargs=lambda c: {'pk': c.public_recipe.pk}, token=True, requires=('public_recipe',)),
+    BenchmarkCase('async.suggestions.flexible', 'async-suggestions', params={'mode': 'flexible'}, token=True),
+    BenchmarkCase('stats.suggestion_cache', 'stats-suggestion-cache', admin=True),
+    BenchmarkCase('stats.requests', 'stats-requests', admin=True),
+    BenchmarkCase('stats.metrics', 'metrics', admin=True),
+]
+
+
+def api_route_names():
+    # Tên mọi route trong api/urls.py, để báo các route chưa có phép đo
+    names = []
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name and pattern.callback.__module__.startswith(('api.', 'rest_framework_simplejwt.')):
+                names.append(pattern.name)
+
+    walk(get_resolver().url_patterns)
+    return sorted(set(names))
+
+
+def percentile(values, fraction):
+    # Phân vị theo nội suy tuyến tính trên danh sách đã sắp xếp
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _request(client, method, url, params, data, format='json'):
+    if method == 'get':
+        response = client.get(url, params)
+        if response.streaming:
+            # Thời gian của phản hồi dạng luồng gồm cả việc đọc hết nội dung
+            b''.join(response.streaming_content)
+        return response
+    if format == 'multipart':
+        # File tải lên được đọc lại từ đầu ở mỗi lần chạy
+        for value in data.values():
+            if hasattr(value, 'seek'):
+                value.seek(0)
+    return getattr(client, method)(url, data, format=format)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def measure(case, context, iterations=50, warmup=5):
+    url, params, data = case.build(context)
+    client = APIClient()
+    if case.token and not case.anonymous:
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(context.user)}')
+    elif not case.anonymous:
+        client.force_authenticate(context.user)
+    if case.gzip:
+        client.defaults['HTTP_ACCEPT_ENCODING'] = 'gzip'
+
+    timings = []
+    queries = []
+    status_codes = set()
+    for run in range(warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            if case.write:
+                try:
+                    with transaction.atomic():
+                        response = _request(client, case.method, url, params, data, case.format)
+                        raise _Rollback
+                except _Rollback:
+                    pass
+            else:
+                response = _request(client, case.method, url, params, data, case.format)
+            elapsed = time.perf_counter() - started
+        if run >= warmup:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+            status_codes.add(response.status_code)
+
+    total = sum(timings) / 1000
+    return {
+        'name': case.name,
+        'route': case.route,
+        'method': case.method.upper(),
+        'path': url,
+        'iterations': iterations,
+        'status_codes': sorted(status_codes),
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'queries': int(percentile(queries, 0.5)),
+        'queries_max': max(queries),
+        'throughput_rps': round(iterations / total, 1) if total else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(user=None, password=None, names=None, iterations=50, warmup=5):
+    # Chạy mọi phép đo trong tiến trình (không qua mạng) và trả về kết quả dạng dict để ghi JSON
+    if user is None:
+        user = get_user_model().objects.filter(pantryitems__isnull=False).order_by('id').first() or get_user_model().objects.order_by('id').first()
+    if user is None:
+        raise ValueError('Chưa có người dùng nào, hãy chạy generate_synthetic_catalog trước.')
+    context = BenchmarkContext(user, password)
+
+    results = []
+    skipped = []
+    for case in BENCHMARK_CASES:
+        if names and case.name not in names and case.route not in names:
+            continue
+        missing = case.missing(context)
+        if missing:
+            skipped.append({'name': case.name, 'route': case.route, 'missing': missing})
+            continue
+        results.append(measure(case, context, iterations=iterations, warmup=warmup))
+
+    covered = {case.route for case in BENCHMARK_CASES}
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user_id': user.id,
+            'iterations': iterations,
+            'warmup': warmup,
+            'rows': {
+                'recipes': Recipes.objects.count(),
+                'ingredients': Ingredients.objects.count(),
+                'pantry_items': PantryItems.objects.count(),
+            },
+        },
+        'results': results,
+        'skipped': skipped,
+        'uncovered_routes': [name for name in api_route_names() if name not in covered],
+    }
+
+
+def compare(current, baseline):
+    # Chênh lệch p50/p99/số truy vấn so với một lần chạy trước (theo tên phép đo)
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    rows = []
+    for result in current['results']:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        rows.append({
+            'name': result['name'],
+            'p50_ms': (old['p50_ms'], result['p50_ms']),
+            'p99_ms': (old['p99_ms'], result['p99_ms']),
+            'queries': (old['queries'], result['queries']),
+            'p50_change': (result['p50_ms'] - old['p50_ms']) / old['p50_ms'] if old['p50_ms'] else None,
+        })
+    return rows
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
+
+
+# --- SO SÁNH ASGI VÀ WSGI TRÊN MỘT WORKER ---
+# (phép đo đồng bộ trong BENCHMARK_CASES, route async tương ứng)
+CONCURRENCY_CASES = [
+    ('recipes.list', 'async-recipe-list'),
+    ('recipes.detail', 'async-recipe-detail'),
+    ('suggestions.flexible', 'async-suggestions'),
+]
+
+BENCHMARK_HOST = '127.0.0.1'
+
+
+class DatabaseLatency:
+    # execute_wrapper giả lập độ trễ mạng tới CSDL (SQLite cục bộ gần như không có),
+    # để thấy khác biệt giữa giữ một luồng cho mỗi request và chờ CSDL trong event loop
+    def __init__(self, milliseconds):
+        self.seconds = milliseconds / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        if self.seconds:
+            connection_created.connect(self.install)
+            for existing in connections.all(initialized_only=True):
+                self.install(connection=existing)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self.install)
+        for existing in connections.all(initialized_only=True):
+            if self in existing.execute_wrappers:
+                existing.execute_wrappers.remove(self)
+
+
+def _headers(token):
+    headers = {'HTTP_HOST': BENCHMARK_HOST}
+    if token:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return headers
+
+
+def _query_string(params):
+    return urlencode(params or {}, doseq=True)
+
+
+def _wsgi_get(handler, path, query_string, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': BENCHMARK_HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        **headers,
+    }
+    status = []
+    started = time.perf_counter()
+    response = handler(environ, lambda code, response_headers, exc_info=None: status.append(int(code.split()[0])))
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    return (time.perf_counter() - started) * 1000, status[0]
+
+
+async def _asgi_get(application, path, query_string, headers):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('utf-8'),
+        'root_path': '',
+        'query_string': query_string.encode('ascii'),
+        'headers': [(name[5:].replace('_', '-').lower().encode('ascii'), value.encode('latin-1')) for name, value in headers.items()],
+        'client': ('127.0.0.1', 50000),
+        'server': (BENCHMARK_HOST, 80),
+    }
+    received = False
+    never = asyncio.Event()
+    status = []
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Client không ngắt kết nối; Django hủy tác vụ chờ này sau khi gửi phản hồi
+        await never.wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    return (time.perf_counter() - started) * 1000, status[0]
+
+
+def run_wsgi(requests, threads):
+    # Một worker gunicorn đồng bộ với `threads` luồng: tối đa `threads` request cùng lúc
+    handler = WSGIHandler()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda request: _wsgi_get(handler, *request), requests))
+    return time.perf_counter() - started, results
+
+
+def run_asgi(requests, concurrency):
+    # Một worker ASGI (một event loop) nhận tối đa `concurrency` request cùng lúc
+    application = ASGIHandler()
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(request):
+            async with semaphore:
+                return await _asgi_get(application, *request)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(one(request) for request in requests))
+        return time.perf_counter() - started, results
+
+    return asyncio.run(main())
+
+
+def _summarize(elapsed, results, concurrency):
+    timings = [timing for timing, _ in results]
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'statuses': statuses,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+        'throughput_rps': round(len(results) / elapsed, 1) if elapsed else None,
+    }
+
+
+def run_concurrency_benchmark(user=None, names=None, requests=200, concurrency=32, wsgi_threads=1, db_latency_ms=0, warmup=5):
+    # Gửi cùng một loạt GET tới endpoint đồng bộ qua WSGIHandler và tới bản async qua ASGIHandler,
+    # trong cùng tiến trình, rồi so sánh thông lượng của một worker mỗi loại
+    if user is None:
+        user = get_user_model().objects.filter(pantryitems__isnull=False).order_by('id').first() or get_user_model().objects.order_by('id').first()
+    if user is None:
+        raise ValueError('Chưa có người dùng nào, hãy chạy generate_synthetic_catalog trước.')
+    context = BenchmarkContext(user)
+    headers = _headers(str(AccessToken.for_user(user)))
+    cases = {case.name: case for case in BENCHMARK_CASES}
+
+    results = []
+    skipped = []
+    with DatabaseLatency(db_latency_ms):
+        for name, async_route in CONCURRENCY_CASES:
+            if names and name not in names:
+                continue
+            case = cases[name]
+            missing = case.missing(context)
+            if missing:
+                skipped.append({'name': name, 'missing': missing})
+                continue
+            sync_path, params, _ = case.build(context)
+            async_path = reverse(async_route, kwargs=case.kwargs(context) if case.kwargs else None)
+            query_string = _query_string(params)
+
+            run_wsgi([(sync_path, query_string, headers)] * warmup, wsgi_threads)
+            run_asgi([(async_path, query_string, headers)] * warmup, concurrency)
+            wsgi = _summarize(*run_wsgi([(sync_path, query_string, headers)] * requests, wsgi_threads), wsgi_threads)
+            asgi = _summarize(*run_asgi([(async_path, query_string, headers)] * requests, concurrency), concurrency)
+            results.append({
+                'name': name,
+                'wsgi_path': sync_path,
+                'asgi_path': async_path,
+                'wsgi': wsgi,
+                'asgi': asgi,
+                'speedup': round(asgi['throughput_rps'] / wsgi['throughput_rps'], 2) if wsgi['throughput_rps'] and asgi['throughput_rps'] else None,
+            })
+
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'user_id': user.id,
+            'requests': requests,
+            'concurrency': concurrency,
+            'wsgi_threads': wsgi_threads,
+            'db_latency_ms': db_latency_ms,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+# --- SO SÁNH SERIALIZER GỌN (api/compact.py) VỚI MODELSERIALIZER ---
+# (tên, serializer gốc, các trường nặng bị bỏ mặc định)
+SERIALIZER_CASES = [
+    ('recipes', RecipeSerializer, ('instructions',)),
+    ('my_recipes', MyRecipeSerializer, ('instructions',)),
+]
+
+
+def _time_calls(function, iterations, warmup):
+    timings = []
+    for run in range(warmup + iterations):
+        started = time.perf_counter()
+        function()
+        if run >= warmup:
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def run_serializer_benchmark(count=200, iterations=200, warmup=10):
+    # Chỉ đo phần serialize + render JSON (không tính truy vấn) cho `count` công thức.
+    # Với mỗi tập trường, phản hồi của CompactSerializer phải giống từng byte với
+    # ModelSerializer(many=True) cắt theo cùng tập trường; identical=False là lỗi.
+    renderer = JSONRenderer()
+    recipes = list(Recipes.objects.order_by('id')[:count])
+    if not recipes:
+        raise ValueError('Chưa có công thức nào, hãy chạy generate_synthetic_catalog trước.')
+
+    results = []
+    for name, serializer_class, heavy_fields in SERIALIZER_CASES:
+        declared = list(serializer_class.Meta.fields)
+        field_sets = [('all', declared), ('default', [field for field in declared if field not in heavy_fields])]
+        for label, fields in field_sets:
+            compact = compact_serializer(serializer_class, fields)
+            # Đường nhanh nạp công thức bằng .only() như CompactListMixin
+            compact_recipes = list(Recipes.objects.order_by('id').only(*compact.columns)[:count])
+
+            def render_model_serializer():
+                data = serializer_class(recipes, many=True).data
+                if len(fields) != len(declared):
+                    data = [{field: row[field] for field in fields} for row in data]
+                return renderer.render(data)
+
+            def render_compact():
+                return renderer.render(compact.many(compact_recipes))
+
+            expected = render_model_serializer()
+            actual = render_compact()
+            model_timings = _time_calls(render_model_serializer, iterations, warmup)
+            compact_timings = _time_calls(render_compact, iterations, warmup)
+            model_p50 = percentile(model_timings, 0.5)
+            compact_p50 = percentile(compact_timings, 0.5)
+            results.append({
+                'name': f'{name}.{label}',
+                'fields': fields,
+                'rows': len(recipes),
+                'identical': actual == expected,
+                'bytes': len(actual),
+                'model_serializer_p50_ms': round(model_p50, 3),
+                'compact_p50_ms': round(compact_p50, 3),
+                'speedup': round(model_p50 / compact_p50, 2) if compact_p50 else None,
+            })
+
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
+
+
+# --- RENDER JSON VÀ NÉN PHẢN HỒI (api/fast_json.py, api/compression.py) ---
+def _render_payloads(user, suggestion_page_size):
+    # Chi tiết công thức nhiều nguyên liệu nhất và một trang đề xuất, đúng như API trả về
+    payloads = []
+    recipe = (
+        Recipes.objects.filter(status=Recipes.Status.PUBLIC)
+        .annotate(ingredient_count=Count('ingredients'))
+        .order_by('-ingredient_count', 'id')
+        .select_related('author')
+        .prefetch_related(RECIPE_INGREDIENTS_PREFETCH)
+        .first()
+    )
+    if recipe is not None:
+        payloads.append(('recipes.detail', RecipeDetailSerializer(recipe).data))
+    client = APIClient()
+    client.force_authenticate(user)
+    response = client.get(reverse('suggestions'), {'mode': 'flexible', 'page_size': suggestion_page_size}, HTTP_HOST=BENCHMARK_HOST)
+    if response.status_code == 200:
+        payloads.append(('suggestions.flexible', response.data))
+    return payloads
+
+
+def run_render_benchmark(user=None, iterations=200, warmup=10, suggestion_page_size=100):
+    # Thời gian render của JSONRenderer gốc và FastJSONRenderer (phải giống từng byte), rồi số
+    # byte gửi đi và thời gian nén với từng mã hóa mà server hỗ trợ
+    if user is None:
+        user = get_user_model().objects.filter(pantryitems__isnull=False).order_by('id').first() or get_user_model().objects.order_by('id').first()
+    if user is None:
+        raise ValueError('Chưa có người dùng nào, hãy chạy generate_synthetic_catalog trước.')
+    standard, fast = JSONRenderer(), FastJSONRenderer()
+
+    results = []
+    for name, data in _render_payloads(user, suggestion_page_size):
+        content = standard.render(data)
+        standard_p50 = percentile(_time_calls(lambda: standard.render(data), iterations, warmup), 0.5)
+        fast_p50 = percentile(_time_calls(lambda: fast.render(data), iterations, warmup), 0.5)
+        encodings = {}
+        for encoding in available_encodings():
+            compressed = compress(content, encoding)
+            encodings[encoding] = {
+                'bytes': len(compressed),
+                'ratio': round(len(compressed) / len(content), 3),
+                'compress_p50_ms': round(percentile(_time_calls(lambda: compress(content, encoding), iterations, warmup), 0.5), 3),
+            }
+        results.append({
+            'name': name,
+            'identical': fast.render(data) == content,
+            'bytes': len(content),
+            'json_renderer_p50_ms': round(standard_p50, 3),
+            'fast_renderer_p50_ms': round(fast_p50, 3),
+            'speedup': round(standard_p50 / fast_p50, 2) if fast_p50 else None,
+            'encodings': encodings,
+        })
+
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'fast_json': fast_json_available(),
+            'user_id': user.id,
+            'iterations': iterations,
+            'warmup': warmup,
+        },
+        'results': results,
+    }
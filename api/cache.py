@@ -0,0 +1,101 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+# --- PHIÊN BẢN DỮ LIỆU CATALOG ---
+# Mỗi nhóm dữ liệu công khai có một số phiên bản lưu ngay trong cache:
+#   'recipes'       danh sách công thức
+#   'recipe:<id>'   chi tiết một công thức
+#   'ingredients'   danh sách nguyên liệu
+# Khóa của phản hồi đã cache chứa phiên bản hiện tại, nên khi dữ liệu đổi chỉ cần tăng
+# phiên bản (xem api/signals.py); các phản hồi cũ không bao giờ được đọc lại và tự hết hạn.
+VERSION_KEY_PREFIX = 'api:version:'
+RESPONSE_KEY_PREFIX = 'api:response:'
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def catalog_versions(namespaces):
+    cache = get_cache()
+    keys = [VERSION_KEY_PREFIX + namespace for namespace in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Khóa phiên bản có thể bị đẩy ra khỏi cache (LRU); khởi tạo bằng thời điểm hiện tại
+            # thay vì 0 để không đọc nhầm phản hồi của "thế hệ" trước.
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_catalog_versions(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        key = VERSION_KEY_PREFIX + namespace
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+# --- CACHE PHẢN HỒI CHO VIEW ---
+class CachedResponseMixin:
+    # Cache toàn bộ phản hồi GET của người dùng ẩn danh theo đường dẫn + tham số truy vấn
+    # (đã sắp xếp) + định dạng phản hồi + phiên bản dữ liệu, kèm ETag để trả 304.
+    # View khai báo cache_namespaces hoặc get_cache_namespaces().
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return self.cache_namespaces
+
+    def get_response_cache_key(self, request):
+        # Người dùng đã đăng nhập có thể thấy thêm công thức của chính mình nên không cache
+        if request.user.is_authenticated:
+            return None
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        parts = [
+            f'{type(self).__module__}.{type(self).__qualname__}',
+            ','.join(map(str, catalog_versions(self.get_cache_namespaces()))),
+            request.accepted_media_type or '',
+            request.build_absolute_uri(request.path),
+            query,
+        ]
+        return RESPONSE_KEY_PREFIX + hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return super().get(request, *args, **kwargs)
+
+        cache = get_cache()
+        entry = cache.get(key)
+        if entry is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response = self.finalize_response(request, response, *args, **kwargs)
+            response.render()
+            etag = '"%s"' % hashlib.md5(response.content).hexdigest()
+            cache.set(key, (response.content, response['Content-Type'], etag), getattr(settings, 'API_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+        else:
+            content, content_type, etag = entry
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Cache'] = 'HIT'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        # So sánh yếu: bản nén (api/compression.py) gửi ETag dạng W/"..."
+        if if_none_match and {etag, '*'} & {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}:
+            response = HttpResponseNotModified()
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
@@ -0,0 +1,303 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+from django.db import transaction
+
+from .models import Recipes, Ingredients, RecipeIngredients, CatalogImports
+from .quantities import quantity_fields
+from .signals import batched_changes, notify_recipes_changed
+from .text import normalize_name
+
+FORMAT_CSV = 'csv'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_CSV, FORMAT_NDJSON)
+DEFAULT_BATCH_SIZE = 500
+# Số lỗi giữ lại trong điểm khôi phục (tổng số dòng bị bỏ qua vẫn được đếm đủ)
+MAX_STORED_ERRORS = 100
+
+# Định dạng đầu vào, mỗi bản ghi là một công thức:
+#   NDJSON: {"title": "...", "instructions": "...", "description": "...", "difficulty": "easy",
+#            "cooking_time_minutes": 30, "ingredients": [{"name": "Thịt bò", "quantity": "300", "unit": "g"}]}
+#   CSV:    các cột title, description, instructions, difficulty, cooking_time_minutes, ingredients;
+#           cột ingredients có dạng "Thịt bò|300|g; Hành tây|1" (tên|số lượng|đơn vị, cách nhau bởi ;)
+
+
+class ImportRecordError(ValueError):
+    pass
+
+
+def detect_format(name):
+    extension = os.path.splitext(name or '')[1].lower()
+    if extension == '.csv':
+        return FORMAT_CSV
+    if extension in ('.ndjson', '.jsonl'):
+        return FORMAT_NDJSON
+    return None
+
+
+def source_checksum(binary_file):
+    # SHA-256 nội dung file để nhận ra cùng một nguồn khi chạy lại; đọc từng khối rồi tua về đầu
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: binary_file.read(1024 * 1024), b''):
+        digest.update(chunk)
+    binary_file.seek(0)
+    return digest.hexdigest()
+
+
+# --- ĐỌC BẢN GHI ---
+def _csv_ingredients(value):
+    ingredients = []
+    for item in (value or '').split(';'):
+        if not item.strip():
+            continue
+        parts = [part.strip() for part in item.split('|')]
+        ingredients.append({
+            'name': parts[0],
+            'quantity': parts[1] if len(parts) > 1 else '',
+            'unit': parts[2] if len(parts) > 2 and parts[2] else None,
+        })
+    return ingredients
+
+
+def read_records(binary_file, format):
+    # Sinh lần lượt từng bản ghi (dict), hoặc ImportRecordError nếu dòng không đọc được;
+    # không bao giờ nạp cả file vào bộ nhớ
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    try:
+        if format == FORMAT_CSV:
+            for row in csv.DictReader(text):
+                row['ingredients'] = _csv_ingredients(row.get('ingredients'))
+                yield row
+        else:
+            for line in text:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    yield ImportRecordError(f'JSON không hợp lệ: {exc}')
+                    continue
+                yield record if isinstance(record, dict) else ImportRecordError('Mỗi dòng phải là một đối tượng JSON.')
+    finally:
+        # Không đóng file gốc của người gọi
+        text.detach()
+
+
+def parse_record(record):
+    if isinstance(record, ImportRecordError):
+        raise record
+    title = (record.get('title') or '').strip()
+    instructions = (record.get('instructions') or '').strip()
+    if not title or not instructions:
+        raise ImportRecordError('Thiếu title hoặc instructions.')
+    if len(title) > Recipes._meta.get_field('title').max_length:
+        raise ImportRecordError('title quá dài.')
+    difficulty = (record.get('difficulty') or Recipes.Difficulty.EASY).strip()
+    if difficulty not in Recipes.Difficulty.values:
+        raise ImportRecordError(f'difficulty không hợp lệ: {difficulty}')
+    cooking_time = record.get('cooking_time_minutes')
+    if cooking_time in (None, ''):
+        cooking_time = None
+    else:
+        try:
+            cooking_time = int(cooking_time)
+        except (TypeError, ValueError):
+            raise ImportRecordError(f'cooking_time_minutes không hợp lệ: {cooking_time}')
+
+    ingredients = []
+    seen = set()
+    for item in record.get('ingredients') or []:
+        name = ' '.join(str(item.get('name') or '').split()) if isinstance(item, dict) else ''
+        if not name:
+            raise ImportRecordError('Nguyên liệu thiếu tên.')
+        if len(name) > Ingredients._meta.get_field('name').max_length:
+            raise ImportRecordError(f'Tên nguyên liệu quá dài: {name[:50]}...')
+        key = normalize_name(name)
+        # Mỗi công thức chỉ có một dòng cho mỗi nguyên liệu (UNIQUE recipe_id, ingredient_id)
+        if key in seen:
+            continue
+        seen.add(key)
+        quantity = str(item.get('quantity') or '').strip()
+        unit = item.get('unit') or None
+        ingredients.append((key, name, quantity[:100], unit[:50] if unit else None))
+    if not ingredients:
+        raise ImportRecordError('Công thức không có nguyên liệu.')
+
+    fields = {
+        'title': title,
+        'description': (record.get('description') or '').strip() or None,
+        'instructions': instructions,
+        'difficulty': difficulty,
+        'cooking_time_minutes': cooking_time,
+    }
+    return fields, ingredients
+
+
+# --- NHẬP THEO LÔ ---
+class CatalogImporter:
+    # Tên nguyên liệu được tra trong một bảng băm (tên chuẩn hóa -> id) nạp một lần khi bắt đầu;
+    # nguyên liệu chưa có được tạo ở trạng thái "pending" để quản trị viên duyệt sau.
+    # Mỗi lô là một transaction: tạo nguyên liệu mới, bulk_create công thức và recipe_ingredients,
+    # rồi cập nhật điểm khôi phục, nên dừng giữa chừng (lỗi, Ctrl+C) không để lại lô dở dang.
+
+    def __init__(self, author, status=Recipes.Status.PUBLIC, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+        if batch_size < 1:
+            raise ValueError(f'Kích thước lô phải lớn hơn 0 (nhận {batch_size}).')
+        self.author = author
+        self.status = status
+        self.batch_size = batch_size
+        self.progress = progress
+        self.names = {}
+
+    def load_names(self):
+        self.names = {
+            normalize_name(name): ingredient_id
+            for name, ingredient_id in Ingredients.objects.values_list('name', 'id').iterator(chunk_size=5000)
+        }
+
+    def checkpoint_for(self, checksum, source_name, format, restart=False):
+        if restart:
+            CatalogImports.objects.filter(checksum=checksum).delete()
+        checkpoint, _ = CatalogImports.objects.get_or_create(
+            checksum=checksum,
+            defaults={'source_name': source_name[:255], 'format': format, 'created_by': self.author},
+        )
+        return checkpoint
+
+    def run(self, records, checkpoint):
+        started = time.perf_counter()
+        resumed_from = checkpoint.records_done
+        report = {
+            'import_id': checkpoint.id,
+            'resumed_from': resumed_from,
+            'records': 0,
+            'recipes_created': 0,
+            'ingredients_created': 0,
+            'rows_skipped': 0,
+            'batches': 0,
+        }
+        if checkpoint.status == CatalogImports.Status.COMPLETED:
+            return self.finish(report, checkpoint, started)
+
+        checkpoint.status = CatalogImports.Status.RUNNING
+        checkpoint.save(update_fields=['status', 'updated_at'])
+        self.load_names()
+
+        position = 0
+        batch = []
+        try:
+            for record in records:
+                position += 1
+                # Bỏ qua các bản ghi đã được lô trước ghi xong
+                if position <= resumed_from:
+                    continue
+                batch.append((position, record))
+                if len(batch) >= self.batch_size:
+                    self.write_batch(batch, checkpoint, report)
+                    batch = []
+            if batch:
+                self.write_batch(batch, checkpoint, report)
+        except BaseException:
+            CatalogImports.objects.filter(pk=checkpoint.pk).update(status=CatalogImports.Status.FAILED)
+            raise
+
+        checkpoint.status = CatalogImports.Status.COMPLETED
+        checkpoint.save(update_fields=['status', 'updated_at'])
+        return self.finish(report, checkpoint, started)
+
+    def write_batch(self, batch, checkpoint, report):
+        parsed = []
+        errors = []
+        for position, record in batch:
+            try:
+                parsed.append(parse_record(record))
+            except ImportRecordError as exc:
+                errors.append({'record': position, 'error': str(exc)})
+
+        new_names = {}
+        for _, ingredients in parsed:
+            for key, name, _, _ in ingredients:
+                if key not in self.names and key not in new_names:
+                    new_names[key] = name
+
+        with transaction.atomic(), batched_changes():
+            created_ids = self.create_ingredients(new_names)
+            names = {**self.names, **created_ids}
+
+            recipes = Recipes.objects.bulk_create([
+                Recipes(author=self.author, status=self.status, **fields)
+                for fields, _ in parsed
+            ])
+            RecipeIngredients.objects.bulk_create([
+                RecipeIngredients(recipe_id=recipe.id, ingredient_id=names[key], quantity=quantity, unit=unit, **quantity_fields(quantity, unit))
+                for recipe, (_, ingredients) in zip(recipes, parsed)
+                for key, _, quantity, unit in ingredients
+            ])
+            # bulk_create không phát tín hiệu: tự cập nhật recipe_profiles và cache
+            notify_recipes_changed([recipe.id for recipe in recipes], sender=CatalogImports)
+
+            checkpoint.records_done = batch[-1][0]
+            checkpoint.recipes_created += len(recipes)
+            checkpoint.ingredients_created += len(created_ids)
+            checkpoint.rows_skipped += len(errors)
+            checkpoint.errors = (checkpoint.errors + errors)[:MAX_STORED_ERRORS]
+            checkpoint.save()
+
+        # Chỉ ghi nhớ id mới khi transaction đã commit
+        self.names = names
+        report['records'] += len(batch)
+        report['recipes_created'] += len(recipes)
+        report['ingredients_created'] += len(created_ids)
+        report['rows_skipped'] += len(errors)
+        report['batches'] += 1
+        if self.progress is not None:
+            self.progress(report)
+
+    def create_ingredients(self, new_names):
+        if not new_names:
+            return {}
+        Ingredients.objects.bulk_create(
+            [Ingredients(name=name, status=Ingredients.Status.PENDING, submitted_by=self.author) for name in new_names.values()],
+            # Tên đã được tạo ở nơi khác trong lúc nhập thì dùng lại dòng đó
+            ignore_conflicts=True,
+        )
+        created = {
+            normalize_name(name): ingredient_id
+            for name, ingredient_id in Ingredients.objects.filter(name__in=list(new_names.values())).values_list('name', 'id')
+        }
+        if any(key not in created for key in new_names):
+            # Dòng đã có chỉ khác chữ hoa/thường hoặc dạng Unicode (ràng buộc duy nhất theo collation
+            # không phân biệt) nên name__in không thấy: tra lại theo tên chuẩn hóa. Hiếm khi xảy ra.
+            for name, ingredient_id in Ingredients.objects.values_list('name', 'id').iterator(chunk_size=5000):
+                created.setdefault(normalize_name(name), ingredient_id)
+        missing = [name for key, name in new_names.items() if key not in created]
+        if missing:
+            raise ValueError(f"Không tạo được nguyên liệu: {', '.join(missing[:10])}")
+        return {key: created[key] for key in new_names}
+
+    def finish(self, report, checkpoint, started):
+        elapsed = time.perf_counter() - started
+        report.update({
+            'status': checkpoint.status,
+            'records_done': checkpoint.records_done,
+            'total_recipes_created': checkpoint.recipes_created,
+            'total_rows_skipped': checkpoint.rows_skipped,
+            'errors': checkpoint.errors[:20],
+            'elapsed_s': round(elapsed, 3),
+            'records_per_s': round(report['records'] / elapsed, 1) if elapsed and report['records'] else 0.0,
+            'recipes_per_s': round(report['recipes_created'] / elapsed, 1) if elapsed and report['recipes_created'] else 0.0,
+        })
+        return report
+
+
+def import_catalog(binary_file, format, author, source_name='', status=Recipes.Status.PUBLIC, batch_size=DEFAULT_BATCH_SIZE, restart=False, progress=None):
+    # Điểm vào chung của lệnh import_catalog và CatalogImportView
+    if format not in FORMATS:
+        raise ValueError(f'Định dạng không hỗ trợ: {format}. Dùng csv hoặc ndjson.')
+    importer = CatalogImporter(author, status=status, batch_size=batch_size, progress=progress)
+    checkpoint = importer.checkpoint_for(source_checksum(binary_file), source_name, format, restart=restart)
+    return importer.run(read_records(binary_file, format), checkpoint)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import Recipes, Ingredients, ChangeLogEntries
+
+Entity = ChangeLogEntries.Entity
+Action = ChangeLogEntries.Action
+
+# created_at và updated_at của một dòng mới tạo chỉ lệch nhau vài micro giây
+_CREATED_TOLERANCE = timedelta(seconds=1)
+
+
+# --- GHI NHẬT KÝ THAY ĐỔI ---
+# Ghi sau khi commit để id trong change_log tăng theo thứ tự dữ liệu trở nên nhìn thấy được;
+# thay đổi bị rollback thì không để lại dấu vết.
+def record_changes(entity, object_ids, user_id=None, action=Action.UPDATED):
+    object_ids = sorted(set(object_id for object_id in object_ids if object_id is not None))
+    if not object_ids:
+        return
+    transaction.on_commit(lambda: ChangeLogEntries.objects.bulk_create([
+        ChangeLogEntries(entity=entity, object_id=object_id, user_id=user_id, action=action)
+        for object_id in object_ids
+    ]))
+
+
+def model_action(kwargs):
+    # Hành động tương ứng với tham số của post_save / post_delete
+    if 'created' not in kwargs:
+        return Action.DELETED
+    return Action.CREATED if kwargs['created'] else Action.UPDATED
+
+
+def _record_catalog_changes(entity, model, object_ids):
+    # recipes_changed / ingredients_changed phát cho cả tạo, sửa lẫn xóa và không kèm hành động:
+    # đối tượng không còn sau commit là tombstone, đối tượng có created_at ~ updated_at là mới tạo
+    object_ids = sorted(set(object_ids))
+    if not object_ids:
+        return
+
+    def write():
+        existing = {
+            object_id: created_at is not None and updated_at is not None and updated_at - created_at < _CREATED_TOLERANCE
+            for object_id, created_at, updated_at in model.objects.filter(id__in=object_ids).values_list('id', 'created_at', 'updated_at')
+        }
+        ChangeLogEntries.objects.bulk_create([
+            ChangeLogEntries(
+                entity=entity,
+                object_id=object_id,
+                action=Action.DELETED if object_id not in existing else Action.CREATED if existing[object_id] else Action.UPDATED,
+            )
+            for object_id in object_ids
+        ])
+
+    transaction.on_commit(write)
+
+
+def record_recipe_changes(recipe_ids):
+    _record_catalog_changes(Entity.RECIPE, Recipes, recipe_ids)
+
+
+def record_ingredient_changes(ingredient_ids):
+    _record_catalog_changes(Entity.INGREDIENT, Ingredients, ingredient_ids)
@@ -0,0 +1,90 @@
+from operator import attrgetter
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+# Đường đọc nhanh cho các endpoint danh sách lớn (công thức, đề xuất, yêu thích).
+# ModelSerializer(many=True) dựng lại và gọi to_representation cho từng trường của từng dòng;
+# với vài trăm công thức phần đó chiếm phần lớn CPU của request. CompactSerializer dựa trên
+# chính ModelSerializer đó nhưng chỉ phân tích các trường một lần, rồi mỗi dòng chỉ còn một
+# lần gọi attrgetter (lấy mọi cột trong một lượt) và dict(zip(...)).
+# Kết quả JSON giống từng byte với serializer gốc cho cùng tập trường
+# (xem benchmark_serializers trong api/benchmarks.py).
+
+FIELDS_QUERY_PARAM = 'fields'
+
+# Các trường mà to_representation trả lại đúng giá trị đọc từ CSDL (chuỗi, số, lựa chọn hợp lệ)
+_PASSTHROUGH_FIELDS = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField)
+
+
+class CompactSerializer:
+
+    def __init__(self, serializer_class, field_names):
+        declared = serializer_class().fields
+        # Giữ thứ tự khai báo của serializer gốc, không theo thứ tự trong ?fields=
+        self.field_names = [name for name in declared if name in field_names]
+        sources = []
+        self.converters = []
+        for position, name in enumerate(self.field_names):
+            field = declared[name]
+            sources.append('.'.join(field.source_attrs))
+            if not isinstance(field, _PASSTHROUGH_FIELDS):
+                self.converters.append((position, field.to_representation))
+        getter = attrgetter(*sources)
+        # attrgetter với một tên trả về giá trị thay vì tuple
+        self.getter = getter if len(sources) > 1 else (lambda instance: (getter(instance),))
+        # Cột cần nạp bằng .only(): trường trực tiếp của model (bỏ qua annotation như score)
+        model = serializer_class.Meta.model
+        concrete = {field.name for field in model._meta.concrete_fields}
+        self.columns = [source for source in sources if source in concrete]
+
+    def to_representation(self, instance):
+        values = self.getter(instance)
+        if self.converters:
+            values = list(values)
+            for position, convert in self.converters:
+                if values[position] is not None:
+                    values[position] = convert(values[position])
+        return dict(zip(self.field_names, values))
+
+    def many(self, instances):
+        names = self.field_names
+        getter = self.getter
+        if not self.converters:
+            return [dict(zip(names, getter(instance))) for instance in instances]
+        return [self.to_representation(instance) for instance in instances]
+
+
+_compact_serializers = {}
+
+
+def compact_serializer(serializer_class, field_names):
+    key = (serializer_class, tuple(sorted(field_names)))
+    compact = _compact_serializers.get(key)
+    if compact is None:
+        compact = _compact_serializers[key] = CompactSerializer(serializer_class, field_names)
+    return compact
+
+
+class CompactListSerializer:
+    # Vỏ có .data như ListSerializer để view dùng như serializer thường
+    def __init__(self, instances, compact):
+        self.instances = instances
+        self.compact = compact
+
+    @property
+    def data(self):
+        return self.compact.many(self.instances)
+
+
+def parse_fields(request, serializer_class, heavy_fields=()):
+    # ?fields=id,title: chỉ trả các trường này. Không có: mọi trường trừ heavy_fields.
+    declared = list(serializer_class.Meta.fields)
+    value = request.query_params.get(FIELDS_QUERY_PARAM) or ''
+    requested = [name.strip() for name in value.split(',') if name.strip()]
+    if not requested:
+        return [name for name in declared if name not in heavy_fields]
+    unknown = [name for name in requested if name not in declared]
+    if unknown:
+        raise ValidationError({FIELDS_QUERY_PARAM: [f"Trường không hợp lệ: {', '.join(unknown)}. Chọn trong: {', '.join(declared)}."]})
+    return [name for name in declared if name in requested]
@@ -0,0 +1,141 @@
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Nén phản hồi theo Accept-Encoding của client: brotli (nếu gói brotli được cài) hoặc gzip.
+# Chỉ nén phản hồi dạng văn bản (JSON, NDJSON, HTML...) từ RESPONSE_COMPRESSION_MIN_BYTES byte
+# trở lên: gói nhỏ hơn nén không được bao nhiêu mà vẫn tốn CPU. Phản hồi dạng luồng (xuất dữ
+# liệu tự nén bằng compress_stream trong api/exports.py, file tĩnh do WhiteNoise phục vụ) và
+# phản hồi đã có Content-Encoding được giữ nguyên.
+
+# Chống BREACH (đoán bí mật trong thân phản hồi nén qua độ dài): phản hồi có Set-Cookie hoặc
+# Cache-Control: no-store (token đăng nhập, xem LoginView) không bao giờ được nén; bản gzip của
+# phản hồi còn lại được chèn thêm tối đa GZIP_MAX_RANDOM_BYTES byte ngẫu nhiên như GZipMiddleware
+# của Django.
+
+# Mức nén cho phản hồi động: đủ nhanh để không đáng kể so với thời gian tạo phản hồi
+GZIP_LEVEL = 6
+GZIP_MAX_RANDOM_BYTES = 100
+BROTLI_QUALITY = 4
+COMPRESSIBLE_TYPES = re.compile(r'^(text/|application/(json|x-ndjson|javascript|xml)|[^;]*\+json)')
+
+
+def available_encodings():
+    # Theo thứ tự ưu tiên của server khi client chấp nhận như nhau
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header):
+    # "br;q=1.0, gzip;q=0.8, *;q=0" -> {'br': 1.0, 'gzip': 0.8, '*': 0.0}
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+    return weights
+
+
+def choose_encoding(header):
+    # Mã hóa có trọng số cao nhất mà server hỗ trợ, None nếu client không nhận mã hóa nào
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    best, best_weight = None, 0.0
+    for coding in available_encodings():
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    # Mức nén 6 như GZIP_LEVEL, kèm phần đệm ngẫu nhiên trong header gzip
+    return compress_string(content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+
+
+def carries_secrets(response):
+    # Phản hồi có thể chứa bí mật (cookie phiên / CSRF, token) cạnh dữ liệu do client gửi lên
+    return bool(response.cookies) or 'no-store' in response.get('Cache-Control', '')
+
+
+def compress_stream(chunks, encoding):
+    # Nén theo luồng cho phản hồi dạng luồng (xuất dữ liệu): bộ nhớ dùng chỉ là cửa sổ nén,
+    # không phụ thuộc kích thước dữ liệu
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        feed, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        feed, finish = compressor.compress, compressor.flush
+    for chunk in chunks:
+        data = feed(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+class CompressionMiddleware:
+    # Đặt ngay sau RequestMetricsMiddleware để thời gian nén được tính vào thời gian request.
+    # Chạy được cả dưới WSGI lẫn ASGI (không ép view async chạy qua luồng đồng bộ).
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process(request, await self.get_response(request))
+
+    def process(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding') or carries_secrets(response):
+            return response
+        if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+            return response
+        if len(response.content) < getattr(settings, 'RESPONSE_COMPRESSION_MIN_BYTES', 1024):
+            return response
+
+        # Cùng URL có thể trả về bản nén hoặc không: cache trung gian phải phân biệt theo Accept-Encoding
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # Bản nén khác từng byte với bản gốc: ETag chỉ còn là ETag yếu (như GZipMiddleware của Django)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,125 @@
+from datetime import datetime, time
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .compression import choose_encoding, compress_stream
+from .fast_json import dumps as _dumps
+
+# Số dòng đọc mỗi lần từ CSDL (server-side cursor trên PostgreSQL)
+EXPORT_CHUNK_SIZE = 500
+# Gom các dòng đã mã hóa tới khoảng này rồi mới gửi đi, tránh gửi hàng nghìn gói nhỏ
+EXPORT_FLUSH_BYTES = 64 * 1024
+
+
+class NDJSONRenderer(BaseRenderer):
+    # Mỗi dòng một đối tượng JSON. Dữ liệu xuất được ghi trực tiếp bằng StreamingHttpResponse;
+    # renderer này để DRF thương lượng ?format=ndjson và trả lỗi đúng định dạng.
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return _dumps(data) + b'\n'
+
+
+# --- THAM SỐ ---
+def parse_updated_since(request):
+    # ?updated_since=2025-01-31T08:00:00+07:00 (hoặc chỉ ngày), hiểu theo TIME_ZONE nếu không có múi giờ
+    value = request.query_params.get('updated_since')
+    if not value:
+        return None
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({'updated_since': ['Thời điểm không hợp lệ, dùng định dạng ISO 8601.']})
+    if settings.USE_TZ and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+# --- CÁC DÒNG DỮ LIỆU ---
+def serialized_rows(serializer_class, queryset, context=None):
+    # Duyệt queryset theo từng khối EXPORT_CHUNK_SIZE dòng và chuyển mỗi đối tượng thành dict;
+    # prefetch_related vẫn có hiệu lực cho từng khối
+    serializer = serializer_class(context=context or {})
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield serializer.to_representation(instance)
+
+
+# --- MÃ HÓA ---
+def json_array(rows):
+    yield b'['
+    first = True
+    for row in rows:
+        yield _dumps(row) if first else b',' + _dumps(row)
+        first = False
+    yield b']'
+
+
+def json_sections(sections):
+    # {"recipes": [...], "pantry": [...], ...} với từng mảng được ghi dần
+    yield b'{'
+    for index, (name, rows) in enumerate(sections):
+        yield (b',' if index else b'') + _dumps(name) + b':'
+        yield from json_array(rows)
+    yield b'}'
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield _dumps(row) + b'\n'
+
+
+def ndjson_sections(sections):
+    # Mỗi dòng ghi rõ phần dữ liệu của nó: {"type": "pantry", "data": {...}}
+    for name, rows in sections:
+        for row in rows:
+            yield _dumps({'type': name, 'data': row}) + b'\n'
+
+
+def buffered(chunks, size=EXPORT_FLUSH_BYTES):
+    buffer = []
+    length = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+# --- PHẢN HỒI ---
+def streaming_export(request, sections, filename):
+    # sections: danh sách (tên, các dòng). Một phần duy nhất được xuất thành mảng JSON phẳng
+    # (hoặc mỗi dòng một đối tượng với NDJSON); nhiều phần thì gom theo tên.
+    ndjson = request.accepted_renderer.format == NDJSONRenderer.format
+    if len(sections) == 1:
+        chunks = ndjson_lines(sections[0][1]) if ndjson else json_array(sections[0][1])
+    else:
+        chunks = ndjson_sections(sections) if ndjson else json_sections(sections)
+    chunks = buffered(chunks)
+
+    # Cùng cách chọn mã hóa với CompressionMiddleware (tôn trọng q=0, identity, *)
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is not None:
+        chunks = compress_stream(chunks, encoding)
+
+    response = StreamingHttpResponse(chunks, content_type=NDJSONRenderer.media_type if ndjson else 'application/json')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{"ndjson" if ndjson else "json"}"'
+    response['Vary'] = 'Accept, Accept-Encoding, Authorization'
+    if encoding is not None:
+        response['Content-Encoding'] = encoding
+    return response
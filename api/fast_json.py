@@ -0,0 +1,81 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Mã hóa / giải mã JSON nhanh bằng orjson (viết bằng Rust) khi gói này được cài, nếu không thì
+# dùng thư viện json chuẩn như cũ. Kết quả giống từng byte với JSONRenderer của DRF (không
+# escape tiếng Việt, không khoảng trắng, escape U+2028/U+2029); kiểu orjson không tự xử lý
+# (datetime, Decimal, lazy string...) đi qua JSONEncoder của DRF như trước.
+# Khác biệt duy nhất: NaN / vô cực được orjson ghi thành null, còn JSONRenderer của DRF báo
+# ValueError. Kiểm tra từng số trong Python sẽ mất phần lớn tốc độ, nên nơi tạo số thực (điểm
+# đề xuất, hạng tìm kiếm) phải tự bảo đảm giá trị hữu hạn.
+# Tắt bằng FAST_JSON_ENABLED = False (ví dụ để so sánh khi nghi ngờ sai khác).
+
+_ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+_LINE_SEPARATORS = (b'\xe2\x80\xa8', b'\xe2\x80\xa9')
+_encoder = JSONEncoder()
+
+
+def fast_json_available():
+    return orjson is not None and getattr(settings, 'FAST_JSON_ENABLED', True)
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(data):
+    # bytes JSON gọn, UTF-8. orjson từ chối số nguyên quá 64 bit và vài trường hợp hiếm khác:
+    # khi đó mã hóa lại bằng json chuẩn cho đúng kết quả cũ
+    if fast_json_available():
+        try:
+            return orjson.dumps(data, default=_encoder.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return _stdlib_dumps(data)
+
+
+# --- RENDERER / PARSER CHO DRF ---
+class FastJSONRenderer(JSONRenderer):
+    # Thay JSONRenderer trong DEFAULT_RENDERER_CLASSES. Yêu cầu thụt lề
+    # (Accept: application/json; indent=4) hoặc tắt các tùy chọn gọn của DRF thì dùng lại bản gốc.
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Giá trị đơn lẻ (hiếm) cũng dùng bản gốc để giữ nguyên cách xử lý NaN / kiểu lạ của DRF
+        if (
+            not fast_json_available()
+            or not isinstance(data, (dict, list))
+            or self.get_indent(accepted_media_type or '', renderer_context or {})
+            or not (self.compact and self.ensure_ascii is False and self.strict)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        content = dumps(data)
+        # Như DRF: U+2028 / U+2029 hợp lệ trong JSON nhưng làm hỏng JavaScript nhúng JSON
+        if _LINE_SEPARATORS[0] in content or _LINE_SEPARATORS[1] in content:
+            content = content.replace(_LINE_SEPARATORS[0], b'\\u2028').replace(_LINE_SEPARATORS[1], b'\\u2029')
+        return content
+
+
+class FastJSONParser(JSONParser):
+    # Thay JSONParser trong DEFAULT_PARSER_CLASSES; thân request không phải UTF-8 dùng bản gốc
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if not fast_json_available() or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,87 @@
+import re
+
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.models import QuerySet
+from rest_framework.generics import GenericAPIView
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from .pagination import KeysetPagination, _order_by, _parse_ordering
+
+# Dòng kế hoạch quét toàn bảng:
+#   PostgreSQL: "Seq Scan on recipes  (cost=...)"
+#   SQLite:     "SCAN recipes" (khác với "SEARCH ... USING INDEX" hoặc "SCAN ... USING COVERING INDEX")
+_SEQ_SCAN_PATTERNS = (
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?!.*USING (?:COVERING )?INDEX)'),
+)
+
+
+def sequential_scans(plan):
+    tables = []
+    for line in plan.splitlines():
+        for pattern in _SEQ_SCAN_PATTERNS:
+            match = pattern.search(line)
+            if match and match.group(1) not in tables:
+                tables.append(match.group(1))
+    return tables
+
+
+def _sample_kwargs(route, queryset):
+    # Điền tham số đường dẫn (<int:pk>) bằng id có thật nếu có
+    if '<int:pk>' not in route:
+        return {}
+    sample = queryset.order_by('pk').values_list('pk', flat=True).first() if isinstance(queryset, QuerySet) else None
+    return {'pk': sample or 1}
+
+
+def _page_queryset(view, queryset, request):
+    # Áp dụng đúng thứ tự và giới hạn mà KeysetPagination dùng cho trang đầu tiên
+    paginator = view.paginator
+    if not isinstance(paginator, KeysetPagination):
+        return queryset
+    fields = _parse_ordering(paginator.get_ordering(request, queryset, view))
+    return queryset.order_by(*_order_by(fields, False))[:paginator.get_page_size(request, view) + 1]
+
+
+def audit_view_querysets(patterns, user=None, analyze=False):
+    # Chạy EXPLAIN trên queryset thực tế mà mỗi view dạng generic dùng cho GET
+    factory = APIRequestFactory()
+    results = []
+    for pattern in patterns:
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is None or not issubclass(view_class, GenericAPIView) or not hasattr(view_class, 'get'):
+            continue
+        route = '/api/' + str(pattern.pattern)
+        request = Request(factory.get(route))
+        request.user = user or AnonymousUser()
+
+        view = view_class()
+        view.request = request
+        view.args = ()
+        view.kwargs = {}
+        view.format_kwarg = None
+        try:
+            queryset = view.get_queryset()
+            view.kwargs = _sample_kwargs(route, queryset)
+            if not isinstance(queryset, QuerySet):
+                results.append({'route': route, 'view': view_class.__name__, 'skipped': 'get_queryset không trả về QuerySet'})
+                continue
+            queryset = view.filter_queryset(queryset)
+            if view.kwargs:
+                queryset = queryset.filter(pk=view.kwargs['pk'])
+            else:
+                queryset = _page_queryset(view, queryset, request)
+            plan = queryset.explain(analyze=analyze) if analyze and connection.vendor == 'postgresql' else queryset.explain()
+        except Exception as exc:
+            results.append({'route': route, 'view': view_class.__name__, 'skipped': f'{type(exc).__name__}: {exc}'})
+            continue
+        results.append({
+            'route': route,
+            'view': view_class.__name__,
+            'sql': str(queryset.query),
+            'plan': plan,
+            'sequential_scans': sequential_scans(plan),
+        })
+    return results
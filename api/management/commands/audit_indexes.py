@@ -0,0 +1,50 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.index_audit import audit_view_querysets
+from api.models import PantryItems
+from api.urls import urlpatterns
+
+
+class Command(BaseCommand):
+
+    help = 'Chạy EXPLAIN trên queryset của từng view trong api/urls.py và báo các bảng bị quét tuần tự (Seq Scan).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Tên người dùng để dựng queryset. Mặc định: người dùng đầu tiên có tủ lạnh.')
+        parser.add_argument('--analyze', action='store_true', help='Dùng EXPLAIN ANALYZE (chỉ PostgreSQL, chạy thật truy vấn).')
+        parser.add_argument('--verbose-plans', action='store_true', help='In toàn bộ kế hoạch thực thi.')
+        parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON.')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Không tìm thấy người dùng "{options["user"]}".')
+        else:
+            user = User.objects.filter(id__in=PantryItems.objects.values('user_id')).order_by('id').first() or User.objects.order_by('id').first()
+
+        results = audit_view_querysets(urlpatterns, user=user, analyze=options['analyze'])
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+            return
+
+        flagged = 0
+        for result in results:
+            label = f"{result['route']} ({result['view']})"
+            if 'skipped' in result:
+                self.stdout.write(self.style.WARNING(f'{label}: bỏ qua - {result["skipped"]}'))
+                continue
+            if result['sequential_scans']:
+                flagged += 1
+                self.stdout.write(self.style.ERROR(f"{label}: quét tuần tự trên {', '.join(result['sequential_scans'])}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: dùng chỉ mục'))
+            if options['verbose_plans'] or result['sequential_scans']:
+                self.stdout.write('    ' + result['plan'].replace('\n', '\n    '))
+        # Bảng nhỏ thì PostgreSQL vẫn chọn Seq Scan dù có chỉ mục; nên chạy trên dữ liệu cỡ thật
+        # (xem generate_synthetic_catalog) trước khi kết luận.
+        self.stdout.write(f'{flagged}/{len(results)} view có quét tuần tự.')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.quantities import QUANTITY_MODELS, backfill_quantities
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Điền cột amount / base_unit (lượng đã quy về đơn vị chuẩn) từ cột chữ quantity cho '
+        'recipe_ingredients, pantry_items và shopping_list_items. Chạy sau migrate 0011; chạy lại an toàn.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in QUANTITY_MODELS:
+            scanned, updated = backfill_quantities(model, batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'{model._meta.db_table}: đã đọc {scanned} dòng, cập nhật {updated} dòng.'))
@@ -0,0 +1,54 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from api.models import PantryItems
+from api.suggestion_batch import SuggestionMatrix, batch_suggestions
+from api.suggestion_engine import MODE_STRICT, MODE_FLEXIBLE
+
+
+class Command(BaseCommand):
+
+    help = 'Chấm điểm đề xuất món ăn cho nhiều người dùng cùng lúc (dùng cho thông báo "tối nay nấu gì").'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', nargs='*', type=int, help='Danh sách id người dùng. Mặc định: mọi người dùng có tủ lạnh.')
+        parser.add_argument('--mode', choices=[MODE_STRICT, MODE_FLEXIBLE], default=MODE_STRICT)
+        parser.add_argument('--top', type=int, default=10, help='Số món đề xuất cho mỗi người dùng.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--output', help='Ghi kết quả ra file NDJSON thay vì stdout.')
+
+    def handle(self, *args, **options):
+        if options['top'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--top và --batch-size phải lớn hơn 0.')
+        user_ids = options['users']
+        if not user_ids:
+            user_ids = list(
+                get_user_model().objects.filter(id__in=PantryItems.objects.values('user_id')).order_by('id').values_list('id', flat=True)
+            )
+
+        started = time.perf_counter()
+        matrix = SuggestionMatrix.build()
+        built = time.perf_counter()
+
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        try:
+            for user_id, ranked in batch_suggestions(user_ids, mode=options['mode'], top_n=options['top'], batch_size=options['batch_size'], matrix=matrix):
+                line = json.dumps({
+                    'user_id': user_id,
+                    'suggestions': [{'recipe_id': recipe_id, 'score': score} for recipe_id, score in ranked],
+                }, ensure_ascii=False)
+                output.write(line + '\n')
+        finally:
+            if options['output']:
+                output.close()
+
+        finished = time.perf_counter()
+        scored = finished - built
+        rate = len(user_ids) / scored if scored else 0
+        self.stderr.write(self.style.SUCCESS(
+            f'Đã chấm điểm {len(user_ids)} người dùng x {len(matrix.recipe_ids)} công thức '
+            f'(dựng ma trận {built - started:.2f}s, chấm điểm {scored:.2f}s, {rate:.0f} người dùng/giây).'
+        ))
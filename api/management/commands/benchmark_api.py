@@ -0,0 +1,56 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import run_benchmarks, compare, load_results
+
+
+class Command(BaseCommand):
+
+    help = 'Đo độ trễ p50/p99, số truy vấn và thông lượng của mọi route trong api/urls.py, ghi kết quả ra JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Tên người dùng dùng để đo. Mặc định: người dùng đầu tiên có tủ lạnh.')
+        parser.add_argument('--password', default='benchmark123', help='Mật khẩu của người dùng đó (cho phép đo đăng nhập).')
+        parser.add_argument('--only', nargs='*', help='Chỉ chạy các phép đo/route có tên này.')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', help='Ghi kết quả ra file JSON thay vì stdout.')
+        parser.add_argument('--compare', help='File JSON của một lần chạy trước để so sánh.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Không tìm thấy người dùng "{options["user"]}".')
+        try:
+            report = run_benchmarks(user=user, password=options['password'], names=options['only'], iterations=options['iterations'], warmup=options['warmup'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        for result in report['results']:
+            self.stderr.write(
+                f"{result['name']:<28} p50 {result['p50_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms  "
+                f"{result['queries']:>3} truy vấn  {result['throughput_rps'] or 0:>8.1f} req/s"
+            )
+        for skipped in report['skipped']:
+            self.stderr.write(self.style.WARNING(f"Bỏ qua {skipped['name']}: thiếu {', '.join(skipped['missing'])}"))
+        if report['uncovered_routes']:
+            self.stderr.write(self.style.WARNING(f"Route chưa có phép đo: {', '.join(report['uncovered_routes'])}"))
+
+        if options['compare']:
+            for row in compare(report, load_results(options['compare'])):
+                change = f"{row['p50_change'] * 100:+.1f}%" if row['p50_change'] is not None else 'n/a'
+                self.stderr.write(
+                    f"{row['name']:<28} p50 {row['p50_ms'][0]:.2f} -> {row['p50_ms'][1]:.2f}ms ({change})  "
+                    f"truy vấn {row['queries'][0]} -> {row['queries'][1]}"
+                )
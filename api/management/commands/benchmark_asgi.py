@@ -0,0 +1,57 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import run_concurrency_benchmark, CONCURRENCY_CASES
+
+
+class Command(BaseCommand):
+
+    help = (
+        'So sánh thông lượng của một worker WSGI (endpoint đồng bộ) với một worker ASGI '
+        '(endpoint /api/async/...) khi nhiều request tới cùng lúc, ghi kết quả ra JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Tên người dùng dùng để đo. Mặc định: người dùng đầu tiên có tủ lạnh.')
+        parser.add_argument('--only', nargs='*', choices=[name for name, _ in CONCURRENCY_CASES], help='Chỉ chạy các phép đo này.')
+        parser.add_argument('--requests', type=int, default=200, help='Số request cho mỗi phép đo.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Số request đồng thời tối đa của worker ASGI.')
+        parser.add_argument('--wsgi-threads', type=int, default=1, help='Số luồng của worker WSGI (gunicorn --threads, mặc định 1 như worker sync).')
+        parser.add_argument('--db-latency-ms', type=float, default=0, help='Độ trễ giả lập cho mỗi câu SQL, như khi CSDL nằm trên máy khác.')
+        parser.add_argument('--output', help='Ghi kết quả ra file JSON thay vì stdout.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Không tìm thấy người dùng "{options["user"]}".')
+        try:
+            report = run_concurrency_benchmark(
+                user=user,
+                names=options['only'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                wsgi_threads=options['wsgi_threads'],
+                db_latency_ms=options['db_latency_ms'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        for result in report['results']:
+            wsgi, asgi = result['wsgi'], result['asgi']
+            self.stderr.write(
+                f"{result['name']:<22} WSGI {wsgi['throughput_rps'] or 0:>8.1f} req/s (p99 {wsgi['p99_ms']:.1f}ms)  "
+                f"ASGI {asgi['throughput_rps'] or 0:>8.1f} req/s (p99 {asgi['p99_ms']:.1f}ms)  x{result['speedup'] or 0:.2f}"
+            )
+        for skipped in report['skipped']:
+            self.stderr.write(self.style.WARNING(f"Bỏ qua {skipped['name']}: thiếu {', '.join(skipped['missing'])}"))
@@ -0,0 +1,51 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import run_render_benchmark
+
+
+class Command(BaseCommand):
+
+    help = (
+        'So sánh thời gian render JSON của JSONRenderer gốc với FastJSONRenderer (orjson) cho chi tiết '
+        'công thức và trang đề xuất, kèm số byte sau khi nén gzip/brotli.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Tên người dùng dùng để đo. Mặc định: người dùng đầu tiên có tủ lạnh.')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--page-size', type=int, default=100, help='Số công thức trong trang đề xuất.')
+        parser.add_argument('--output', help='Ghi kết quả ra file JSON thay vì stdout.')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = get_user_model().objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f'Không tìm thấy người dùng "{options["user"]}".')
+        try:
+            report = run_render_benchmark(user=user, iterations=options['iterations'], warmup=options['warmup'], suggestion_page_size=options['page_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        if not report['meta']['fast_json']:
+            self.stderr.write(self.style.WARNING('orjson chưa được cài: FastJSONRenderer đang dùng json chuẩn.'))
+        for result in report['results']:
+            encodings = '  '.join(f"{encoding} {row['bytes']} byte ({row['compress_p50_ms']:.3f}ms)" for encoding, row in result['encodings'].items())
+            line = (
+                f"{result['name']:<22} JSONRenderer {result['json_renderer_p50_ms']:>7.3f}ms  "
+                f"nhanh {result['fast_renderer_p50_ms']:>7.3f}ms  x{result['speedup']}  {result['bytes']} byte  {encodings}"
+            )
+            self.stderr.write(line if result['identical'] else self.style.ERROR(line + '  KHÁC NHAU'))
+        if not all(result['identical'] for result in report['results']):
+            raise CommandError('JSON của FastJSONRenderer khác JSONRenderer.')
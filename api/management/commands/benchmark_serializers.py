@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import run_serializer_benchmark
+
+
+class Command(BaseCommand):
+
+    help = (
+        'So sánh thời gian serialize danh sách công thức của ModelSerializer với đường đọc nhanh '
+        '(api/compact.py) và kiểm tra JSON của hai bên giống nhau từng byte.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200, help='Số công thức trong mỗi lần serialize.')
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--output', help='Ghi kết quả ra file JSON thay vì stdout.')
+
+    def handle(self, *args, **options):
+        try:
+            report = run_serializer_benchmark(count=options['count'], iterations=options['iterations'], warmup=options['warmup'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(payload + '\n')
+        else:
+            self.stdout.write(payload)
+
+        for result in report['results']:
+            line = (
+                f"{result['name']:<20} ModelSerializer {result['model_serializer_p50_ms']:>8.3f}ms  "
+                f"compact {result['compact_p50_ms']:>8.3f}ms  x{result['speedup']}  {result['bytes']} byte"
+            )
+            self.stderr.write(line if result['identical'] else self.style.ERROR(line + '  KHÁC NHAU'))
+        if not all(result['identical'] for result in report['results']):
+            raise CommandError('JSON của serializer gọn khác ModelSerializer.')
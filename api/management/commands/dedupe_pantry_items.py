@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Min
+
+from api.models import PantryItems
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Gộp các dòng tủ lạnh trùng (cùng user_id, ingredient_id): giữ dòng cũ nhất, xóa các dòng còn lại. '
+        'Chạy trước migrate 0007 nếu migration báo có dòng trùng.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ liệt kê các dòng trùng, không xóa.')
+
+    def handle(self, *args, **options):
+        groups = list(
+            PantryItems.objects.values('user_id', 'ingredient_id')
+            .annotate(rows=Count('id'), keep_id=Min('id'))
+            .filter(rows__gt=1)
+            .order_by('user_id', 'ingredient_id')
+        )
+        if not groups:
+            self.stdout.write(self.style.SUCCESS('Không có dòng tủ lạnh trùng.'))
+            return
+
+        deleted = 0
+        for group in groups:
+            duplicates = PantryItems.objects.filter(user_id=group['user_id'], ingredient_id=group['ingredient_id']).exclude(id=group['keep_id'])
+            quantities = ', '.join(repr(quantity) for quantity in duplicates.values_list('quantity', flat=True))
+            self.stdout.write(
+                f'user_id={group["user_id"]} ingredient_id={group["ingredient_id"]}: giữ dòng {group["keep_id"]}, '
+                f'{"sẽ xóa" if options["dry_run"] else "xóa"} {group["rows"] - 1} dòng (số lượng: {quantities})'
+            )
+            if not options['dry_run']:
+                # Xóa qua ORM để tín hiệu ghi change_log và làm mới đề xuất như khi người dùng tự xóa
+                with transaction.atomic():
+                    deleted += duplicates.delete()[0]
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(groups)} nhóm dòng trùng, chưa xóa gì (--dry-run).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} dòng trùng trong {len(groups)} nhóm.'))
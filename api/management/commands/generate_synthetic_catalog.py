@@ -0,0 +1,126 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Recipes, Ingredients, RecipeIngredients, PantryItems, FavoriteRecipes
+from api.quantities import quantity_fields
+from api.signals import notify_recipes_changed
+
+
+def zipf_weights(count, exponent):
+    # Trọng số Zipf: phần tử thứ k có xác suất tỉ lệ với 1 / k^s
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def weighted_sample(rng, population, weights, size):
+    # Lấy `size` phần tử khác nhau, phần tử có trọng số lớn dễ được chọn hơn
+    size = min(size, len(population))
+    chosen = set()
+    while len(chosen) < size:
+        chosen.update(rng.choices(population, weights=weights, k=size - len(chosen)))
+    return list(chosen)
+
+
+class Command(BaseCommand):
+
+    help = 'Sinh dữ liệu giả lập (người dùng, nguyên liệu, công thức, tủ lạnh, yêu thích) để đo hiệu năng.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--ingredients', type=int, default=500)
+        parser.add_argument('--max-ingredients', type=int, default=25, help='Số nguyên liệu tối đa của một công thức.')
+        parser.add_argument('--zipf', type=float, default=1.2, help='Số mũ Zipf cho số nguyên liệu mỗi công thức và độ phổ biến nguyên liệu.')
+        parser.add_argument('--pantry-size', type=int, default=15, help='Số nguyên liệu trung bình trong tủ lạnh mỗi người.')
+        parser.add_argument('--favorites', type=int, default=5, help='Số công thức yêu thích trung bình mỗi người.')
+        parser.add_argument('--password', default='benchmark123', help='Mật khẩu chung của người dùng giả lập.')
+        parser.add_argument('--prefix', default='synthetic', help='Tiền tố tên để phân biệt với dữ liệu thật.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        if options['users'] < 1 or options['ingredients'] < 1:
+            raise CommandError('Cần ít nhất một người dùng và một nguyên liệu.')
+        User = get_user_model()
+        if User.objects.filter(username__startswith=f'{prefix}_user_').exists():
+            raise CommandError(f'Đã có dữ liệu với tiền tố "{prefix}", hãy dùng --prefix khác.')
+
+        with transaction.atomic():
+            # --- NGƯỜI DÙNG --- (băm mật khẩu một lần cho tất cả)
+            password = make_password(options['password'])
+            User.objects.bulk_create(
+                [User(username=f'{prefix}_user_{i}', email=f'{prefix}_user_{i}@example.com', password=password) for i in range(options['users'])],
+                batch_size=batch_size,
+            )
+            user_ids = list(User.objects.filter(username__startswith=f'{prefix}_user_').values_list('id', flat=True))
+
+            # --- NGUYÊN LIỆU --- rải đều qua mọi nhóm
+            categories = list(Ingredients.Category.values)
+            Ingredients.objects.bulk_create(
+                [
+                    Ingredients(name=f'{prefix} nguyên liệu {i}', status=Ingredients.Status.APPROVED, category=categories[i % len(categories)])
+                    for i in range(options['ingredients'])
+                ],
+                batch_size=batch_size,
+            )
+            ingredient_ids = list(Ingredients.objects.filter(name__startswith=f'{prefix} nguyên liệu ').order_by('id').values_list('id', flat=True))
+            popularity = zipf_weights(len(ingredient_ids), options['zipf'])
+
+            # --- CÔNG THỨC --- số nguyên liệu theo phân phối Zipf
+            sizes = list(range(1, options['max_ingredients'] + 1))
+            size_weights = zipf_weights(len(sizes), options['zipf'])
+            statuses = [Recipes.Status.PUBLIC] * 8 + [Recipes.Status.PRIVATE, Recipes.Status.PENDING]
+            Recipes.objects.bulk_create(
+                [
+                    Recipes(
+                        title=f'{prefix} món {i}',
+                        description=f'Món ăn giả lập số {i}',
+                        instructions='Sơ chế, nấu chín và dọn ra đĩa.',
+                        difficulty=rng.choice(Recipes.Difficulty.values),
+                        cooking_time_minutes=rng.choice([None, 10, 15, 20, 30, 45, 60, 90]),
+                        author_id=rng.choice(user_ids),
+                        status=rng.choice(statuses),
+                    )
+                    for i in range(options['recipes'])
+                ],
+                batch_size=batch_size,
+            )
+            recipe_ids = list(Recipes.objects.filter(title__startswith=f'{prefix} món ').order_by('id').values_list('id', flat=True))
+
+            recipe_ingredients = []
+            for recipe_id in recipe_ids:
+                size = rng.choices(sizes, weights=size_weights)[0]
+                for ingredient_id in weighted_sample(rng, ingredient_ids, popularity, size):
+                    quantity = f'{rng.randint(1, 500)}g'
+                    recipe_ingredients.append(RecipeIngredients(recipe_id=recipe_id, ingredient_id=ingredient_id, quantity=quantity, **quantity_fields(quantity)))
+            RecipeIngredients.objects.bulk_create(recipe_ingredients, batch_size=batch_size)
+
+            # --- TỦ LẠNH VÀ YÊU THÍCH ---
+            pantry_items = []
+            favorites = []
+            for user_id in user_ids:
+                pantry_size = max(1, int(rng.expovariate(1.0 / options['pantry_size'])))
+                for ingredient_id in weighted_sample(rng, ingredient_ids, popularity, pantry_size):
+                    quantity = str(rng.randint(1, 5))
+                    pantry_items.append(PantryItems(user_id=user_id, ingredient_id=ingredient_id, quantity=quantity, **quantity_fields(quantity)))
+                if recipe_ids and options['favorites']:
+                    favorite_count = int(rng.expovariate(1.0 / options['favorites']))
+                    for recipe_id in rng.sample(recipe_ids, min(favorite_count, len(recipe_ids))):
+                        favorites.append(FavoriteRecipes(user_id=user_id, recipe_id=recipe_id))
+            PantryItems.objects.bulk_create(pantry_items, batch_size=batch_size)
+            FavoriteRecipes.objects.bulk_create(favorites, batch_size=batch_size)
+
+            # bulk_create không phát tín hiệu: tự cập nhật recipe_profiles và cache
+            for start in range(0, len(recipe_ids), batch_size):
+                notify_recipes_changed(recipe_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã tạo {len(user_ids)} người dùng, {len(ingredient_ids)} nguyên liệu, {len(recipe_ids)} công thức '
+            f'({len(recipe_ingredients)} dòng nguyên liệu), {len(pantry_items)} mục tủ lạnh, {len(favorites)} yêu thích.'
+        ))
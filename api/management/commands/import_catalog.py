@@ -0,0 +1,66 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.catalog_import import import_catalog, detect_format, FORMATS, DEFAULT_BATCH_SIZE
+from api.models import Recipes
+
+
+class Command(BaseCommand):
+
+    help = (
+        'Nhập hàng loạt công thức từ file CSV hoặc NDJSON theo lô (bulk_create trong transaction). '
+        'Chạy lại cùng file sẽ tiếp tục từ lô chưa hoàn tất.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Đường dẫn file .csv, .ndjson hoặc .jsonl')
+        parser.add_argument('--format', choices=FORMATS, help='Mặc định: đoán theo phần mở rộng của file.')
+        parser.add_argument('--author', help='Tên người dùng đứng tên các công thức. Mặc định: superuser đầu tiên.')
+        parser.add_argument('--status', choices=Recipes.Status.values, default=Recipes.Status.PUBLIC)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--restart', action='store_true', help='Bỏ điểm khôi phục cũ và nhập lại từ đầu.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size phải lớn hơn 0.')
+        format = options['format'] or detect_format(options['path'])
+        if format is None:
+            raise CommandError('Không đoán được định dạng, hãy dùng --format csv|ndjson.')
+
+        users = get_user_model().objects
+        author = users.filter(username=options['author']).first() if options['author'] else users.filter(is_superuser=True).order_by('id').first()
+        if author is None:
+            raise CommandError('Không tìm thấy người dùng đứng tên công thức, hãy dùng --author.')
+
+        def progress(report):
+            self.stderr.write(
+                f"Lô {report['batches']}: {report['resumed_from'] + report['records']} bản ghi, "
+                f"{report['recipes_created']} công thức, {report['ingredients_created']} nguyên liệu mới, "
+                f"{report['rows_skipped']} dòng lỗi"
+            )
+
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_catalog(
+                    source, format, author,
+                    source_name=options['path'],
+                    status=options['status'],
+                    batch_size=options['batch_size'],
+                    restart=options['restart'],
+                    progress=progress,
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+        if not report['batches'] and report['status'] == 'completed':
+            self.stderr.write(self.style.WARNING('File này đã được nhập xong trước đó, dùng --restart để nhập lại.'))
+            return
+        if report['resumed_from']:
+            self.stderr.write(f"Tiếp tục từ bản ghi thứ {report['resumed_from'] + 1}.")
+        self.stderr.write(self.style.SUCCESS(
+            f"Đã nhập {report['recipes_created']} công thức trong {report['elapsed_s']}s "
+            f"({report['recipes_per_s']} công thức/s), bỏ qua {report['rows_skipped']} dòng lỗi."
+        ))
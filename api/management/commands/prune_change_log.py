@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.sync import prune_change_log
+
+
+class Command(BaseCommand):
+
+    help = 'Xóa nhật ký thay đổi (change_log) cũ; client có cursor cũ hơn sẽ được yêu cầu tải lại toàn bộ.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Giữ lại bao nhiêu ngày (mặc định SYNC_RETENTION_DAYS).')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.SYNC_RETENTION_DAYS
+        deleted = prune_change_log(days)
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} dòng nhật ký cũ hơn {days} ngày.'))
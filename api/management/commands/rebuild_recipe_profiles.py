@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from api.models import Recipes
+from api.recipe_profiles import refresh_recipe_profiles
+
+
+class Command(BaseCommand):
+
+    help = 'Tính lại toàn bộ bảng recipe_profiles từ recipe_ingredients (dùng khi triển khai lần đầu hoặc sửa dữ liệu).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = list(Recipes.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            refresh_recipe_profiles(recipe_ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Đã cập nhật hồ sơ cho {len(recipe_ids)} công thức.'))
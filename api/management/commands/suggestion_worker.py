@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from api.suggestion_worker import SuggestionWorker
+
+
+class Command(BaseCommand):
+
+    help = 'Tiến trình nền tính sẵn đề xuất cho người dùng khi tủ lạnh, yêu thích hoặc catalog thay đổi (đọc change_log).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='Số giây giữa hai lần đọc nhật ký thay đổi.')
+        parser.add_argument('--debounce', type=float, default=None, help='Mặc định SUGGESTION_PRECOMPUTE_DEBOUNCE.')
+        parser.add_argument('--max-delay', type=float, default=None, help='Mặc định SUGGESTION_PRECOMPUTE_MAX_DELAY.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--once', action='store_true', help='Chỉ tính lại cho mọi người dùng đang hoạt động rồi thoát.')
+
+    def handle(self, *args, **options):
+        worker = SuggestionWorker(
+            debounce=options['debounce'],
+            max_delay=options['max_delay'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        if options['once']:
+            count = worker.start()
+            self.stdout.write(self.style.SUCCESS(f'Đã tính sẵn đề xuất cho {count} người dùng.'))
+            return
+        self.stdout.write('Đang chạy, nhấn Ctrl+C để dừng.')
+        try:
+            worker.run(interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Đã dừng.'))
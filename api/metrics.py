@@ -0,0 +1,256 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+
+# Ngưỡng (giây) của histogram thời gian xử lý, giống mặc định của Prometheus client
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Số câu SQL giống hệt nhau trong một request để bị coi là dấu hiệu N+1
+N_PLUS_ONE_THRESHOLD = 5
+# Số mẫu câu SQL N+1 giữ lại cho mỗi route
+MAX_SIGNATURES_PER_ROUTE = 20
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def current_metrics():
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    # execute_wrapper gắn cố định vào mọi kết nối (xem install_query_recorder): ghi vào số liệu
+    # của request hiện tại nếu có. Dùng ContextVar thay vì gắn wrapper theo từng request vì
+    # view async chạy truy vấn trong luồng riêng của sync_to_async, với kết nối riêng của luồng đó.
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics(execute, sql, params, many, context)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # Receiver của tín hiệu connection_created (đăng ký trong api/apps.py)
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+# --- SỐ LIỆU CỦA MỘT REQUEST ---
+class RequestMetrics:
+    __slots__ = ('started', 'db_time', 'query_count', 'signatures', 'serializer_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.query_count = 0
+        # Câu SQL đã tham số hóa (%s) -> số lần chạy; chính nó là "chữ ký" để phát hiện N+1
+        self.signatures = {}
+        self.serializer_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Dùng làm connection.execute_wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+            self.signatures[sql] = self.signatures.get(sql, 0) + 1
+
+    def repeated_queries(self, threshold=None):
+        threshold = threshold or getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+        return {sql: count for sql, count in self.signatures.items() if count >= threshold}
+
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.signatures.values() if count > 1)
+
+    def server_timing(self, total):
+        parts = [
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"',
+        ]
+        if self.serializer_time:
+            parts.append(f'serialize;dur={self.serializer_time * 1000:.1f}')
+        duplicates = self.duplicate_count()
+        if duplicates:
+            parts.append(f'dup;desc="{duplicates} duplicated queries"')
+        return ', '.join(parts)
+
+
+# --- TỔNG HỢP THEO ROUTE ---
+class _RouteStats:
+    __slots__ = ('count', 'duration_sum', 'db_time_sum', 'serializer_time_sum', 'query_sum', 'query_max', 'buckets', 'n_plus_one', 'signatures', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.duration_sum = 0.0
+        self.db_time_sum = 0.0
+        self.serializer_time_sum = 0.0
+        self.query_sum = 0
+        self.query_max = 0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+        self.n_plus_one = 0
+        self.signatures = {}
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    # Histogram theo (method, route) trong bộ nhớ tiến trình. Mỗi worker có số liệu riêng,
+    # Prometheus cộng lại khi scrape từng worker.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, method, route, status_code, duration, metrics):
+        repeated = metrics.repeated_queries()
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = _RouteStats()
+            stats.count += 1
+            stats.duration_sum += duration
+            stats.db_time_sum += metrics.db_time
+            stats.serializer_time_sum += metrics.serializer_time
+            stats.query_sum += metrics.query_count
+            stats.query_max = max(stats.query_max, metrics.query_count)
+            stats.buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+            stats.statuses[status_code] = stats.statuses.get(status_code, 0) + 1
+            if repeated:
+                stats.n_plus_one += 1
+                for sql, count in repeated.items():
+                    if sql in stats.signatures or len(stats.signatures) < MAX_SIGNATURES_PER_ROUTE:
+                        stats.signatures[sql] = max(stats.signatures.get(sql, 0), count)
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def snapshot(self):
+        with self._lock:
+            routes = []
+            for (method, route), stats in sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0])):
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(DURATION_BUCKETS + (float('inf'),), stats.buckets):
+                    cumulative += count
+                    histogram['+Inf' if bound == float('inf') else str(bound)] = cumulative
+                routes.append({
+                    'method': method,
+                    'route': route,
+                    'count': stats.count,
+                    'mean_ms': round(stats.duration_sum / stats.count * 1000, 3),
+                    'db_mean_ms': round(stats.db_time_sum / stats.count * 1000, 3),
+                    'serializer_mean_ms': round(stats.serializer_time_sum / stats.count * 1000, 3),
+                    'queries_mean': round(stats.query_sum / stats.count, 2),
+                    'queries_max': stats.query_max,
+                    'n_plus_one_requests': stats.n_plus_one,
+                    'n_plus_one_signatures': [{'sql': sql[:500], 'count': count} for sql, count in stats.signatures.items()],
+                    'statuses': {str(code): count for code, count in sorted(stats.statuses.items())},
+                    'duration_histogram': histogram,
+                })
+            return routes
+
+    def prometheus(self):
+        # Định dạng text exposition 0.0.4 của Prometheus
+        lines = [
+            '# HELP dss_http_request_duration_seconds Thời gian xử lý request.',
+            '# TYPE dss_http_request_duration_seconds histogram',
+        ]
+        with self._lock:
+            items = sorted(self._routes.items(), key=lambda item: (item[0][1], item[0][0]))
+            for (method, route), stats in items:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS + (float('inf'),), stats.buckets):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'dss_http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'dss_http_request_duration_seconds_sum{{{labels}}} {stats.duration_sum}')
+                lines.append(f'dss_http_request_duration_seconds_count{{{labels}}} {stats.count}')
+            for name, help_text, value in (
+                ('dss_http_request_db_seconds_total', 'Tổng thời gian chờ CSDL.', lambda s: s.db_time_sum),
+                ('dss_http_request_serializer_seconds_total', 'Tổng thời gian serializer.', lambda s: s.serializer_time_sum),
+                ('dss_http_request_queries_total', 'Tổng số câu SQL.', lambda s: s.query_sum),
+                ('dss_http_request_n_plus_one_total', 'Số request có câu SQL lặp lại (nghi N+1).', lambda s: s.n_plus_one),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (method, route), stats in items:
+                    lines.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {value(stats)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics_registry = MetricsRegistry()
+
+
+def _route_label(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else match.view_name
+
+
+# --- MIDDLEWARE ---
+class RequestMetricsMiddleware:
+    # Đo thời gian tổng, thời gian CSDL, số câu SQL, câu SQL lặp lại và thời gian serializer
+    # (qua MetricsMixin) cho mỗi request; trả về header Server-Timing và cộng dồn vào
+    # metrics_registry. Chi phí chỉ là một execute_wrapper và vài phép cộng cho mỗi câu SQL.
+    # Chạy được cả dưới WSGI lẫn ASGI (không ép view async chạy qua luồng đồng bộ).
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return await self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        duration = time.perf_counter() - metrics.started
+        response['Server-Timing'] = metrics.server_timing(duration)
+        metrics_registry.record(request.method, _route_label(request), response.status_code, duration, metrics)
+        return response
+
+
+# --- QUYỀN ĐỌC SỐ LIỆU ---
+class IsAdminOrMetricsToken(BasePermission):
+    # Quản trị viên, hoặc máy scrape gửi header X-Metrics-Token khớp METRICS_TOKEN
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        expected = getattr(settings, 'METRICS_TOKEN', '')
+        provided = request.META.get('HTTP_X_METRICS_TOKEN', '')
+        return bool(expected) and constant_time_compare(provided, expected)
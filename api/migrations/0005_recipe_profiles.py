@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_auto_20251104_1456'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeProfiles',
+            fields=[
+                ('recipe', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to='api.recipes')),
+                ('author_id', models.IntegerField()),
+                ('status', models.CharField(choices=[('private', 'Riêng tư'), ('pending_approval', 'Chờ duyệt'), ('public', 'Công khai'), ('rejected', 'Bị từ chối')], max_length=20)),
+                ('non_staple_count', models.IntegerField(default=0)),
+                ('penalty_weight', models.FloatField(default=0.0)),
+                ('ingredient_ids', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'recipe_profiles',
+            },
+        ),
+    ]
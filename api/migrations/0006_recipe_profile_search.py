@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:00
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+def create_search_index(apps, schema_editor):
+    # Chỉ mục GIN cho tsvector chỉ có trên PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS recipe_profiles_search_vector_gin '
+        'ON recipe_profiles USING GIN (search_vector)'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS recipe_profiles_search_vector_gin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_recipe_profiles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeprofiles',
+            name='search_description',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='recipeprofiles',
+            name='search_ingredients',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='recipeprofiles',
+            name='search_title',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='recipeprofiles',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
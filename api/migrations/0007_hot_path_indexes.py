@@ -0,0 +1,118 @@
+from django.core.management.base import CommandError
+from django.db import migrations
+
+# Các chỉ mục cho những truy vấn thường gặp trong api/views.py:
+# (tên chỉ mục, bảng, các cột, unique)
+HOT_PATH_INDEXES = [
+    # update_or_create / upsert tủ lạnh; database.sql đã có ràng buộc này nhưng các CSDL tạo
+    # trước đó có thể chưa có
+    ('pantry_items_user_ingredient_uniq', 'pantry_items', ['user_id', 'ingredient_id'], True),
+    # Danh sách công thức công khai, mới nhất trước (phân trang keyset theo created_at, id)
+    ('recipes_status_created_at_idx', 'recipes', ['status', 'created_at', 'id'], False),
+    # Tìm công thức theo nguyên liệu (danh sách đen, xóa nguyên liệu, làm mới recipe_profiles)
+    ('recipe_ingredients_ingredient_recipe_idx', 'recipe_ingredients', ['ingredient_id', 'recipe_id'], False),
+    ('favorite_recipes_user_idx', 'favorite_recipes', ['user_id'], False),
+    ('shopping_list_items_user_idx', 'shopping_list_items', ['user_id'], False),
+    # Danh sách nguyên liệu đã duyệt, sắp xếp theo tên
+    ('ingredients_status_name_idx', 'ingredients', ['status', 'name'], False),
+]
+
+# Các chỉ mục hiện có của một bảng: danh sách cột theo thứ tự và cờ unique
+EXISTING_INDEXES_SQL = '''
+    SELECT i.indisunique, array_agg(a.attname ORDER BY k.ordinality)
+    FROM pg_index i
+    JOIN pg_class t ON t.oid = i.indrelid
+    JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ordinality) ON TRUE
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+    WHERE t.relname = %s AND t.relnamespace = 'public'::regnamespace
+      AND i.indisvalid AND i.indpred IS NULL
+    GROUP BY i.indexrelid, i.indisunique
+'''
+
+
+def _is_covered(cursor, table, columns, unique):
+    # Bỏ qua nếu đã có chỉ mục bắt đầu bằng đúng các cột này (unique thì phải khớp hoàn toàn),
+    # tránh tạo chỉ mục thừa làm chậm thao tác ghi
+    cursor.execute(EXISTING_INDEXES_SQL, [table])
+    for is_unique, existing in cursor.fetchall():
+        if unique:
+            if is_unique and list(existing) == columns:
+                return True
+        elif list(existing[:len(columns)]) == columns:
+            return True
+    return False
+
+
+# Số nhóm dòng trùng liệt kê trong thông báo lỗi
+DUPLICATES_SHOWN = 20
+
+
+def _check_duplicates(cursor, table, columns):
+    # Không tự xóa dữ liệu trong migration: dừng lại, liệt kê các dòng trùng và để người vận hành
+    # gộp chúng bằng lệnh riêng (dedupe_pantry_items) rồi chạy lại migrate
+    column_list = ', '.join(columns)
+    cursor.execute(
+        f'SELECT {column_list}, array_agg(id ORDER BY id) FROM {table} '
+        f'GROUP BY {column_list} HAVING count(*) > 1 ORDER BY {column_list}'
+    )
+    duplicates = cursor.fetchall()
+    if not duplicates:
+        return
+    lines = [
+        ', '.join(f'{column}={value}' for column, value in zip(columns, row[:-1])) + f': id {list(row[-1])}'
+        for row in duplicates[:DUPLICATES_SHOWN]
+    ]
+    if len(duplicates) > DUPLICATES_SHOWN:
+        lines.append(f'... và {len(duplicates) - DUPLICATES_SHOWN} nhóm khác')
+    raise CommandError(
+        f'Không tạo được chỉ mục duy nhất trên {table} ({column_list}): có {len(duplicates)} nhóm dòng trùng.\n'
+        + '\n'.join(lines)
+        + '\nChạy "python manage.py dedupe_pantry_items --dry-run" để xem, bỏ --dry-run để gộp, rồi chạy lại migrate.'
+    )
+
+
+INVALID_INDEX_SQL = '''
+    SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+    WHERE c.relname = %s AND NOT i.indisvalid
+'''
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name, table, columns, unique in HOT_PATH_INDEXES:
+            if _is_covered(cursor, table, columns, unique):
+                continue
+            # Lần tạo CONCURRENTLY trước bị lỗi sẽ để lại chỉ mục INVALID cùng tên
+            cursor.execute(INVALID_INDEX_SQL, [name])
+            if cursor.fetchone():
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            if unique:
+                _check_duplicates(cursor, table, columns)
+            # CONCURRENTLY: không khóa ghi bảng trong lúc tạo chỉ mục (cần migration atomic = False)
+            cursor.execute(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} ({", ".join(columns)})'
+            )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name, _, _, _ in HOT_PATH_INDEXES:
+            cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('api', '0006_recipe_profile_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_catalog_imports'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntries',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('ingredient', 'Nguyên liệu'), ('recipe', 'Công thức'), ('pantry', 'Tủ lạnh'), ('shopping_list', 'Danh sách mua sắm'), ('favorite', 'Yêu thích')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('action', models.CharField(choices=[('created', 'Tạo mới'), ('updated', 'Cập nhật'), ('deleted', 'Xóa')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'change_log',
+                'indexes': [models.Index(fields=['user_id', 'id'], name='change_log_user_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+# Cột lượng đã chuẩn hóa (xem api/quantities.py) cho các bảng tạo từ database.sql (managed = False).
+# Chỉ thêm cột, không điền dữ liệu: chạy `python manage.py backfill_quantities` sau khi migrate.
+QUANTITY_TABLES = ['pantry_items', 'recipe_ingredients', 'shopping_list_items']
+QUANTITY_COLUMNS = [
+    ('amount', 'numeric(12, 3) NULL'),
+    ('base_unit', 'varchar(20) NULL'),
+]
+
+
+def _existing_columns(connection, cursor, table):
+    return {column.name for column in connection.introspection.get_table_description(cursor, table)}
+
+
+def add_columns(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for table in QUANTITY_TABLES:
+            # CSDL SQLite cục bộ tạo bảng từ model (đã có sẵn cột) hoặc chưa có bảng
+            if table not in tables:
+                continue
+            existing = _existing_columns(connection, cursor, table)
+            for column, definition in QUANTITY_COLUMNS:
+                if column not in existing:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def drop_columns(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for table in QUANTITY_TABLES:
+            if table not in tables:
+                continue
+            existing = _existing_columns(connection, cursor, table)
+            for column, _ in QUANTITY_COLUMNS:
+                if column in existing:
+                    cursor.execute(f'ALTER TABLE {table} DROP COLUMN {column}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_precomputed_suggestions'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_columns, drop_columns),
+    ]
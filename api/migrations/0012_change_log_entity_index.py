@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_quantity_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='changelogentries',
+            index=models.Index(fields=['entity', 'id'], name='change_log_entity_id_idx'),
+        ),
+    ]
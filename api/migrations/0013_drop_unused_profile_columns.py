@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:09
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_change_log_entity_index'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='recipeprofiles',
+            name='non_staple_count',
+        ),
+        migrations.RemoveField(
+            model_name='recipeprofiles',
+            name='penalty_weight',
+        ),
+    ]
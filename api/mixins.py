@@ -0,0 +1,103 @@
+import time
+
+from django.db.models import Prefetch
+
+from .compact import CompactListSerializer, compact_serializer, parse_fields
+from .metrics import current_metrics
+from .models import RecipeIngredients
+
+
+# --- ĐỊNH HÌNH TRUY VẤN THEO NHU CẦU CỦA SERIALIZER ---
+class QueryShapingMixin:
+    # Mỗi view khai báo các quan hệ mà serializer của nó đọc tới, để số truy vấn
+    # không tăng theo số dòng trả về (tránh N+1). Áp dụng trong filter_queryset
+    # vì đây là điểm chung của cả list lẫn get_object trong DRF, kể cả khi view
+    # tự định nghĩa get_queryset.
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def get_select_related_fields(self):
+        return self.select_related_fields
+
+    def get_prefetch_related_fields(self):
+        return self.prefetch_related_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select_related_fields = self.get_select_related_fields()
+        prefetch_related_fields = self.get_prefetch_related_fields()
+        if select_related_fields:
+            queryset = queryset.select_related(*select_related_fields)
+        if prefetch_related_fields:
+            queryset = queryset.prefetch_related(*prefetch_related_fields)
+        return queryset
+
+
+# --- ĐƯỜNG ĐỌC NHANH CHO DANH SÁCH (api/compact.py) ---
+class CompactListMixin:
+    # GET danh sách dùng CompactSerializer thay cho serializer_class(many=True), chỉ nạp các cột
+    # cần cho trường được chọn (.only()) và bỏ compact_heavy_fields trừ khi ?fields= yêu cầu.
+    # Các cột dùng để sắp xếp / phân trang keyset luôn được nạp, nếu không mỗi dòng sẽ tốn
+    # thêm một truy vấn khi paginator đọc tới. Đặt sau MetricsMixin để vẫn đo thời gian serializer.
+    compact_heavy_fields = ()
+    compact_extra_columns = ()
+
+    def use_compact(self):
+        return self.request.method in ('GET', 'HEAD')
+
+    def get_compact_serializer(self):
+        compact = getattr(self, '_compact', None)
+        if compact is None:
+            serializer_class = self.get_serializer_class()
+            fields = parse_fields(self.request, serializer_class, self.compact_heavy_fields)
+            compact = self._compact = compact_serializer(serializer_class, fields)
+        return compact
+
+    def get_compact_columns(self):
+        columns = ['id'] + self.get_compact_serializer().columns + list(self.compact_extra_columns)
+        return list(dict.fromkeys(columns))
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.use_compact():
+            queryset = queryset.only(*self.get_compact_columns())
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and self.use_compact():
+            return CompactListSerializer(args[0], self.get_compact_serializer())
+        return super().get_serializer(*args, **kwargs)
+
+
+# Nguyên liệu của công thức kèm tên nguyên liệu, nạp trong một truy vấn
+RECIPE_INGREDIENTS_PREFETCH = Prefetch('ingredients', queryset=RecipeIngredients.objects.select_related('ingredient'))
+
+
+# --- ĐO THỜI GIAN SERIALIZER ---
+class TimedSerializer:
+    # Vỏ bọc serializer (như CompactListSerializer): đo thời gian tính .data, mọi thuộc tính
+    # khác (is_valid, save, instance, errors...) chuyển thẳng cho serializer gốc, không đổi lớp của nó
+    def __init__(self, serializer):
+        self.serializer = serializer
+
+    def __getattr__(self, name):
+        return getattr(self.serializer, name)
+
+    @property
+    def data(self):
+        started = time.perf_counter()
+        try:
+            return self.serializer.data
+        finally:
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.serializer_time += time.perf_counter() - started
+
+
+class MetricsMixin:
+    # Ghi thời gian serializer vào số liệu của request hiện tại (xem api/metrics.py)
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if current_metrics() is not None:
+            return TimedSerializer(serializer)
+        return serializer
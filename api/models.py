@@ -1,4 +1,5 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 # Các model nội bộ của Django không cần định nghĩa ở đây
@@ -78,16 +79,23 @@ class PantryItems(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, models.DO_NOTHING, blank=True, null=True)
     ingredient = models.ForeignKey(Ingredients, models.DO_NOTHING, blank=True, null=True)
     quantity = models.CharField(max_length=50, blank=True, null=True)
+    # Lượng đã quy về đơn vị chuẩn, điền từ cột chữ (xem api/quantities.py)
+    amount = models.DecimalField(max_digits=12, decimal_places=3, blank=True, null=True)
+    base_unit = models.CharField(max_length=20, blank=True, null=True)
 
     class Meta:
         managed = False
         db_table = 'pantry_items'
+        unique_together = (('user', 'ingredient'),)
 
 class RecipeIngredients(models.Model):
     recipe = models.ForeignKey('Recipes', related_name='ingredients', on_delete=models.CASCADE)
     ingredient = models.ForeignKey(Ingredients, models.DO_NOTHING)
     quantity = models.CharField(max_length=100)
     unit = models.CharField(max_length=50, blank=True, null=True)
+    # Lượng đã quy về đơn vị chuẩn, điền từ cột chữ (xem api/quantities.py)
+    amount = models.DecimalField(max_digits=12, decimal_places=3, blank=True, null=True)
+    base_unit = models.CharField(max_length=20, blank=True, null=True)
 
     class Meta:
         managed = False
@@ -99,10 +107,14 @@ class ShoppingListItems(models.Model):
     ingredient = models.ForeignKey(Ingredients, models.DO_NOTHING, blank=True, null=True)
     is_checked = models.BooleanField(blank=True, null=True)
     quantity = models.CharField(max_length=100, blank=True, null=True)
+    # Lượng đã quy về đơn vị chuẩn, điền từ cột chữ (xem api/quantities.py)
+    amount = models.DecimalField(max_digits=12, decimal_places=3, blank=True, null=True)
+    base_unit = models.CharField(max_length=20, blank=True, null=True)
 
     class Meta:
         managed = False
         db_table = 'shopping_list_items'
+        unique_together = (('user', 'ingredient'),)
 
 class FavoriteRecipes(models.Model):
     # Bảng đã được cập nhật để có cột id làm primary key
@@ -115,3 +127,103 @@ class FavoriteRecipes(models.Model):
         managed = False  # Django không quản lý schema
         db_table = 'favorite_recipes'
         unique_together = (('user', 'recipe'),)  # Duy trì ràng buộc duy nhất
+
+
+class RecipeProfiles(models.Model):
+    # Bảng tóm tắt (denormalized) cho mỗi công thức, do Django quản lý.
+    # Được cập nhật từng phần mỗi khi công thức/nguyên liệu thay đổi (xem api/recipe_profiles.py)
+    # để việc đề xuất chỉ cần đọc một dòng hẹp cho mỗi công thức thay vì JOIN recipe_ingredients.
+    recipe = models.OneToOneField(Recipes, on_delete=models.CASCADE, primary_key=True, related_name='profile', db_constraint=False)
+    author_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=Recipes.Status.choices)
+    # Danh sách id mọi nguyên liệu của công thức, đã sắp xếp tăng dần
+    ingredient_ids = models.JSONField(default=list)
+    # Văn bản tìm kiếm đã bỏ dấu (xem api/text.py) và tsvector tương ứng trên PostgreSQL
+    search_title = models.TextField(blank=True, default='')
+    search_description = models.TextField(blank=True, default='')
+    search_ingredients = models.TextField(blank=True, default='')
+    search_vector = SearchVectorField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'recipe_profiles'
+
+
+class CatalogImports(models.Model):
+    # Điểm khôi phục của một lần nhập catalog hàng loạt (xem api/catalog_import.py).
+    # Mỗi file nguồn được nhận diện bằng SHA-256 nội dung; records_done là số bản ghi đầu vào
+    # đã xử lý xong và được ghi cùng transaction với lô công thức tương ứng, nên chạy lại
+    # cùng file sẽ tiếp tục đúng từ lô chưa hoàn tất.
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'Đang chạy'
+        COMPLETED = 'completed', 'Hoàn tất'
+        FAILED = 'failed', 'Lỗi'
+
+    checksum = models.CharField(max_length=64, unique=True)
+    source_name = models.CharField(max_length=255)
+    format = models.CharField(max_length=10)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING)
+    records_done = models.IntegerField(default=0)
+    recipes_created = models.IntegerField(default=0)
+    ingredients_created = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    # Một số lỗi đầu tiên: [{"record": số thứ tự, "error": "..."}]
+    errors = models.JSONField(default=list)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, models.SET_NULL, blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'catalog_imports'
+
+
+class ChangeLogEntries(models.Model):
+    # Nhật ký thay đổi cho đồng bộ tăng dần (xem api/change_log.py và api/sync.py). Mỗi dòng ghi
+    # một đối tượng vừa được tạo, sửa hoặc xóa (tombstone); id tăng dần chính là cursor của client.
+    # Dòng được ghi sau khi transaction gốc commit, user_id là chủ sở hữu với dữ liệu cá nhân
+    # (tủ lạnh, danh sách mua sắm, yêu thích) và NULL với catalog công khai.
+    class Entity(models.TextChoices):
+        INGREDIENT = 'ingredient', 'Nguyên liệu'
+        RECIPE = 'recipe', 'Công thức'
+        PANTRY = 'pantry', 'Tủ lạnh'
+        SHOPPING_LIST = 'shopping_list', 'Danh sách mua sắm'
+        FAVORITE = 'favorite', 'Yêu thích'
+
+    class Action(models.TextChoices):
+        CREATED = 'created', 'Tạo mới'
+        UPDATED = 'updated', 'Cập nhật'
+        DELETED = 'deleted', 'Xóa'
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=Entity.choices)
+    # Với yêu thích, object_id là id công thức
+    object_id = models.BigIntegerField()
+    user_id = models.IntegerField(blank=True, null=True)
+    action = models.CharField(max_length=10, choices=Action.choices)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'change_log'
+        indexes = [
+            models.Index(fields=['user_id', 'id'], name='change_log_user_id_idx'),
+            # load_precomputed: thay đổi catalog đầu tiên sau log_cursor của một kết quả tính sẵn
+            models.Index(fields=['entity', 'id'], name='change_log_entity_id_idx'),
+        ]
+
+
+class PrecomputedSuggestions(models.Model):
+    # Danh sách đề xuất đã xếp hạng của một người dùng theo từng chế độ, do tiến trình nền
+    # suggestion_worker tính sẵn (xem api/suggestion_worker.py). log_cursor là id change_log
+    # mà kết quả đã phản ánh; SuggestionView dùng nó để biết kết quả còn dùng được hay không.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, models.CASCADE)
+    mode = models.CharField(max_length=10)
+    # [[recipe_id, score], ...] theo đúng thứ tự của SuggestionIndex.suggest
+    ranked = models.JSONField(default=list)
+    # True nếu chỉ lưu SUGGESTION_PRECOMPUTE_TOP món đầu của danh sách
+    truncated = models.BooleanField(default=False)
+    log_cursor = models.BigIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'precomputed_suggestions'
+        unique_together = (('user', 'mode'),)
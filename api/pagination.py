@@ -0,0 +1,251 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _parse_ordering(ordering):
+    return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+
+def _order_by(fields, reverse):
+    # NULL luôn nằm cuối theo chiều tiến, để điều kiện keyset bên dưới nhất quán
+    nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+    expressions = []
+    for name, descending in fields:
+        if descending != reverse:
+            expressions.append(F(name).desc(**nulls))
+        else:
+            expressions.append(F(name).asc(**nulls))
+    return expressions
+
+
+def _after(fields, values):
+    # Các dòng đứng SAU vị trí `values` theo chiều tiến:
+    # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), NULL xếp cuối
+    (name, descending), value = fields[0], values[0]
+    rest = _after(fields[1:], values[1:]) if len(fields) > 1 else None
+    if value is None:
+        return Q(**{f'{name}__isnull': True}) & rest if rest is not None else Q(pk__in=[])
+    condition = Q(**{f"{name}__{'lt' if descending else 'gt'}": value}) | Q(**{f'{name}__isnull': True})
+    if rest is not None:
+        condition |= Q(**{name: value}) & rest
+    return condition
+
+
+def _before(fields, values):
+    # Các dòng đứng TRƯỚC vị trí `values` theo chiều tiến
+    (name, descending), value = fields[0], values[0]
+    rest = _before(fields[1:], values[1:]) if len(fields) > 1 else None
+    if value is None:
+        condition = Q(**{f'{name}__isnull': False})
+        if rest is not None:
+            condition |= Q(**{f'{name}__isnull': True}) & rest
+        return condition
+    condition = Q(**{f"{name}__{'gt' if descending else 'lt'}": value})
+    if rest is not None:
+        condition |= Q(**{name: value}) & rest
+    return condition
+
+
+# --- PHÂN TRANG KEYSET (CURSOR) ---
+class KeysetPagination(BasePagination):
+    # Phân trang keyset trên nhiều cột: trang tiếp theo được lọc bằng
+    # WHERE (created_at, id) < (giá trị cuối trang trước) nên trang sâu vẫn chỉ tốn O(page),
+    # không phải quét lại bằng OFFSET như phân trang theo số trang.
+    # View có thể khai báo keyset_ordering (hoặc get_keyset_ordering()), page_size và max_page_size riêng;
+    # API_MAX_PAGE_SIZE trong settings là giới hạn cứng cho mọi endpoint.
+    ordering = ('-id',)
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Cursor không hợp lệ.'
+
+    def get_page_size(self, request, view=None):
+        page_size = getattr(view, 'page_size', self.page_size)
+        max_page_size = min(getattr(view, 'max_page_size', self.max_page_size), settings.API_MAX_PAGE_SIZE)
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested is not None and requested.isdigit() and int(requested) > 0:
+            page_size = int(requested)
+        return min(page_size, max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, 'get_keyset_ordering'):
+            ordering = list(view.get_keyset_ordering() or self.ordering)
+        else:
+            ordering = list(getattr(view, 'keyset_ordering', None) or self.ordering)
+        # Tôn trọng ?ordering=... nếu view dùng OrderingFilter
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering') and request.query_params.get(backend.ordering_param):
+                requested = backend().get_ordering(request, queryset, view)
+                if requested:
+                    ordering = list(requested)
+                break
+        # Luôn thêm id để vị trí cursor là duy nhất
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    # --- CURSOR ---
+    def encode_cursor(self, values, reverse):
+        payload = json.dumps({'v': values, 'r': reverse}, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def cursor_values(self, queryset, values):
+        # Chuyển giá trị JSON của cursor về kiểu của trường sắp xếp (chuỗi ISO -> datetime...),
+        # kể cả annotation như search_rank (theo output_field)
+        converted = []
+        for (name, _), value in zip(self.fields, values):
+            if name in queryset.query.annotations:
+                field = queryset.query.annotations[name].output_field
+            else:
+                try:
+                    field = queryset.model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    field = None
+            converted.append(value if value is None or field is None else field.to_python(value))
+        return converted
+
+    def get_position(self, item):
+        return [getattr(item, name) for name, _ in self.fields]
+
+    # --- PHÂN TRANG ---
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset, cursor = self.get_page_queryset(queryset, request, view)
+        return self.set_page(list(queryset), cursor)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Như paginate_queryset nhưng nạp trang bằng ORM async (dùng cho api/async_views.py)
+        queryset, cursor = self.get_page_queryset(queryset, request, view)
+        return self.set_page([item async for item in queryset.aiterator()], cursor)
+
+    def get_page_queryset(self, queryset, request, view=None):
+        # Truy vấn của trang hiện tại, lấy dư một dòng để biết còn trang sau hay không
+        self.request = request
+        self.page_size = self.get_page_size(request, view)
+        self.fields = _parse_ordering(self.get_ordering(request, queryset, view))
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[1]
+
+        if cursor is not None:
+            # Cursor bị sửa tay nhưng vẫn đúng dạng (sai kiểu giá trị) cũng là cursor không hợp lệ
+            try:
+                values = self.cursor_values(queryset, cursor[0])
+                queryset = queryset.filter(_before(self.fields, values) if reverse else _after(self.fields, values))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return queryset.order_by(*_order_by(self.fields, reverse))[:self.page_size + 1], cursor
+
+    def set_page(self, results, cursor):
+        reverse = cursor is not None and cursor[1]
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.has_next = True if reverse else has_more
+        self.has_previous = has_more if reverse else cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.get_position(self.page[-1]), False))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        if not self.page:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.get_position(self.page[0]), True))
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+def _ranked_key(item):
+    # Khóa sắp xếp tăng dần của một phần tử (recipe_id, score): score giảm dần rồi id tăng dần
+    recipe_id, score = item
+    return -score, recipe_id
+
+
+class RankedKeysetPagination(KeysetPagination):
+    # Phân trang keyset trên danh sách (recipe_id, score) đã xếp hạng trong bộ nhớ
+    # theo (score giảm dần, id tăng dần), dùng cho SuggestionView.
+    ordering = ('-score', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        return list(self.ordering)
+
+    def get_position(self, item):
+        recipe_id, score = item
+        return [score, recipe_id]
+
+    def paginate_queryset(self, ranked, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request, view)
+        self.fields = _parse_ordering(self.ordering)
+        cursor = self.decode_cursor(request)
+
+        start, end = 0, self.page_size
+        if cursor is not None:
+            (score, recipe_id), reverse = cursor
+            try:
+                position = (-float(score), int(recipe_id))
+            except (TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+            # Tìm nhị phân trực tiếp trên ranked (không dựng lại danh sách khóa mỗi request)
+            if reverse:
+                end = bisect_left(ranked, position, key=_ranked_key)
+                start = max(0, end - self.page_size)
+            else:
+                start = bisect_right(ranked, position, key=_ranked_key)
+                end = start + self.page_size
+
+        self.page = list(ranked[start:end])
+        self.has_next = end < len(ranked)
+        self.has_previous = start > 0
+        return self.page
@@ -0,0 +1,157 @@
+import re
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from django.db import transaction
+
+from .models import PantryItems, RecipeIngredients, ShoppingListItems
+from .text import fold_text
+
+# Lượng nguyên liệu được lưu dạng chữ tự do ("300g", "1,5 kg", "2-3 quả", "vừa đủ").
+# Bên cạnh cột chữ, mỗi bảng có thêm:
+#   amount    — số lượng đã quy về đơn vị chuẩn (NULL nếu không đọc được)
+#   base_unit — đơn vị chuẩn: 'g' cho khối lượng, 'ml' cho thể tích, tên đơn vị đếm đã bỏ dấu
+#               ('qua', 'cu', ...) cho đồ đếm được, '' nếu chỉ có số
+# để có thể cộng / so sánh lượng bằng SUM() trong CSDL khi cùng base_unit.
+
+AMOUNT_PLACES = Decimal('0.001')
+MAX_AMOUNT = Decimal('999999999.999')
+BASE_UNIT_MAX_LENGTH = 20
+
+# Bảng quy đổi: đơn vị (đã bỏ dấu) -> (đơn vị chuẩn, hệ số). Thìa/chén là giá trị quy ước trong bếp.
+UNIT_CONVERSIONS = {
+    'g': ('g', Decimal(1)), 'gr': ('g', Decimal(1)), 'gram': ('g', Decimal(1)), 'gam': ('g', Decimal(1)),
+    'kg': ('g', Decimal(1000)), 'kilogram': ('g', Decimal(1000)), 'ky': ('g', Decimal(1000)), 'can': ('g', Decimal(1000)),
+    'mg': ('g', Decimal('0.001')),
+    'lang': ('g', Decimal(100)),
+    'ml': ('ml', Decimal(1)), 'cc': ('ml', Decimal(1)),
+    'l': ('ml', Decimal(1000)), 'lit': ('ml', Decimal(1000)),
+    'muong canh': ('ml', Decimal(15)), 'thia canh': ('ml', Decimal(15)), 'tbsp': ('ml', Decimal(15)),
+    'muong ca phe': ('ml', Decimal(5)), 'thia ca phe': ('ml', Decimal(5)), 'muong nho': ('ml', Decimal(5)),
+    'thia nho': ('ml', Decimal(5)), 'tsp': ('ml', Decimal(5)),
+    'chen': ('ml', Decimal(250)), 'bat': ('ml', Decimal(250)), 'coc': ('ml', Decimal(250)),
+    'ly': ('ml', Decimal(250)), 'cup': ('ml', Decimal(250)),
+    # Đơn vị đếm: gộp các từ đồng nghĩa
+    'qua': ('qua', Decimal(1)), 'trai': ('qua', Decimal(1)),
+    'cai': ('cai', Decimal(1)), 'chiec': ('cai', Decimal(1)),
+    'tep': ('tep', Decimal(1)), 'nhanh': ('tep', Decimal(1)),
+    'mieng': ('mieng', Decimal(1)), 'lat': ('mieng', Decimal(1)),
+}
+
+_FRACTIONS = str.maketrans({'½': ' 1/2', '¼': ' 1/4', '¾': ' 3/4', '⅓': ' 1/3', '⅔': ' 2/3'})
+_NUMBER = r'\d+(?:[.,]\d+)*'
+# Dấu chấm chia nhóm nghìn kiểu Việt Nam: "1.500 g", "2.000.000", "1.500,5"
+_GROUPED_DOT = re.compile(r'[1-9]\d{0,2}(?:\.\d{3})+(?:,\d+)?')
+# "1,500" là 1,5 (dấu phẩy thập phân) hay 1500 (nhóm nghìn kiểu Anh): không đoán
+_GROUPED_COMMA = re.compile(r'[1-9]\d{0,2}(?:,\d{3})+')
+# [phần nguyên] số [/mẫu số] [- cận trên] đơn vị — ví dụ "1 1/2 muỗng canh", "2-3 quả", "300g"
+_QUANTITY_RE = re.compile(
+    rf'^(?:(?P<whole>\d+)\s+(?=\d+\s*/))?(?P<number>{_NUMBER})(?:\s*/\s*(?P<denominator>\d+))?'
+    rf'(?:\s*(?:-|–|~|đến)\s*(?P<upper>{_NUMBER}))?\s*(?P<unit>.*)$'
+)
+
+
+def _decimal(value):
+    # Ngoài nhóm nghìn, dấu phẩy và dấu chấm đều là dấu thập phân ("1,5 kg", "0.5 l").
+    # Số mơ hồ hoặc nhiều dấu lẫn lộn ("1.2.3") báo InvalidOperation như số không hợp lệ.
+    if _GROUPED_DOT.fullmatch(value):
+        return Decimal(value.replace('.', '').replace(',', '.'))
+    if _GROUPED_COMMA.fullmatch(value):
+        raise InvalidOperation(value)
+    return Decimal(value.replace(',', '.'))
+
+
+@lru_cache(maxsize=1024)
+def resolve_unit(unit):
+    # Đơn vị chuẩn và hệ số của một đơn vị viết tự do; đơn vị lạ giữ nguyên (đã bỏ dấu)
+    # để vẫn cộng được với chính nó. Ví dụ: "Muỗng canh" -> ('ml', 15), "quả trứng" -> ('qua', 1)
+    folded = fold_text(unit).strip(' .')
+    if not folded:
+        return '', Decimal(1)
+    if folded in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[folded]
+    first_word = folded.split()[0]
+    if first_word in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[first_word]
+    return folded[:BASE_UNIT_MAX_LENGTH], Decimal(1)
+
+
+@lru_cache(maxsize=8192)
+def parse_quantity(quantity, unit=None):
+    # (amount, base_unit) của một lượng; (None, None) nếu không đọc được số ("vừa đủ", "ít").
+    # Khoảng "2-3" lấy cận trên để mua đủ. unit (cột riêng của recipe_ingredients) được ưu tiên
+    # hơn phần chữ sau số.
+    text = (quantity or '').translate(_FRACTIONS).strip()
+    match = _QUANTITY_RE.match(text)
+    if match is None:
+        return None, None
+    try:
+        value = _decimal(match['upper'] or match['number'])
+        if match['denominator'] and not match['upper']:
+            value /= Decimal(match['denominator'])
+        if match['whole']:
+            value += Decimal(match['whole'])
+    except (InvalidOperation, ZeroDivisionError):
+        return None, None
+    # Còn số trong phần đơn vị ("300 g + 2 quả", "1 hộp 400g"): không đoán
+    if any(char.isdigit() for char in match['unit']):
+        return None, None
+
+    base_unit, factor = resolve_unit(unit if unit else match['unit'])
+    amount = (value * factor).quantize(AMOUNT_PLACES)
+    if amount > MAX_AMOUNT:
+        return None, None
+    return amount, base_unit
+
+
+def quantity_fields(quantity, unit=None):
+    # Dùng khi dựng đối tượng cho bulk_create (không đi qua pre_save)
+    amount, base_unit = parse_quantity(quantity, unit)
+    return {'amount': amount, 'base_unit': base_unit}
+
+
+def fill_quantity(instance):
+    # Điền amount / base_unit từ cột chữ của PantryItems, ShoppingListItems, RecipeIngredients
+    amount, base_unit = parse_quantity(instance.quantity, getattr(instance, 'unit', None))
+    instance.amount = amount
+    instance.base_unit = base_unit
+
+
+def format_amount(amount, base_unit):
+    # Decimal('1500.000'), 'g' -> "1500 g"
+    text = format(amount.normalize(), 'f')
+    return f'{text} {base_unit}' if base_unit else text
+
+
+# --- ĐIỀN CHO DỮ LIỆU CŨ (lệnh backfill_quantities) ---
+QUANTITY_MODELS = (RecipeIngredients, PantryItems, ShoppingListItems)
+
+
+def backfill_quantities(model, batch_size=1000, progress=None):
+    # Duyệt bảng theo khóa chính (keyset, không OFFSET), đọc cột chữ và chỉ ghi lại các dòng
+    # có amount / base_unit khác kết quả đọc được. Các dòng cùng kết quả ("200g") được ghi bằng
+    # một UPDATE ... WHERE id IN (...) — nhanh hơn nhiều so với bulk_update (CASE WHEN cho từng
+    # dòng). Chạy lại bao nhiêu lần cũng được. Không phát tín hiệu: lượng chuẩn hóa không ảnh
+    # hưởng đề xuất hay cache.
+    has_unit = any(field.name == 'unit' for field in model._meta.fields)
+    columns = ['id', 'quantity', 'unit', 'amount', 'base_unit'] if has_unit else ['id', 'quantity', 'amount', 'base_unit']
+    last_id = 0
+    scanned = updated = 0
+    while True:
+        rows = list(model.objects.filter(id__gt=last_id).order_by('id').values(*columns)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        changed = {}
+        for row in rows:
+            parsed = parse_quantity(row['quantity'], row.get('unit'))
+            if parsed != (row['amount'], row['base_unit']):
+                changed.setdefault(parsed, []).append(row['id'])
+        with transaction.atomic():
+            for (amount, base_unit), ids in changed.items():
+                model.objects.filter(id__in=ids).update(amount=amount, base_unit=base_unit)
+        scanned += len(rows)
+        updated += sum(len(ids) for ids in changed.values())
+        if progress is not None:
+            progress(model, scanned, updated)
+    return scanned, updated
@@ -0,0 +1,72 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import connection
+
+from .models import Recipes, RecipeIngredients, RecipeProfiles
+from .text import fold_text
+
+# Trọng số tìm kiếm: tiêu đề > mô tả > tên nguyên liệu
+PROFILE_SEARCH_VECTOR = (
+    SearchVector('search_title', weight='A', config='simple')
+    + SearchVector('search_description', weight='B', config='simple')
+    + SearchVector('search_ingredients', weight='C', config='simple')
+)
+
+
+# --- DUY TRÌ BẢNG recipe_profiles ---
+def build_profile(recipe_id, author_id, recipe_status, ingredients, title='', description=''):
+    # ingredients: danh sách (ingredient_id, name). Điểm phạt theo nhóm nguyên liệu không lưu ở
+    # đây: SuggestionIndex tính từ nhóm hiện tại của từng nguyên liệu (xem api/suggestion_engine.py)
+    return RecipeProfiles(
+        recipe_id=recipe_id,
+        author_id=author_id,
+        status=recipe_status,
+        ingredient_ids=sorted(ingredient_id for ingredient_id, _ in ingredients),
+        search_title=fold_text(title),
+        search_description=fold_text(description),
+        search_ingredients=' '.join(fold_text(name) for _, name in ingredients),
+    )
+
+
+def refresh_recipe_profiles(recipe_ids):
+    # Tính lại hồ sơ cho các công thức được chỉ định bằng một số truy vấn cố định,
+    # không phụ thuộc vào số công thức.
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    recipes = list(Recipes.objects.filter(id__in=recipe_ids).values_list('id', 'author_id', 'status', 'title', 'description'))
+    ingredients = {}
+    for recipe_id, ingredient_id, name in RecipeIngredients.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'ingredient_id', 'ingredient__name'):
+        ingredients.setdefault(recipe_id, []).append((ingredient_id, name))
+
+    deleted = recipe_ids - {row[0] for row in recipes}
+    if deleted:
+        RecipeProfiles.objects.filter(recipe_id__in=deleted).delete()
+    if recipes:
+        RecipeProfiles.objects.bulk_create(
+            [
+                build_profile(recipe_id, author_id, recipe_status, ingredients.get(recipe_id, []), title, description)
+                for recipe_id, author_id, recipe_status, title, description in recipes
+            ],
+            update_conflicts=True,
+            unique_fields=['recipe'],
+            update_fields=[
+                'author_id', 'status', 'ingredient_ids',
+                'search_title', 'search_description', 'search_ingredients', 'updated_at',
+            ],
+        )
+        if connection.vendor == 'postgresql':
+            RecipeProfiles.objects.filter(recipe_id__in=recipe_ids).update(search_vector=PROFILE_SEARCH_VECTOR)
+
+
+def refresh_profiles_for_ingredients(ingredient_ids):
+    # Tên của nguyên liệu đổi thì văn bản tìm kiếm của mọi công thức dùng nó cũng đổi
+    recipe_ids = RecipeIngredients.objects.filter(ingredient_id__in=ingredient_ids).values_list('recipe_id', flat=True).distinct()
+    refresh_recipe_profiles(recipe_ids)
+
+
+def ensure_recipe_profiles(batch_size=1000):
+    # Tạo hồ sơ cho các công thức chưa có (ví dụ dữ liệu cũ trước khi có bảng này)
+    missing = list(Recipes.objects.filter(profile__isnull=True).values_list('id', flat=True))
+    for start in range(0, len(missing), batch_size):
+        refresh_recipe_profiles(missing[start:start + batch_size])
+    return len(missing)
@@ -0,0 +1,227 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+STICKY_KEY_PREFIX = 'db:sticky:'
+
+_state = ContextVar('replica_routing_state', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+# --- TRẠNG THÁI ĐIỀU HƯỚNG CỦA MỘT REQUEST ---
+class RoutingState:
+    __slots__ = ('use_replica', 'pinned', 'user_key')
+
+    def __init__(self, use_replica, user_key=None):
+        # use_replica: request chỉ đọc vào API và người dùng không vừa ghi dữ liệu
+        # pinned: đã có thao tác ghi trong request này, mọi lần đọc sau đó về CSDL chính
+        self.use_replica = use_replica
+        self.pinned = False
+        self.user_key = user_key
+
+
+def current_state():
+    return _state.get()
+
+
+# --- KIỂM TRA SỨC KHỎE BẢN SAO ---
+class ReplicaHealth:
+    # Kết quả kiểm tra được nhớ REPLICA_HEALTH_INTERVAL giây cho mỗi alias.
+    # Bản sao lỗi kết nối hoặc trễ quá REPLICA_MAX_LAG giây (PostgreSQL) bị bỏ qua.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        interval = getattr(settings, 'REPLICA_HEALTH_INTERVAL', 5)
+        now = time.monotonic()
+        checked = self._checked.get(alias)
+        if checked is not None and now - checked[0] < interval:
+            return checked[1]
+        healthy = self.check(alias)
+        with self._lock:
+            self._checked[alias] = (now, healthy)
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    # NULL trên máy chưa từng replay (hoặc không phải bản sao) thì coi như không trễ
+                    cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+                    lag = cursor.fetchone()[0]
+                    return lag is None or lag <= getattr(settings, 'REPLICA_MAX_LAG', 30)
+                cursor.execute('SELECT 1')
+                return True
+        except Exception:
+            connection.close_if_unusable_or_obsolete()
+            return False
+
+    def mark_unhealthy(self, alias):
+        with self._lock:
+            self._checked[alias] = (time.monotonic(), False)
+
+    def reset(self):
+        with self._lock:
+            self._checked = {}
+
+
+replica_health = ReplicaHealth()
+
+
+# --- ROUTER ---
+class ReplicaRouter:
+    # Đọc từ bản sao chỉ khi đang ở trong một request GET/HEAD/OPTIONS vào /api/ đã được
+    # ReplicaRoutingMiddleware đánh dấu; mọi trường hợp khác (ghi, lệnh quản trị, tín hiệu,
+    # transaction đang mở, người dùng vừa ghi) đều dùng CSDL chính.
+
+    def __init__(self, replicas=None, health=None):
+        self.replicas = replica_aliases() if replicas is None else list(replicas)
+        self.health = health or replica_health
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+
+    def db_for_read(self, model, **hints):
+        state = current_state()
+        if state is None or not state.use_replica or state.pinned or not self.replicas:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            return 'default'
+        for _ in range(len(self.replicas)):
+            alias = next(self._cycle)
+            if self.health.is_healthy(alias):
+                return alias
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        state = current_state()
+        if state is not None:
+            state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mọi alias đều là cùng một CSDL
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+# --- MIDDLEWARE ---
+def _token_user_key(request):
+    # Đọc user_id từ JWT (chỉ kiểm tra chữ ký, không truy vấn CSDL).
+    # Trả về (có header JWT hay không, user_id)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    parts = header.split()
+    if len(parts) == 2 and parts[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return True, AccessToken(parts[1]).get(jwt_settings.USER_ID_CLAIM)
+        except TokenError:
+            return True, None
+    return False, None
+
+
+def _user_key(request):
+    # Xác định người dùng trước khi DRF xác thực: từ JWT, hoặc từ session (trang admin)
+    has_token, user_key = _token_user_key(request)
+    if has_token:
+        return user_key
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.pk
+    return None
+
+
+async def _auser_key(request):
+    # Như _user_key nhưng đọc session bằng request.auser() để không chặn event loop
+    has_token, user_key = _token_user_key(request)
+    if has_token:
+        return user_key
+    if not hasattr(request, 'auser'):
+        return None
+    user = await request.auser()
+    return user.pk if user.is_authenticated else None
+
+
+class ReplicaRoutingMiddleware:
+    # Đánh dấu request chỉ đọc để ReplicaRouter gửi truy vấn sang bản sao.
+    # Sau khi một người dùng ghi dữ liệu, mọi request của họ trong REPLICA_STICKY_SECONDS giây
+    # tiếp theo đọc từ CSDL chính để thấy ngay thay đổi của mình (read-your-writes);
+    # dấu "vừa ghi" lưu trong cache dùng chung nên có hiệu lực trên mọi worker.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Cache riêng của từng tiến trình (LocMem) không cho worker khác thấy dấu "vừa ghi":
+        # request kế tiếp rơi vào worker khác sẽ đọc bản sao chưa có thay đổi của người dùng
+        if replica_aliases() and isinstance(caches['default'], (LocMemCache, DummyCache)):
+            raise ImproperlyConfigured(
+                'DATABASE_REPLICA_URLS cần cache dùng chung giữa các worker (CACHE_URL=redis://... hoặc memcached://...) '
+                'để giữ read-your-writes sau khi ghi.'
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        user_key = _user_key(request)
+        use_replica = request.method in SAFE_METHODS and request.path.startswith('/api/')
+        if use_replica and user_key is not None and cache.get(f'{STICKY_KEY_PREFIX}{user_key}'):
+            use_replica = False
+
+        state = RoutingState(use_replica, user_key)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if self.wrote(request, state):
+            cache.set(f'{STICKY_KEY_PREFIX}{user_key}', True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        user_key = await _auser_key(request)
+        use_replica = request.method in SAFE_METHODS and request.path.startswith('/api/')
+        if use_replica and user_key is not None and await cache.aget(f'{STICKY_KEY_PREFIX}{user_key}'):
+            use_replica = False
+
+        # Truy vấn của view async chạy trong sync_to_async, vốn chép ContextVar sang luồng đó
+        state = RoutingState(use_replica, user_key)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if self.wrote(request, state):
+            await cache.aset(f'{STICKY_KEY_PREFIX}{user_key}', True, getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+        return response
+
+    def wrote(self, request, state):
+        return state.user_key is not None and (state.pinned or request.method not in SAFE_METHODS)
@@ -0,0 +1,61 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import BigIntegerField, F, Q, Value
+from django.db.models.functions import Cast
+from rest_framework.filters import BaseFilterBackend
+
+from .text import fold_text
+
+
+# Độ phân giải của search_rank; các hạng chênh nhau ít hơn 1e-6 coi như bằng nhau và
+# được xếp tiếp theo (created_at, id)
+RANK_SCALE = 1_000_000
+
+
+# --- TÌM KIẾM CÔNG THỨC ---
+class RecipeSearchFilter(BaseFilterBackend):
+    # Tìm trên văn bản đã bỏ dấu lưu sẵn ở recipe_profiles (xem api/recipe_profiles.py),
+    # nên "bo kho" khớp với "Bò kho" mà không cần extension unaccent.
+    # - PostgreSQL: khớp tsvector (có chỉ mục GIN) và xếp hạng bằng ts_rank
+    #   (tiêu đề > mô tả > tên nguyên liệu).
+    # - CSDL khác (SQLite khi chạy test): mọi từ khóa phải xuất hiện trong một trong
+    #   các trường đã bỏ dấu, hạng bằng nhau.
+    # Kết quả được gắn thêm trường search_rank để phân trang keyset theo độ liên quan.
+    # search_rank là số nguyên (ts_rank nhân RANK_SCALE): ts_rank là float4, đi qua JSON trong
+    # cursor rồi so sánh lại với float4 có thể lệch, làm lặp hoặc mất dòng giữa hai trang.
+    search_param = 'search'
+    search_title = 'Tìm kiếm'
+    search_description = 'Từ khóa tìm trong tiêu đề, mô tả và tên nguyên liệu (không phân biệt dấu).'
+
+    @classmethod
+    def get_search_query(cls, request):
+        return fold_text(request.query_params.get(cls.search_param, ''))
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        if connection.vendor == 'postgresql':
+            search_query = SearchQuery(query, config='simple')
+            return queryset.filter(profile__search_vector=search_query).annotate(
+                search_rank=Cast(SearchRank(F('profile__search_vector'), search_query) * RANK_SCALE, BigIntegerField()),
+            )
+
+        condition = Q()
+        for term in query.split():
+            condition &= (
+                Q(profile__search_title__icontains=term)
+                | Q(profile__search_description__icontains=term)
+                | Q(profile__search_ingredients__icontains=term)
+            )
+        return queryset.filter(condition).annotate(search_rank=Value(0, output_field=BigIntegerField()))
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': self.search_description,
+            'schema': {'type': 'string'},
+        }]
@@ -1,6 +1,9 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Recipes, PantryItems, Ingredients, RecipeIngredients, ShoppingListItems, FavoriteRecipes
 from django.contrib.auth.models import User
+from .signals import batched_changes, notify_recipes_changed
+from .quantities import quantity_fields, fill_quantity
 
 # --- SERIALIZER CHO CÔNG THỨC CÔNG KHAI ---
 class RecipeSerializer(serializers.ModelSerializer):
@@ -31,8 +34,23 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
         model = Recipes
         fields = ['id', 'title', 'description', 'instructions', 'difficulty', 'cooking_time_minutes', 'author_name', 'ingredients']
 
+# --- SERIALIZER CHO XUẤT DỮ LIỆU (api/exports.py) ---
+class RecipeExportSerializer(RecipeDetailSerializer):
+    class Meta(RecipeDetailSerializer.Meta):
+        fields = RecipeDetailSerializer.Meta.fields + ['status', 'created_at', 'updated_at']
+
+class FavoriteExportSerializer(serializers.ModelSerializer):
+    recipe_title = serializers.CharField(source='recipe.title', read_only=True)
+    class Meta:
+        model = FavoriteRecipes
+        fields = ['id', 'recipe', 'recipe_title', 'created_at']
+
 # --- SERIALIZER ĐỂ TẠO CÔNG THỨC MỚI ---
 class RecipeIngredientCreateSerializer(serializers.ModelSerializer):
+    # Chỉ nhận id; việc kiểm tra nguyên liệu tồn tại được gom thành một truy vấn
+    # trong RecipeCreateSerializer.validate_ingredients
+    ingredient = serializers.IntegerField()
+
     class Meta:
         model = RecipeIngredients
         fields = ['ingredient', 'quantity', 'unit']
@@ -44,11 +62,26 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         model = Recipes
         fields = ['id', 'title', 'description', 'instructions', 'difficulty', 'cooking_time_minutes', 'ingredients']
 
+    def validate_ingredients(self, value):
+        ingredient_ids = [item['ingredient'] for item in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError('Mỗi nguyên liệu chỉ được xuất hiện một lần trong công thức.')
+        existing_ids = set(Ingredients.objects.filter(id__in=ingredient_ids).values_list('id', flat=True))
+        missing_ids = [ingredient_id for ingredient_id in ingredient_ids if ingredient_id not in existing_ids]
+        if missing_ids:
+            raise serializers.ValidationError(f'Nguyên liệu không tồn tại: {missing_ids}')
+        return value
+
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
-        recipe = Recipes.objects.create(**validated_data)
-        for ingredient_data in ingredients_data:
-            RecipeIngredients.objects.create(recipe=recipe, **ingredient_data)
+        with transaction.atomic(), batched_changes():
+            recipe = Recipes.objects.create(**validated_data)
+            RecipeIngredients.objects.bulk_create([
+                RecipeIngredients(recipe=recipe, ingredient_id=item['ingredient'], quantity=item['quantity'], unit=item.get('unit'), **quantity_fields(item['quantity'], item.get('unit')))
+                for item in ingredients_data
+            ])
+            # bulk_create không phát post_save nên phải tự báo thay đổi
+            notify_recipes_changed([recipe.id], sender=RecipeIngredients)
         return recipe
 
     def update(self, instance, validated_data):
@@ -58,14 +91,36 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         instance.instructions = validated_data.get('instructions', instance.instructions)
         instance.difficulty = validated_data.get('difficulty', instance.difficulty)
         instance.cooking_time_minutes = validated_data.get('cooking_time_minutes', instance.cooking_time_minutes)
-        instance.save()
-        
-        if ingredients_data is not None:
-            instance.ingredients.all().delete()
-            for ingredient_data in ingredients_data:
-                RecipeIngredients.objects.create(recipe=instance, **ingredient_data)
+
+        with transaction.atomic(), batched_changes():
+            instance.save()
+            if ingredients_data is not None:
+                self._sync_ingredients(instance, ingredients_data)
         return instance
 
+    def _sync_ingredients(self, recipe, ingredients_data):
+        # Chỉ ghi những dòng (recipe, ingredient) thực sự thay đổi
+        existing = {row.ingredient_id: row for row in RecipeIngredients.objects.filter(recipe=recipe)}
+        to_create, to_update = [], []
+        for item in ingredients_data:
+            row = existing.pop(item['ingredient'], None)
+            if row is None:
+                to_create.append(RecipeIngredients(recipe=recipe, ingredient_id=item['ingredient'], quantity=item['quantity'], unit=item.get('unit'), **quantity_fields(item['quantity'], item.get('unit'))))
+            elif row.quantity != item['quantity'] or row.unit != item.get('unit'):
+                row.quantity = item['quantity']
+                row.unit = item.get('unit')
+                fill_quantity(row)
+                to_update.append(row)
+
+        if existing:
+            RecipeIngredients.objects.filter(id__in=[row.id for row in existing.values()]).delete()
+        if to_update:
+            RecipeIngredients.objects.bulk_update(to_update, ['quantity', 'unit', 'amount', 'base_unit'])
+        if to_create:
+            RecipeIngredients.objects.bulk_create(to_create)
+        if existing or to_update or to_create:
+            notify_recipes_changed([recipe.id], sender=RecipeIngredients)
+
 # --- SERIALIZERS CHO USER ---
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -94,6 +149,25 @@ class PantryItemWriteSerializer(serializers.ModelSerializer):
         model = PantryItems
         fields = ['id', 'ingredient', 'quantity']
 
+class PantryBulkItemSerializer(serializers.Serializer):
+    ingredient = serializers.IntegerField()
+    quantity = serializers.CharField(max_length=50, allow_blank=True, allow_null=True, required=False, default=None)
+
+class PantryBulkSerializer(serializers.Serializer):
+    items = PantryBulkItemSerializer(many=True)
+    # replace=True: danh sách gửi lên là toàn bộ tủ lạnh, các nguyên liệu không có trong danh sách sẽ bị xóa
+    replace = serializers.BooleanField(default=False)
+
+    def validate_items(self, value):
+        ingredient_ids = [item['ingredient'] for item in value]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError('Mỗi nguyên liệu chỉ được xuất hiện một lần.')
+        existing_ids = set(Ingredients.objects.filter(id__in=ingredient_ids).values_list('id', flat=True))
+        missing_ids = [ingredient_id for ingredient_id in ingredient_ids if ingredient_id not in existing_ids]
+        if missing_ids:
+            raise serializers.ValidationError(f'Nguyên liệu không tồn tại: {missing_ids}')
+        return value
+
 # --- SERIALIZERS CHO DANH SÁCH MUA SẮM ---
 class ShoppingListItemSerializer(serializers.ModelSerializer):
     ingredient_name = serializers.CharField(source='ingredient.name', read_only=True)
@@ -102,6 +176,13 @@ class ShoppingListItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'ingredient', 'ingredient_name', 'is_checked', 'quantity']
         read_only_fields = ['id', 'ingredient_name']
 
+class ShoppingListGenerateSerializer(serializers.Serializer):
+    # Danh sách id công thức dự định nấu; id trùng được gộp
+    recipe_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=100)
+
+    def validate_recipe_ids(self, value):
+        return list(dict.fromkeys(value))
+
 # --- SERIALIZER CHO NGUYÊN LIỆU ---
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,219 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete
+from django.dispatch import Signal, receiver
+
+from .cache import bump_catalog_versions
+from .change_log import Entity, model_action, record_changes, record_recipe_changes, record_ingredient_changes
+from .models import Recipes, Ingredients, RecipeIngredients, PantryItems, ShoppingListItems, FavoriteRecipes
+from .recipe_profiles import refresh_recipe_profiles, refresh_profiles_for_ingredients
+from .suggestion_cache import suggestion_cache
+from .suggestion_engine import suggestion_index
+from .autocomplete import ingredient_autocomplete
+from .quantities import fill_quantity
+
+# --- TÍN HIỆU RIÊNG CỦA ỨNG DỤNG ---
+# Các thao tác hàng loạt (queryset.update, bulk_create) không phát post_save,
+# nên nơi gọi phải tự gửi các tín hiệu này kèm danh sách id bị ảnh hưởng.
+recipes_changed = Signal()       # recipe_ids
+ingredients_changed = Signal()   # ingredient_ids
+pantry_changed = Signal()        # user_ids
+favorites_changed = Signal()     # user_ids
+
+_batch = threading.local()
+
+
+@contextmanager
+def batched_changes():
+    # Gom các thay đổi phát sinh bên trong khối lệnh thành một lần gửi cho mỗi tín hiệu,
+    # thay vì một lần cho mỗi dòng bị ghi/xóa. Nếu có lỗi thì không gửi gì.
+    # Thay đổi chỉ được gửi sau commit (xem _on_ingredient_deleting) cũng được gom như vậy.
+    if getattr(_batch, 'pending', None) is not None:
+        yield
+        return
+    _batch.pending = {recipes_changed: set(), ingredients_changed: set()}
+    _batch.after_commit = {recipes_changed: set(), ingredients_changed: set()}
+    try:
+        yield
+    except BaseException:
+        _batch.pending = _batch.after_commit = None
+        raise
+    pending, _batch.pending = _batch.pending, None
+    after_commit, _batch.after_commit = _batch.after_commit, None
+    for signal, ids in pending.items():
+        if ids:
+            signal.send(sender=None, **{_ID_ARGUMENTS[signal]: ids})
+    for signal, ids in after_commit.items():
+        if ids:
+            _send_on_commit(signal, None, ids)
+
+
+_ID_ARGUMENTS = {recipes_changed: 'recipe_ids', ingredients_changed: 'ingredient_ids'}
+
+
+def _send_on_commit(signal, sender, ids):
+    transaction.on_commit(lambda: signal.send(sender=sender, **{_ID_ARGUMENTS[signal]: ids}))
+
+
+def _relay(signal, sender, ids, after_commit=False):
+    pending = getattr(_batch, 'after_commit' if after_commit else 'pending', None)
+    if pending is not None:
+        pending[signal].update(ids)
+    elif after_commit:
+        _send_on_commit(signal, sender, ids)
+    else:
+        signal.send(sender=sender, **{_ID_ARGUMENTS[signal]: ids})
+
+
+def notify_recipes_changed(recipe_ids, sender=None):
+    _relay(recipes_changed, sender, recipe_ids)
+
+
+def notify_ingredients_changed(ingredient_ids, sender=None):
+    _relay(ingredients_changed, sender, ingredient_ids)
+
+
+# --- CHUYỂN TÍN HIỆU CỦA MODEL THÀNH TÍN HIỆU ỨNG DỤNG ---
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def _on_recipe_saved(sender, instance, **kwargs):
+    _relay(recipes_changed, Recipes, [instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredients)
+@receiver(post_delete, sender=RecipeIngredients)
+def _on_recipe_ingredient_saved(sender, instance, **kwargs):
+    # Xóa dây chuyền khi xóa công thức: post_delete của chính công thức đã báo thay đổi,
+    # không cần làm mới thêm một lần cho mỗi dòng nguyên liệu
+    origin = kwargs.get('origin')
+    if isinstance(origin, Recipes) or getattr(origin, 'model', None) is Recipes:
+        return
+    _relay(recipes_changed, RecipeIngredients, [instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def _on_ingredient_saved(sender, instance, **kwargs):
+    _relay(ingredients_changed, Ingredients, [instance.pk])
+
+
+@receiver(post_save, sender=PantryItems)
+@receiver(post_delete, sender=PantryItems)
+def _on_pantry_item_saved(sender, instance, **kwargs):
+    pantry_changed.send(sender=PantryItems, user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+def _on_favorite_saved(sender, instance, **kwargs):
+    favorites_changed.send(sender=FavoriteRecipes, user_ids=[instance.user_id])
+
+
+@receiver(pre_delete, sender=Ingredients)
+def _on_ingredient_deleting(sender, instance, **kwargs):
+    # CSDL tự xóa các dòng recipe_ingredients (ON DELETE CASCADE) mà không phát tín hiệu,
+    # nên phải ghi lại các công thức bị ảnh hưởng trước khi xóa.
+    # Trong batched_changes() (trang quản trị, xóa công thức qua API) các công thức của mọi
+    # nguyên liệu bị xóa được gom thành một lần làm mới sau commit.
+    recipe_ids = list(RecipeIngredients.objects.filter(ingredient_id=instance.pk).values_list('recipe_id', flat=True))
+    if recipe_ids:
+        _relay(recipes_changed, Ingredients, recipe_ids, after_commit=True)
+
+
+# --- CẬP NHẬT BẢNG recipe_profiles (cùng transaction với thao tác ghi) ---
+@receiver(recipes_changed)
+def _refresh_profiles(sender, recipe_ids, **kwargs):
+    refresh_recipe_profiles(recipe_ids)
+
+
+@receiver(ingredients_changed)
+def _refresh_profiles_for_ingredients(sender, ingredient_ids, **kwargs):
+    refresh_profiles_for_ingredients(ingredient_ids)
+
+
+# --- GIỮ CHỈ MỤC ĐỀ XUẤT LUÔN MỚI ---
+# Chỉ cập nhật sau khi transaction commit, tránh nạp dữ liệu sẽ bị rollback.
+@receiver(recipes_changed)
+def _refresh_suggestion_recipes(sender, recipe_ids, **kwargs):
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: suggestion_index.refresh_recipes(recipe_ids))
+
+
+@receiver(ingredients_changed)
+def _refresh_suggestion_ingredients(sender, ingredient_ids, **kwargs):
+    ingredient_ids = list(ingredient_ids)
+    transaction.on_commit(lambda: suggestion_index.refresh_ingredients(ingredient_ids))
+
+
+# Chỉ mục gợi ý tên nguyên liệu (duyệt, từ chối, đổi tên, xóa)
+@receiver(ingredients_changed)
+def _refresh_ingredient_autocomplete(sender, ingredient_ids, **kwargs):
+    ingredient_ids = list(ingredient_ids)
+    transaction.on_commit(lambda: ingredient_autocomplete.refresh_ingredients(ingredient_ids))
+
+
+
+# --- GIẢI PHÓNG CACHE ĐỀ XUẤT CỦA NGƯỜI DÙNG ---
+# Khóa cache đã chứa vân tay tủ lạnh/yêu thích nên đây chỉ là dọn sớm các mục đã cũ.
+@receiver(pantry_changed)
+@receiver(favorites_changed)
+def _evict_user_suggestions(sender, user_ids, **kwargs):
+    for user_id in user_ids:
+        suggestion_cache.invalidate_user(user_id)
+
+
+# --- LÀM MỚI CACHE PHẢN HỒI CÔNG KHAI (api/cache.py) ---
+# Tăng phiên bản sau khi commit, để request song song không kịp cache lại dữ liệu cũ.
+@receiver(recipes_changed)
+def _bump_recipe_cache(sender, recipe_ids, **kwargs):
+    namespaces = ['recipes'] + [f'recipe:{recipe_id}' for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: bump_catalog_versions(namespaces))
+
+
+@receiver(ingredients_changed)
+def _bump_ingredient_cache(sender, ingredient_ids, **kwargs):
+    # Tên nguyên liệu xuất hiện trong chi tiết công thức và trong kết quả tìm kiếm
+    recipe_ids = set(RecipeIngredients.objects.filter(ingredient_id__in=ingredient_ids).values_list('recipe_id', flat=True))
+    namespaces = ['ingredients', 'recipes'] + [f'recipe:{recipe_id}' for recipe_id in recipe_ids]
+    transaction.on_commit(lambda: bump_catalog_versions(namespaces))
+
+
+# --- NHẬT KÝ THAY ĐỔI CHO ĐỒNG BỘ TĂNG DẦN (api/change_log.py) ---
+@receiver(recipes_changed)
+def _log_recipe_changes(sender, recipe_ids, **kwargs):
+    record_recipe_changes(recipe_ids)
+
+
+@receiver(ingredients_changed)
+def _log_ingredient_changes(sender, ingredient_ids, **kwargs):
+    record_ingredient_changes(ingredient_ids)
+
+
+@receiver(post_save, sender=PantryItems)
+@receiver(post_delete, sender=PantryItems)
+def _log_pantry_item(sender, instance, **kwargs):
+    record_changes(Entity.PANTRY, [instance.pk], instance.user_id, model_action(kwargs))
+
+
+@receiver(post_save, sender=ShoppingListItems)
+@receiver(post_delete, sender=ShoppingListItems)
+def _log_shopping_list_item(sender, instance, **kwargs):
+    record_changes(Entity.SHOPPING_LIST, [instance.pk], instance.user_id, model_action(kwargs))
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+def _log_favorite(sender, instance, **kwargs):
+    record_changes(Entity.FAVORITE, [instance.recipe_id], instance.user_id, model_action(kwargs))
+
+
+
+# --- LƯỢNG ĐÃ CHUẨN HÓA (api/quantities.py) ---
+# bulk_create / bulk_update không qua pre_save: nơi gọi tự điền bằng quantity_fields
+@receiver(pre_save, sender=PantryItems)
+@receiver(pre_save, sender=RecipeIngredients)
+@receiver(pre_save, sender=ShoppingListItems)
+def _fill_quantity(sender, instance, **kwargs):
+    fill_quantity(instance)
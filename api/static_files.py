@@ -0,0 +1,31 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+# --- WHITENOISE CHẠY ĐƯỢC DƯỚI ASGI ---
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    # WhiteNoiseMiddleware gốc chỉ chạy đồng bộ, nên dưới ASGI Django phải chuyển mọi request
+    # (kể cả request tới view async) qua một luồng riêng rồi quay lại event loop.
+    # Lớp này chỉ tra bảng file tĩnh trong bộ nhớ; việc đọc file mới đẩy sang luồng.
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
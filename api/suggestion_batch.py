@@ -0,0 +1,178 @@
+import numpy as np
+from scipy import sparse
+
+from .models import Recipes, Ingredients, RecipeIngredients, PantryItems, FavoriteRecipes
+from .suggestion_engine import (
+    MATCH_POINTS, FAVORITE_AUTHOR_BONUS, DEFAULT_PENALTY, FLEXIBLE_MAX_MISSING,
+    MODE_STRICT, category_weight,
+)
+
+# Số người dùng (cột) chấm điểm cùng lúc trong SuggestionMatrix.score
+SCORE_CHUNK_USERS = 64
+
+
+# --- MA TRẬN CÔNG THỨC x NGUYÊN LIỆU CHO VIỆC CHẤM ĐIỂM HÀNG LOẠT ---
+class SuggestionMatrix:
+    # Dựng một lần từ recipe_ingredients + ingredients.category, sau đó chấm điểm
+    # cho nhiều người dùng cùng lúc bằng phép nhân ma trận thưa:
+    #   match_count   = A @ P          (A: 1 nếu công thức chứa nguyên liệu không phải STAPLE)
+    #   missing_count = |A| - match_count
+    #   penalty       = sum(W) - W @ P (W: A nhân với trọng số theo nhóm)
+    # với P là ma trận nguyên liệu x người dùng của tủ lạnh.
+
+    def __init__(self, recipe_ids, author_ids, is_public, ingredient_columns, scored, weights, contains):
+        self.recipe_ids = recipe_ids
+        self.author_ids = author_ids
+        self.is_public = is_public
+        self.ingredient_columns = ingredient_columns
+        self.scored = scored
+        self.weights = weights
+        self.contains = contains
+        # Ma trận công thức x tác giả, dùng để tính điểm thiện cảm bằng phép nhân
+        author_values, author_columns = np.unique(author_ids, return_inverse=True)
+        self.author_columns = {int(author_id): column for column, author_id in enumerate(author_values)}
+        self.authored = sparse.csr_matrix(
+            (np.ones(len(author_ids)), (np.arange(len(author_ids)), author_columns)),
+            shape=(len(author_ids), len(author_values)),
+        )
+        self.scored_count = np.asarray(scored.sum(axis=1)).ravel()
+        self.total_weight = np.asarray(weights.sum(axis=1)).ravel()
+        # Giữ đúng hành vi của truy vấn SQL cũ cho công thức không có nguyên liệu
+        self.empty = np.asarray(contains.sum(axis=1)).ravel() == 0
+
+    @classmethod
+    def build(cls):
+        recipes = list(Recipes.objects.order_by('id').values_list('id', 'author_id', 'status'))
+        recipe_rows = {recipe_id: row for row, (recipe_id, _, _) in enumerate(recipes)}
+        categories = dict(Ingredients.objects.values_list('id', 'category'))
+        ingredient_columns = {ingredient_id: column for column, ingredient_id in enumerate(sorted(categories))}
+
+        rows, columns, is_scored, weights = [], [], [], []
+        for recipe_id, ingredient_id in RecipeIngredients.objects.values_list('recipe_id', 'ingredient_id'):
+            row = recipe_rows.get(recipe_id)
+            column = ingredient_columns.get(ingredient_id)
+            if row is None or column is None:
+                continue
+            category = categories[ingredient_id]
+            rows.append(row)
+            columns.append(column)
+            is_scored.append(category != Ingredients.Category.STAPLE)
+            weights.append(0.0 if category == Ingredients.Category.STAPLE else category_weight(category))
+
+        shape = (len(recipes), len(ingredient_columns))
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = np.asarray(columns, dtype=np.int64)
+        is_scored = np.asarray(is_scored, dtype=bool)
+
+        contains = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=shape)
+        scored = sparse.csr_matrix((np.ones(is_scored.sum()), (rows[is_scored], columns[is_scored])), shape=shape)
+        weight_matrix = sparse.csr_matrix((np.asarray(weights, dtype=np.float64), (rows, columns)), shape=shape)
+        weight_matrix.eliminate_zeros()
+
+        return cls(
+            recipe_ids=np.asarray([recipe_id for recipe_id, _, _ in recipes], dtype=np.int64),
+            author_ids=np.asarray([author_id for _, author_id, _ in recipes], dtype=np.int64),
+            is_public=np.asarray([recipe_status == Recipes.Status.PUBLIC for _, _, recipe_status in recipes], dtype=bool),
+            ingredient_columns=ingredient_columns,
+            scored=scored,
+            weights=weight_matrix,
+            contains=contains,
+        )
+
+    def _user_matrix(self, ingredient_lists):
+        # Ma trận nguyên liệu x người dùng (1 nếu người dùng có nguyên liệu đó)
+        rows, columns = [], []
+        for column, ingredient_ids in enumerate(ingredient_lists):
+            for ingredient_id in set(ingredient_ids):
+                row = self.ingredient_columns.get(ingredient_id)
+                if row is not None:
+                    rows.append(row)
+                    columns.append(column)
+        return sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)),
+            shape=(len(self.ingredient_columns), len(ingredient_lists)),
+        )
+
+    def score(self, user_ids, pantries, favorite_authors, excluded=None, mode=MODE_STRICT, top_n=20):
+        # Chấm điểm một lô người dùng. Trả về {user_id: [(recipe_id, score), ...]}
+        # xếp theo điểm giảm dần rồi theo id, giống SuggestionIndex.suggest.
+        # Các ma trận dày (công thức x người dùng) chỉ dựng cho SCORE_CHUNK_USERS người dùng mỗi
+        # lần, nên bộ nhớ tỉ lệ với số công thức chứ không với kích thước lô.
+        if top_n < 1:
+            raise ValueError(f'top_n phải lớn hơn 0 (nhận {top_n}).')
+        user_ids = list(user_ids)
+        excluded = excluded or {}
+        results = {}
+        for start in range(0, len(user_ids), SCORE_CHUNK_USERS):
+            chunk = user_ids[start:start + SCORE_CHUNK_USERS]
+            results.update(self._score_chunk(chunk, pantries, favorite_authors, excluded, mode, top_n))
+        return results
+
+    def _score_chunk(self, user_ids, pantries, favorite_authors, excluded, mode, top_n):
+        pantry_lists = [pantries.get(user_id, ()) for user_id in user_ids]
+
+        pantry = self._user_matrix(pantry_lists)
+        match_count = (self.scored @ pantry).toarray()
+        missing_count = self.scored_count[:, None] - match_count
+        penalty = self.total_weight[:, None] - (self.weights @ pantry).toarray()
+        penalty[self.empty, :] = DEFAULT_PENALTY
+
+        rows, columns = [], []
+        for column, user_id in enumerate(user_ids):
+            for author_id in favorite_authors.get(user_id, ()):
+                row = self.author_columns.get(author_id)
+                if row is not None:
+                    rows.append(row)
+                    columns.append(column)
+        favorites = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(self.author_columns), len(user_ids)))
+        bonus = (self.authored @ favorites).toarray() * FAVORITE_AUTHOR_BONUS
+        scores = match_count * MATCH_POINTS - penalty + bonus
+
+        users = np.asarray(user_ids, dtype=np.int64)
+        valid = self.is_public[:, None] | (self.author_ids[:, None] == users[None, :])
+        if any(excluded.get(user_id) for user_id in user_ids):
+            blocked = self.contains @ self._user_matrix([excluded.get(user_id, ()) for user_id in user_ids])
+            valid &= blocked.toarray() == 0
+        if mode == MODE_STRICT:
+            valid &= missing_count == 0
+            # Tủ lạnh trống thì chế độ nghiêm ngặt không đề xuất gì
+            valid &= np.asarray([bool(ingredient_ids) for ingredient_ids in pantry_lists])[None, :]
+        else:
+            valid &= (missing_count <= FLEXIBLE_MAX_MISSING) & (scores >= 0)
+
+        results = {}
+        for column, user_id in enumerate(user_ids):
+            candidates = np.flatnonzero(valid[:, column])
+            column_scores = scores[candidates, column]
+            if len(candidates) > top_n:
+                kth = np.partition(column_scores, len(candidates) - top_n)[len(candidates) - top_n]
+                keep = column_scores >= kth
+                candidates, column_scores = candidates[keep], column_scores[keep]
+            order = np.lexsort((self.recipe_ids[candidates], -column_scores))[:top_n]
+            results[user_id] = [
+                (int(self.recipe_ids[candidates[i]]), float(column_scores[i])) for i in order
+            ]
+        return results
+
+
+def load_user_batch(user_ids):
+    # Đọc tủ lạnh và tác giả yêu thích của cả lô người dùng bằng hai truy vấn
+    pantries, favorite_authors = {}, {}
+    for user_id, ingredient_id in PantryItems.objects.filter(user_id__in=user_ids, ingredient_id__isnull=False).values_list('user_id', 'ingredient_id'):
+        pantries.setdefault(user_id, []).append(ingredient_id)
+    for user_id, author_id in FavoriteRecipes.objects.filter(user_id__in=user_ids).values_list('user_id', 'recipe__author_id'):
+        favorite_authors.setdefault(user_id, set()).add(author_id)
+    return pantries, favorite_authors
+
+
+def batch_suggestions(user_ids, mode=MODE_STRICT, top_n=20, batch_size=500, excluded=None, matrix=None):
+    # Sinh (user_id, [(recipe_id, score), ...]) cho từng người dùng, xử lý theo lô
+    # để bộ nhớ của ma trận điểm (công thức x người dùng) luôn bị chặn.
+    matrix = matrix or SuggestionMatrix.build()
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        chunk = user_ids[start:start + batch_size]
+        pantries, favorite_authors = load_user_batch(chunk)
+        results = matrix.score(chunk, pantries, favorite_authors, excluded=excluded, mode=mode, top_n=top_n)
+        for user_id in chunk:
+            yield user_id, results[user_id]
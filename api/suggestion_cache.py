@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def fingerprint(ids):
+    # Dấu vân tay ngắn gọn của một tập id, không phụ thuộc thứ tự
+    payload = ','.join(map(str, sorted(set(ids))))
+    return hashlib.sha1(payload.encode('ascii')).hexdigest()
+
+
+# --- CACHE KẾT QUẢ ĐỀ XUẤT THEO NGƯỜI DÙNG ---
+class SuggestionCache:
+    # LRU có giới hạn trong bộ nhớ tiến trình. Khóa gồm
+    # (user, mode, danh sách đen đã sắp xếp, vân tay tủ lạnh, vân tay tác giả yêu thích,
+    #  phiên bản chỉ mục đề xuất), nên kết quả cũ không bao giờ bị trả về kể cả khi
+    # tín hiệu bị bỏ lỡ; invalidate_user chỉ giải phóng sớm các mục chắc chắn đã cũ.
+
+    def __init__(self, max_entries=None):
+        self._lock = threading.Lock()
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_entries(self):
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, 'SUGGESTION_CACHE_SIZE', 1024)
+
+    def get(self, key):
+        with self._lock:
+            ranked = self._entries.get(key)
+            if ranked is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return ranked
+
+    def set(self, key, ranked):
+        user_id = key[0]
+        with self._lock:
+            self._entries[key] = ranked
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        ranked = self.get(key)
+        if ranked is None:
+            ranked = tuple(compute())
+            self.set(key, ranked)
+        return ranked
+
+    def _forget(self, key):
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+suggestion_cache = SuggestionCache()
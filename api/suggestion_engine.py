@@ -0,0 +1,251 @@
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Recipes, Ingredients, RecipeProfiles
+
+# --- CÁC HẰNG SỐ CHẤM ĐIỂM (dùng chung cho mọi nơi tính điểm đề xuất) ---
+MATCH_POINTS = 20.0
+FAVORITE_AUTHOR_BONUS = 50.0
+DEFAULT_PENALTY = 25.0
+FLEXIBLE_MAX_MISSING = 2
+
+# Điểm phạt cho mỗi nguyên liệu còn thiếu, theo nhóm
+WEIGHTS = {
+    Ingredients.Category.PROTEIN: 100.0,
+    Ingredients.Category.CARB: 80.0,
+    Ingredients.Category.VEGETABLE: 50.0,
+    Ingredients.Category.SPICE: 10.0,
+    Ingredients.Category.OTHER: 25.0,
+}
+
+MODE_STRICT = 'strict'
+MODE_FLEXIBLE = 'flexible'
+
+
+def category_weight(category):
+    return WEIGHTS.get(category, DEFAULT_PENALTY)
+
+
+class _RecipeEntry:
+    __slots__ = ('author_id', 'status', 'ingredient_ids', 'all_mask', 'scored_mask', 'category_masks')
+
+    def __init__(self, author_id, status, ingredient_ids):
+        self.author_id = author_id
+        self.status = status
+        self.ingredient_ids = frozenset(ingredient_ids)
+        self.all_mask = 0
+        self.scored_mask = 0
+        self.category_masks = {}
+
+
+class SuggestionIndex:
+    # Chỉ mục đảo nguyên liệu -> công thức giữ trong bộ nhớ tiến trình.
+    # Mỗi công thức lưu:
+    #   - all_mask: bitset mọi nguyên liệu (dùng cho danh sách đen)
+    #   - scored_mask: bitset các nguyên liệu không phải STAPLE (dùng để đếm khớp/thiếu)
+    #   - category_masks: bitset theo từng nhóm, nhân với WEIGHTS ra điểm phạt
+    # Dữ liệu được nạp từ bảng recipe_profiles (xem api/recipe_profiles.py).
+    # Chỉ mục được cập nhật từng phần qua tín hiệu (xem api/signals.py) và dựng lại
+    # toàn bộ sau SUGGESTION_INDEX_TTL giây để các worker khác cũng không bị cũ quá lâu.
+
+    def __init__(self, ttl=None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._built_at = None
+        # Tăng mỗi khi dữ liệu chỉ mục đổi; là một phần khóa của cache đề xuất (api/suggestion_cache.py)
+        self.version = 0
+        self._bits = {}
+        self._categories = {}
+        self._recipes = {}
+        self._by_ingredient = {}
+        self._unscored = set()
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, 'SUGGESTION_INDEX_TTL', 300)
+
+    # --- DỰNG CHỈ MỤC ---
+    def rebuild(self):
+        # Đọc một dòng hẹp cho mỗi công thức từ recipe_profiles thay vì JOIN recipe_ingredients
+        from .recipe_profiles import ensure_recipe_profiles
+        ensure_recipe_profiles()
+        categories = dict(Ingredients.objects.values_list('id', 'category'))
+        profiles = list(RecipeProfiles.objects.values_list('recipe_id', 'author_id', 'status', 'ingredient_ids'))
+
+        with self._lock:
+            self._bits = {}
+            self._categories = categories
+            self._recipes = {}
+            self._by_ingredient = {}
+            self._unscored = set()
+            for recipe_id, author_id, recipe_status, ingredient_ids in profiles:
+                self._put(recipe_id, _RecipeEntry(author_id, recipe_status, ingredient_ids))
+            self._built_at = time.monotonic()
+            self.version += 1
+
+    def _ensure_fresh(self):
+        if self._built_at is None or time.monotonic() - self._built_at > self.ttl:
+            self.rebuild()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def current_version(self):
+        self._ensure_fresh()
+        return self.version
+
+    def _bit(self, ingredient_id):
+        bit = self._bits.get(ingredient_id)
+        if bit is None:
+            bit = self._bits[ingredient_id] = 1 << len(self._bits)
+        return bit
+
+    def _compile(self, entry):
+        entry.all_mask = 0
+        entry.scored_mask = 0
+        entry.category_masks = {}
+        for ingredient_id in entry.ingredient_ids:
+            bit = self._bit(ingredient_id)
+            entry.all_mask |= bit
+            category = self._categories.get(ingredient_id, Ingredients.Category.OTHER)
+            if category == Ingredients.Category.STAPLE:
+                continue
+            entry.scored_mask |= bit
+            entry.category_masks[category] = entry.category_masks.get(category, 0) | bit
+
+    def _put(self, recipe_id, entry):
+        self._drop(recipe_id)
+        self._compile(entry)
+        self._recipes[recipe_id] = entry
+        for ingredient_id in entry.ingredient_ids:
+            self._by_ingredient.setdefault(ingredient_id, set()).add(recipe_id)
+        if not entry.scored_mask:
+            self._unscored.add(recipe_id)
+
+    def _drop(self, recipe_id):
+        entry = self._recipes.pop(recipe_id, None)
+        if entry is None:
+            return
+        for ingredient_id in entry.ingredient_ids:
+            recipe_ids = self._by_ingredient.get(ingredient_id)
+            if recipe_ids is not None:
+                recipe_ids.discard(recipe_id)
+                if not recipe_ids:
+                    del self._by_ingredient[ingredient_id]
+        self._unscored.discard(recipe_id)
+
+    # --- CẬP NHẬT TỪNG PHẦN (gọi từ tín hiệu) ---
+    def refresh_recipes(self, recipe_ids):
+        recipe_ids = set(recipe_ids)
+        if not recipe_ids or self._built_at is None:
+            return
+        profiles = {
+            recipe_id: (author_id, recipe_status, ingredient_ids)
+            for recipe_id, author_id, recipe_status, ingredient_ids in RecipeProfiles.objects.filter(recipe_id__in=recipe_ids).values_list('recipe_id', 'author_id', 'status', 'ingredient_ids')
+        }
+        ingredient_ids = {ingredient_id for _, _, ids in profiles.values() for ingredient_id in ids}
+        categories = dict(Ingredients.objects.filter(id__in=ingredient_ids).values_list('id', 'category')) if ingredient_ids else {}
+
+        with self._lock:
+            self._categories.update(categories)
+            for recipe_id in recipe_ids:
+                if recipe_id not in profiles:
+                    self._drop(recipe_id)
+                    continue
+                author_id, recipe_status, ingredient_ids = profiles[recipe_id]
+                self._put(recipe_id, _RecipeEntry(author_id, recipe_status, ingredient_ids))
+            self.version += 1
+
+    def refresh_ingredients(self, ingredient_ids):
+        ingredient_ids = set(ingredient_ids)
+        if not ingredient_ids or self._built_at is None:
+            return
+        categories = dict(Ingredients.objects.filter(id__in=ingredient_ids).values_list('id', 'category'))
+
+        deleted_affected = set()
+        with self._lock:
+            affected = set()
+            for ingredient_id in ingredient_ids:
+                if ingredient_id not in categories:
+                    # Nguyên liệu bị xóa: CSDL tự xóa dòng recipe_ingredients (ON DELETE CASCADE)
+                    self._categories.pop(ingredient_id, None)
+                    deleted_affected |= self._by_ingredient.get(ingredient_id, set())
+                elif self._categories.get(ingredient_id) != categories[ingredient_id]:
+                    self._categories[ingredient_id] = categories[ingredient_id]
+                    affected |= self._by_ingredient.get(ingredient_id, set())
+            for recipe_id in affected - deleted_affected:
+                entry = self._recipes[recipe_id]
+                self._put(recipe_id, _RecipeEntry(entry.author_id, entry.status, entry.ingredient_ids))
+            if affected:
+                self.version += 1
+        self.refresh_recipes(deleted_affected)
+
+    # --- CHẤM ĐIỂM ---
+    def suggest(self, user_id, pantry_ingredient_ids, favorite_author_ids=(), excluded_ingredient_ids=(), mode=MODE_STRICT):
+        # Trả về danh sách (recipe_id, score) đã xếp hạng, cho kết quả giống hệt
+        # truy vấn annotate cũ của SuggestionView.
+        self._ensure_fresh()
+        favorite_author_ids = set(favorite_author_ids)
+
+        with self._lock:
+            pantry_mask = 0
+            for ingredient_id in pantry_ingredient_ids:
+                bit = self._bits.get(ingredient_id)
+                if bit is not None:
+                    pantry_mask |= bit
+
+            excluded_recipes = set()
+            for ingredient_id in excluded_ingredient_ids:
+                excluded_recipes |= self._by_ingredient.get(ingredient_id, set())
+
+            if mode == MODE_STRICT:
+                # Chế độ nghiêm ngặt chỉ cần xét các công thức có chứa ít nhất một
+                # nguyên liệu trong tủ lạnh, cộng với các công thức chỉ toàn STAPLE.
+                candidates = set(self._unscored)
+                for ingredient_id in pantry_ingredient_ids:
+                    candidates |= self._by_ingredient.get(ingredient_id, set())
+            else:
+                candidates = self._recipes.keys()
+
+            results = []
+            for recipe_id in candidates:
+                if recipe_id in excluded_recipes:
+                    continue
+                entry = self._recipes[recipe_id]
+                if entry.status != Recipes.Status.PUBLIC and entry.author_id != user_id:
+                    continue
+
+                missing_mask = entry.scored_mask & ~pantry_mask
+                missing_count = missing_mask.bit_count()
+                if mode == MODE_STRICT:
+                    if missing_count:
+                        continue
+                elif missing_count > FLEXIBLE_MAX_MISSING:
+                    continue
+
+                match_count = (entry.scored_mask & pantry_mask).bit_count()
+                missing_penalty_score = 0.0
+                if missing_count:
+                    for category, mask in entry.category_masks.items():
+                        missing_penalty_score += category_weight(category) * (mask & missing_mask).bit_count()
+                elif not entry.ingredient_ids:
+                    # Giữ đúng hành vi của truy vấn SQL cũ: công thức không có nguyên liệu
+                    # vẫn có một dòng NULL sau LEFT JOIN và bị phạt mức mặc định.
+                    missing_penalty_score = DEFAULT_PENALTY
+                author_bonus = FAVORITE_AUTHOR_BONUS if entry.author_id in favorite_author_ids else 0.0
+                score = match_count * MATCH_POINTS - missing_penalty_score + author_bonus
+
+                if mode != MODE_STRICT and score < 0:
+                    continue
+                results.append((recipe_id, score))
+
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+
+suggestion_index = SuggestionIndex()
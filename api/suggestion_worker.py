@@ -0,0 +1,190 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PantryItems, ChangeLogEntries, PrecomputedSuggestions
+from .suggestion_engine import suggestion_index, MODE_STRICT, MODE_FLEXIBLE
+from .sync import high_water_mark, settled_entries
+
+Entity = ChangeLogEntries.Entity
+MODES = (MODE_STRICT, MODE_FLEXIBLE)
+# Thay đổi catalog làm mọi người dùng phải tính lại; thay đổi tủ lạnh/yêu thích chỉ ảnh hưởng chủ của nó
+CATALOG_ENTITIES = (Entity.RECIPE, Entity.INGREDIENT)
+USER_ENTITIES = (Entity.PANTRY, Entity.FAVORITE)
+# Số dòng change_log đọc mỗi lần thăm dò
+POLL_LIMIT = 5000
+
+# Đề xuất tính sẵn: tiến trình nền (lệnh suggestion_worker) đọc change_log (api/change_log.py),
+# gom người dùng bị ảnh hưởng vào một hàng đợi cục bộ, chờ hết dồn dập rồi tính lại và lưu vào
+# bảng precomputed_suggestions. SuggestionView chỉ đọc kết quả đó, và tự tính đồng bộ như cũ
+# khi chưa có kết quả hoặc kết quả có thể đã cũ (xem load_precomputed).
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# --- ĐỌC KẾT QUẢ TÍNH SẴN (trên đường đi của request) ---
+def load_precomputed(user_id, mode):
+    # Trả về (ranked, truncated), hoặc None nếu phải tính đồng bộ vì:
+    # - worker chưa tính cho người dùng này,
+    # - tủ lạnh / yêu thích của chính họ đã đổi sau lần tính (luôn thấy ngay thay đổi của mình),
+    # - catalog đã đổi quá SUGGESTION_PRECOMPUTE_MAX_STALENESS giây mà worker chưa tính lại.
+    mode = MODE_STRICT if mode == MODE_STRICT else MODE_FLEXIBLE
+    row = PrecomputedSuggestions.objects.filter(user_id=user_id, mode=mode).values_list('ranked', 'truncated', 'log_cursor').first()
+    if row is None:
+        return None
+    ranked, truncated, log_cursor = row
+    # Mỗi truy vấn chỉ đọc dòng đầu tiên theo chỉ mục (user_id, id) hoặc (entity, id)
+    # thay vì gộp mọi dòng change_log sau log_cursor
+    newer = ChangeLogEntries.objects.filter(id__gt=log_cursor)
+    if newer.filter(user_id=user_id, entity__in=USER_ENTITIES).exists():
+        return None
+    catalog_changes = [
+        newer.filter(entity=entity).order_by('id').values_list('created_at', flat=True).first()
+        for entity in CATALOG_ENTITIES
+    ]
+    catalog_changes = [changed_at for changed_at in catalog_changes if changed_at is not None]
+    changed_at = min(catalog_changes) if catalog_changes else None
+    max_staleness = timedelta(seconds=_setting('SUGGESTION_PRECOMPUTE_MAX_STALENESS', 60))
+    if changed_at is not None and timezone.now() - changed_at > max_staleness:
+        return None
+    return [tuple(item) for item in ranked], truncated
+
+
+# --- TÍNH VÀ LƯU ---
+def active_user_ids():
+    # Người dùng có tủ lạnh: những người duy nhất có đề xuất ở chế độ nghiêm ngặt
+    return sorted(set(PantryItems.objects.filter(ingredient_id__isnull=False).values_list('user_id', flat=True)))
+
+
+def precompute(user_ids, log_cursor, top=None):
+    # Tính cả hai chế độ cho một lô người dùng bằng đúng SuggestionIndex.suggest mà
+    # SuggestionView dùng, rồi ghi đè (upsert) một lần cho cả lô
+    from .suggestion_batch import load_user_batch
+    top = top or _setting('SUGGESTION_PRECOMPUTE_TOP', 200)
+    pantries, favorite_authors = load_user_batch(user_ids)
+    now = timezone.now()
+    rows = []
+    for user_id in user_ids:
+        pantry = pantries.get(user_id, [])
+        favorites = favorite_authors.get(user_id, set())
+        for mode in MODES:
+            ranked = suggestion_index.suggest(user_id, pantry, favorite_author_ids=favorites, mode=mode) if pantry or mode != MODE_STRICT else []
+            rows.append(PrecomputedSuggestions(
+                user_id=user_id,
+                mode=mode,
+                ranked=[[recipe_id, score] for recipe_id, score in ranked[:top]],
+                truncated=len(ranked) > top,
+                log_cursor=log_cursor,
+                computed_at=now,
+            ))
+    PrecomputedSuggestions.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['user', 'mode'],
+        update_fields=['ranked', 'truncated', 'log_cursor', 'computed_at'],
+        batch_size=500,
+    )
+    return len(rows)
+
+
+# --- HÀNG ĐỢI CỤC BỘ ---
+class RefreshQueue:
+    # Mỗi người dùng có nhiều nhất một mục (các thay đổi liên tiếp được gộp lại). Một mục đến hạn
+    # khi đã yên `debounce` giây kể từ thay đổi cuối, hoặc đã chờ `max_delay` giây kể từ thay đổi
+    # đầu tiên (để người dùng sửa tủ lạnh liên tục vẫn được tính lại).
+
+    def __init__(self, debounce, max_delay):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, user_ids, now):
+        for user_id in user_ids:
+            first_seen, _ = self._pending.get(user_id, (now, now))
+            self._pending[user_id] = (first_seen, now)
+
+    def pop_due(self, now):
+        due = [
+            user_id for user_id, (first_seen, last_seen) in self._pending.items()
+            if now - last_seen >= self.debounce or now - first_seen >= self.max_delay
+        ]
+        for user_id in due:
+            del self._pending[user_id]
+        return sorted(due)
+
+
+# --- VÒNG LẶP CỦA WORKER ---
+class SuggestionWorker:
+
+    def __init__(self, debounce=None, max_delay=None, batch_size=500, clock=time.monotonic, log=None):
+        self.queue = RefreshQueue(
+            _setting('SUGGESTION_PRECOMPUTE_DEBOUNCE', 2) if debounce is None else debounce,
+            _setting('SUGGESTION_PRECOMPUTE_MAX_DELAY', 30) if max_delay is None else max_delay,
+        )
+        self.batch_size = batch_size
+        self.clock = clock
+        self.log = log or (lambda message: None)
+        self.cursor = None
+
+    def start(self):
+        # Đọc nhật ký từ mốc hiện tại và tính lại cho mọi người dùng đang hoạt động
+        self.cursor = high_water_mark()
+        suggestion_index.rebuild()
+        return self.refresh(active_user_ids())
+
+    def poll(self):
+        entries = list(
+            settled_entries().filter(id__gt=self.cursor).order_by('id')
+            .values_list('id', 'entity', 'object_id', 'user_id')[:POLL_LIMIT]
+        )
+        if not entries:
+            return 0
+        self.cursor = entries[-1][0]
+
+        recipe_ids, ingredient_ids, user_ids = set(), set(), set()
+        for _, entity, object_id, user_id in entries:
+            if entity == Entity.RECIPE:
+                recipe_ids.add(object_id)
+            elif entity == Entity.INGREDIENT:
+                ingredient_ids.add(object_id)
+            elif entity in USER_ENTITIES:
+                user_ids.add(user_id)
+
+        # Tín hiệu chỉ cập nhật chỉ mục đề xuất của tiến trình đã ghi; worker tự cập nhật từ nhật ký
+        if ingredient_ids:
+            suggestion_index.refresh_ingredients(ingredient_ids)
+        if recipe_ids:
+            suggestion_index.refresh_recipes(recipe_ids)
+        now = self.clock()
+        if recipe_ids or ingredient_ids:
+            user_ids |= set(active_user_ids())
+        self.queue.add(user_ids, now)
+        return len(entries)
+
+    def refresh(self, user_ids):
+        for start in range(0, len(user_ids), self.batch_size):
+            chunk = user_ids[start:start + self.batch_size]
+            # Chốt mốc nhật ký trước khi đọc tủ lạnh, để thay đổi xảy ra trong lúc tính vẫn bị nhận ra
+            started = time.perf_counter()
+            precompute(chunk, high_water_mark())
+            self.log(f'Đã tính lại đề xuất cho {len(chunk)} người dùng trong {time.perf_counter() - started:.2f}s.')
+        return len(user_ids)
+
+    def run_once(self):
+        polled = self.poll()
+        return polled, self.refresh(self.queue.pop_due(self.clock()))
+
+    def run(self, interval=1.0, iterations=None):
+        self.start()
+        count = 0
+        while iterations is None or count < iterations:
+            self.run_once()
+            count += 1
+            time.sleep(interval)
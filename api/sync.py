@@ -0,0 +1,137 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Recipes, Ingredients, PantryItems, ShoppingListItems, FavoriteRecipes, ChangeLogEntries
+from .serializers import RecipeSerializer, IngredientSerializer, PantryItemReadSerializer, ShoppingListItemSerializer
+
+Entity = ChangeLogEntries.Entity
+Action = ChangeLogEntries.Action
+
+# Đồng bộ tăng dần cho client offline (GET /api/sync/?cursor=<n>).
+# Cursor là id lớn nhất của change_log mà client đã nhận. Mỗi phần trả về
+# {"created": [...], "updated": [...], "deleted": [id, ...]}: created/updated là trạng thái
+# hiện tại của đối tượng, deleted là id đã bị xóa hoặc không còn nhìn thấy được
+# (công thức chuyển sang riêng tư, nguyên liệu bị từ chối, bỏ yêu thích).
+# Không có cursor, hoặc cursor cũ hơn phần nhật ký còn giữ lại: reset=true, client tải lại
+# toàn bộ qua các endpoint danh sách (hoặc /api/export/) rồi đồng bộ tiếp từ cursor trả về.
+
+# Phần công khai và phần riêng của người dùng
+PUBLIC_ENTITIES = (Entity.INGREDIENT, Entity.RECIPE)
+USER_ENTITIES = (Entity.PANTRY, Entity.SHOPPING_LIST, Entity.FAVORITE)
+SECTION_NAMES = {
+    Entity.INGREDIENT: 'ingredients',
+    Entity.RECIPE: 'recipes',
+    Entity.PANTRY: 'pantry',
+    Entity.SHOPPING_LIST: 'shopping_list',
+    Entity.FAVORITE: 'favorites',
+}
+
+
+def parse_cursor(request):
+    value = request.query_params.get('cursor')
+    if value in (None, ''):
+        return None
+    if not value.isdigit():
+        raise ValidationError({'cursor': ['Cursor phải là số nguyên không âm.']})
+    return int(value)
+
+
+# --- ĐỌC NHẬT KÝ ---
+def settled_entries():
+    # Id được cấp khi INSERT nhưng transaction commit theo thứ tự khác; chỉ đọc các dòng đã ghi
+    # quá SYNC_SETTLE_SECONDS giây để một dòng id nhỏ commit muộn không bị cursor bỏ qua
+    settle = timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+    return ChangeLogEntries.objects.filter(created_at__lte=timezone.now() - settle)
+
+
+def high_water_mark():
+    return settled_entries().order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def oldest_entry_id():
+    return ChangeLogEntries.objects.order_by('id').values_list('id', flat=True).first()
+
+
+def _split(ids, present, created_ids):
+    # present: {id: dữ liệu đã serialize} của các đối tượng còn nhìn thấy được
+    section = {'created': [], 'updated': [], 'deleted': []}
+    for object_id in sorted(ids):
+        if object_id not in present:
+            section['deleted'].append(object_id)
+        elif object_id in created_ids:
+            section['created'].append(present[object_id])
+        else:
+            section['updated'].append(present[object_id])
+    return section
+
+
+def _serialized(serializer_class, queryset, key='id'):
+    return {getattr(instance, key): serializer_class(instance).data for instance in queryset}
+
+
+def _present(entity, ids, user):
+    # Trạng thái hiện tại của các đối tượng có trong nhật ký, mỗi phần một truy vấn
+    if entity == Entity.INGREDIENT:
+        return _serialized(IngredientSerializer, Ingredients.objects.filter(id__in=ids, status=Ingredients.Status.APPROVED))
+    if entity == Entity.RECIPE:
+        return _serialized(RecipeSerializer, Recipes.objects.filter(id__in=ids, status=Recipes.Status.PUBLIC))
+    if entity == Entity.PANTRY:
+        return _serialized(PantryItemReadSerializer, PantryItems.objects.filter(user=user, id__in=ids).select_related('ingredient'))
+    if entity == Entity.SHOPPING_LIST:
+        return _serialized(ShoppingListItemSerializer, ShoppingListItems.objects.filter(user=user, id__in=ids).select_related('ingredient'))
+    # Yêu thích được ghi theo id công thức: còn trong danh sách thì trả về công thức đó
+    favorite_ids = FavoriteRecipes.objects.filter(user=user, recipe_id__in=ids).values('recipe_id')
+    return _serialized(RecipeSerializer, Recipes.objects.filter(id__in=favorite_ids))
+
+
+# --- TẬP HỢP THAY ĐỔI ---
+def collect_changes(user, cursor):
+    entities = PUBLIC_ENTITIES + (USER_ENTITIES if user.is_authenticated else ())
+    # Chốt mốc trước khi đọc để dòng vừa "lắng" trong lúc truy vấn không bị nhảy qua
+    high_water = high_water_mark()
+    oldest = oldest_entry_id()
+    if cursor is None or (oldest is not None and cursor < oldest - 1) or cursor > high_water:
+        data = {'cursor': high_water, 'has_more': False, 'reset': True}
+        data.update({SECTION_NAMES[entity]: {'created': [], 'updated': [], 'deleted': []} for entity in entities})
+        return data
+
+    visible = Q(user_id__isnull=True)
+    if user.is_authenticated:
+        visible |= Q(user_id=user.id)
+    page_size = getattr(settings, 'SYNC_PAGE_SIZE', 1000)
+    rows = list(
+        settled_entries()
+        .filter(visible, id__gt=cursor, id__lte=high_water, entity__in=entities)
+        .order_by('id')
+        .values_list('id', 'entity', 'object_id', 'action')[:page_size + 1]
+    )
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    ids = defaultdict(set)
+    created_ids = defaultdict(set)
+    for _, entity, object_id, action in rows:
+        ids[entity].add(object_id)
+        if action == Action.CREATED:
+            created_ids[entity].add(object_id)
+
+    data = {'cursor': rows[-1][0] if has_more else high_water, 'has_more': has_more, 'reset': False}
+    for entity in entities:
+        present = _present(entity, ids[entity], user) if ids[entity] else {}
+        data[SECTION_NAMES[entity]] = _split(ids[entity], present, created_ids[entity])
+    return data
+
+
+def prune_change_log(days):
+    # Xóa nhật ký cũ hơn `days` ngày nhưng luôn giữ dòng mới nhất, để client có cursor cũ hơn
+    # phần còn lại vẫn nhận ra mình cần tải lại toàn bộ (reset)
+    newest = ChangeLogEntries.objects.order_by('-id').values_list('id', flat=True).first()
+    if newest is None:
+        return 0
+    deleted, _ = ChangeLogEntries.objects.filter(created_at__lt=timezone.now() - timedelta(days=days), id__lt=newest).delete()
+    return deleted
@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class UnmanagedModelTestRunner(DiscoverRunner):
+    # Các bảng của app api được tạo từ database.sql (managed = False) và migration
+    # của app chạy SQL trên các bảng đó, nên CSDL test trống không dùng được.
+    # Runner này tạm bật managed và bỏ qua migration của api để Django tạo bảng từ model.
+
+    def setup_databases(self, **kwargs):
+        self._unmanaged_models = [model for model in apps.get_app_config('api').get_models() if not model._meta.managed]
+        for model in self._unmanaged_models:
+            model._meta.managed = True
+        self._migration_modules = getattr(settings, 'MIGRATION_MODULES', {})
+        settings.MIGRATION_MODULES = {**self._migration_modules, 'api': None}
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        settings.MIGRATION_MODULES = self._migration_modules
+        for model in self._unmanaged_models:
+            model._meta.managed = False
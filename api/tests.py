@@ -1,3 +1,1085 @@
-from django.test import TestCase
+import base64
+import gzip
+import json
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from DSS_Cooking_backend import database
+
+from .autocomplete import ingredient_autocomplete
+from .benchmarks import run_benchmarks, run_serializer_benchmark, run_render_benchmark
+from .catalog_import import CatalogImporter, import_catalog
+from .compression import choose_encoding
+from .fast_json import FastJSONRenderer, FastJSONParser
+from .index_audit import sequential_scans
+from .metrics import metrics_registry
+from .pagination import RankedKeysetPagination
+from .quantities import parse_quantity, backfill_quantities
+from .replicas import ReplicaRouter, ReplicaRoutingMiddleware, RoutingState, _state
+from .models import Recipes, Ingredients, RecipeIngredients, PantryItems, ShoppingListItems, FavoriteRecipes, RecipeProfiles, CatalogImports, ChangeLogEntries
+from .signals import batched_changes
+from .suggestion_batch import SuggestionMatrix
+from .suggestion_cache import SuggestionCache, suggestion_cache
+from .suggestion_engine import suggestion_index
+from .suggestion_worker import RefreshQueue, SuggestionWorker
+from .views import rank_suggestions
+
+
+# --- KIỂM TRA SỐ TRUY VẤN CỦA TỪNG ENDPOINT ---
+class QueryCountTestCase(APITestCase):
+    # Mỗi endpoint phải chạy một số truy vấn cố định, không phụ thuộc số dòng trả về.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        cls.ingredients = [
+            Ingredients.objects.create(name=f'Nguyên liệu {i}', status='approved', category=Ingredients.Category.VEGETABLE)
+            for i in range(12)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertQueryCount(self, url, expected, grow, sizes=(1, 10)):
+        # Gọi endpoint với hai kích thước dữ liệu khác nhau; số truy vấn phải bằng expected cả hai lần
+        for size in sizes:
+            grow(size)
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_recipe_detail(self):
+        recipe = Recipes.objects.create(title='Canh chua', instructions='Nấu', author=self.user, status='public')
+
+        def grow(size):
+            RecipeIngredients.objects.filter(recipe=recipe).delete()
+            for ingredient in self.ingredients[:size]:
+                RecipeIngredients.objects.create(recipe=recipe, ingredient=ingredient, quantity='1')
+
+        # công thức (kèm tác giả) + nguyên liệu (kèm tên)
+        self.assertQueryCount(f'/api/recipes/{recipe.id}/', 2, grow)
+
+    def test_pantry_list(self):
+        def grow(size):
+            PantryItems.objects.filter(user=self.user).delete()
+            for ingredient in self.ingredients[:size]:
+                PantryItems.objects.create(user=self.user, ingredient=ingredient, quantity='1')
+
+        self.assertQueryCount('/api/pantry/', 1, grow)
+
+    def test_shopping_list(self):
+        def grow(size):
+            ShoppingListItems.objects.filter(user=self.user).delete()
+            for ingredient in self.ingredients[:size]:
+                ShoppingListItems.objects.create(user=self.user, ingredient=ingredient, quantity='1', is_checked=False)
+
+        self.assertQueryCount('/api/shopping-list/', 1, grow)
+
+    def test_shopping_list_generate(self):
+        staple = Ingredients.objects.create(name='Muối', status='approved', category=Ingredients.Category.STAPLE)
+        recipes = []
+        for i in range(10):
+            recipe = Recipes.objects.create(title=f'Món {i}', instructions='Nấu', author=self.user, status='private')
+            RecipeIngredients.objects.create(recipe=recipe, ingredient=self.ingredients[i], quantity='200', unit='g')
+            RecipeIngredients.objects.create(recipe=recipe, ingredient=self.ingredients[10], quantity='1', unit='quả')
+            RecipeIngredients.objects.create(recipe=recipe, ingredient=staple, quantity='1', unit='thìa')
+            recipes.append(recipe.id)
+        PantryItems.objects.create(user=self.user, ingredient=self.ingredients[0], quantity='1')
+        ShoppingListItems.objects.create(user=self.user, ingredient=self.ingredients[1], quantity='1 kg', is_checked=False)
+        ShoppingListItems.objects.create(user=self.user, ingredient=self.ingredients[2], quantity='1', is_checked=True)
+
+        # công thức + tổng lượng theo nguyên liệu + tủ lạnh + danh sách hiện tại + upsert + đọc lại, trong một transaction
+        for size in (1, 10):
+            with self.assertNumQueries(8):
+                response = self.client.post('/api/shopping-list/generate/', {'recipe_ids': recipes[:size]}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(response.data['in_pantry'], [self.ingredients[0].id])
+        self.assertCountEqual(response.data['unchanged'], [self.ingredients[1].id, self.ingredients[10].id])
+        self.assertEqual(response.data['updated'], [self.ingredients[2].id])
+        items = {item['ingredient']: item for item in response.data['items']}
+        self.assertNotIn(staple.id, items)
+        self.assertEqual(items[self.ingredients[1].id]['quantity'], '1 kg')
+        self.assertEqual(items[self.ingredients[2].id], {**items[self.ingredients[2].id], 'quantity': '200 g', 'is_checked': False})
+        self.assertEqual(ShoppingListItems.objects.filter(user=self.user).count(), 10)
+
+        other = Recipes.objects.create(title='Món riêng', instructions='Nấu', author=User.objects.create_user(username='khach'), status='private')
+        response = self.client.post('/api/shopping-list/generate/', {'recipe_ids': [recipes[0], other.id]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# --- PHÂN TRANG KEYSET ---
+class KeysetPaginationTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        for i in range(7):
+            Recipes.objects.create(title=f'Món {i}', instructions='Nấu', author=cls.user, status='public', cooking_time_minutes=[None, 10, 20][i % 3])
+
+    def setUp(self):
+        cache.clear()
+
+    def collect(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_recipe_pages_cover_every_row_once(self):
+        expected = list(Recipes.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.collect('/api/recipes/?page_size=3'), expected)
+
+    def test_ordering_with_nulls(self):
+        recipes = Recipes.objects.all()
+        expected = [recipe.id for recipe in sorted(recipes, key=lambda r: (r.cooking_time_minutes is None, r.cooking_time_minutes or 0, r.id))]
+        self.assertEqual(self.collect('/api/recipes/?page_size=2&ordering=cooking_time_minutes'), expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/recipes/?cursor=khong-hop-le').status_code, 404)
+        # Đúng dạng nhưng giá trị sai kiểu so với trường sắp xếp
+        for values in (['2020-01-01T00:00:00', 'abc'], ['notadate', 1], [{'a': 1}, 1]):
+            cursor = base64.urlsafe_b64encode(json.dumps({'v': values, 'r': False}).encode()).decode()
+            self.assertEqual(self.client.get('/api/recipes/', {'cursor': cursor}).status_code, 404)
+        cursor = base64.urlsafe_b64encode(json.dumps({'v': ['abc', '2020-01-01T00:00:00', 1], 'r': False}).encode()).decode()
+        self.assertEqual(self.client.get('/api/recipes/', {'search': 'Món', 'cursor': cursor}).status_code, 404)
+
+    def test_ranked_pages_forward_and_back(self):
+        ranked = [(3, 9.0), (1, 5.0), (4, 5.0), (2, 1.0), (5, 0.0)]
+        pages = []
+        url = 'http://testserver/api/suggestions/?page_size=2'
+        while url:
+            paginator = RankedKeysetPagination()
+            pages.append(paginator.paginate_queryset(ranked, Request(RequestFactory().get(url))))
+            url = paginator.get_next_link()
+        self.assertEqual(pages, [ranked[:2], ranked[2:4], ranked[4:]])
+
+        previous = paginator.get_previous_link()
+        paginator = RankedKeysetPagination()
+        self.assertEqual(paginator.paginate_queryset(ranked, Request(RequestFactory().get(previous))), ranked[2:4])
+
+
+# --- ĐƯỜNG ĐỌC NHANH CHO DANH SÁCH ---
+class CompactListTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        for i in range(5):
+            Recipes.objects.create(title=f'Món {i}', instructions='Nấu rất lâu', author=cls.user, status='public', cooking_time_minutes=10 * i)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_default_fields_skip_instructions(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title', 'description', 'difficulty', 'cooking_time_minutes'])
+        response = self.client.get('/api/recipes/my-recipes/')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'title', 'description', 'difficulty', 'cooking_time_minutes', 'status'])
+
+    def test_fields_param(self):
+        # Mọi trang chỉ một truy vấn kể cả khi sắp xếp theo cột không được chọn
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/recipes/?fields=instructions,id&ordering=-cooking_time_minutes&page_size=2')
+        self.assertEqual(response.data['results'][0], {'id': Recipes.objects.get(title='Món 4').id, 'instructions': 'Nấu rất lâu'})
+        with self.assertNumQueries(1):
+            response = self.client.get(response.data['next'])
+        self.assertEqual([recipe['id'] for recipe in response.data['results']], list(Recipes.objects.filter(title__in=['Món 2', 'Món 1']).order_by('-cooking_time_minutes').values_list('id', flat=True)))
+
+        response = self.client.get('/api/recipes/?fields=id,author')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+
+# --- TÌM KIẾM KHÔNG PHÂN BIỆT DẤU ---
+class RecipeSearchTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        beef = Ingredients.objects.create(name='Thịt bò', status='approved', category=Ingredients.Category.PROTEIN)
+        cls.bo_kho = Recipes.objects.create(title='Bò kho', instructions='Nấu', author=cls.user, status='public')
+        cls.pho = Recipes.objects.create(title='Phở gà', description='Nước dùng đậm đà', instructions='Nấu', author=cls.user, status='public')
+        cls.stew = Recipes.objects.create(title='Món hầm', instructions='Nấu', author=cls.user, status='public')
+        RecipeIngredients.objects.create(recipe=cls.stew, ingredient=beef, quantity='500g')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_unaccented_query_matches_accented_title(self):
+        self.assertEqual(self.search('bo kho'), {self.bo_kho.id})
+        self.assertEqual(self.search('BÒ KHO'), {self.bo_kho.id})
+
+    def test_matches_description_and_ingredient_names(self):
+        self.assertEqual(self.search('dam da'), {self.pho.id})
+        self.assertEqual(self.search('thit bo'), {self.stew.id})
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search('pho bo'), set())
+
+    def test_search_pages_cover_every_match_once(self):
+        ids = []
+        url = '/api/recipes/?search=bo&page_size=1'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, [self.stew.id, self.bo_kho.id])
+
+
+# --- CACHE PHẢN HỒI CÔNG KHAI ---
+class ResponseCacheTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        cls.recipe = Recipes.objects.create(title='Canh chua', instructions='Nấu', author=cls.user, status='public')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['title'], 'Canh chua')
+
+    def test_etag_not_modified(self):
+        etag = self.client.get('/api/recipes/')['ETag']
+        response = self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_invalidates_cached_responses(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        self.client.get(url)
+        self.client.get('/api/recipes/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.title = 'Canh chua cá'
+            self.recipe.save()
+        self.assertEqual(self.client.get(url).json()['title'], 'Canh chua cá')
+        self.assertEqual(self.client.get('/api/recipes/').json()['results'][0]['title'], 'Canh chua cá')
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/recipes/')
+        self.assertFalse(response.has_header('X-Cache'))
+
+
+# --- JSON NHANH VÀ NÉN PHẢN HỒI ---
+class FastJSONTestCase(SimpleTestCase):
+
+    def test_renderer_matches_json_renderer(self):
+        data = {
+            'title': 'Phở bò\u2028tái', 'score': 0.1 + 0.2, 'big': 2 ** 70, 'amount': Decimal('1.5'),
+            'created_at': timezone.now(), 'tags': ('a', 'b'), 'nested': [{1: None}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'), JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_parser(self):
+        self.assertEqual(FastJSONParser().parse(BytesIO('{"title": "Bò kho"}'.encode('utf-8'))), {'title': 'Bò kho'})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": NaN}'))
+
+    def test_non_finite_floats(self):
+        # Khác biệt duy nhất đã biết với JSONRenderer: orjson ghi NaN / vô cực thành null
+        data = {'score': float('nan')}
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(data)
+        self.assertEqual(FastJSONRenderer().render(data), b'{"score":null}')
+        with override_settings(FAST_JSON_ENABLED=False), self.assertRaises(ValueError):
+            FastJSONRenderer().render(data)
+
+    def test_choose_encoding(self):
+        with mock.patch('api.compression.brotli', object()):
+            self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+            self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+            self.assertEqual(choose_encoding('*;q=0.1'), 'br')
+        with mock.patch('api.compression.brotli', None):
+            self.assertEqual(choose_encoding('br'), None)
+            self.assertEqual(choose_encoding('br, gzip;q=0.2'), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0, identity'), None)
+        self.assertEqual(choose_encoding(''), None)
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_BYTES=200)
+class ResponseCompressionTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        for i in range(10):
+            Recipes.objects.create(title=f'Canh chua cá lóc {i}', description='Món canh chua miền Tây', instructions='Nấu', author=cls.user, status='public')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_gzip_when_accepted(self):
+        plain = self.client.get('/api/recipes/')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        response = self.client.get('/api/recipes/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, 16 + zlib.MAX_WBITS), plain.content)
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        # ETag yếu của bản nén vẫn cho 304
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+        self.assertEqual(self.client.get('/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag'], HTTP_ACCEPT_ENCODING='gzip').status_code, 304)
+        # Phần đệm ngẫu nhiên (chống BREACH) nằm trong trường tên file của header gzip
+        self.assertTrue(response.content[3] & 0x08)
+
+    def test_token_responses_are_never_compressed(self):
+        response = self.client.post('/api/login/', {'username': 'chef', 'password': 'secret'}, format='json', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(len(response.content), 200)
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_small_responses_stay_plain(self):
+        recipe = Recipes.objects.first()
+        response = self.client.get(f'/api/recipes/{recipe.id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+# --- GỢI Ý TÊN NGUYÊN LIỆU ---
+class IngredientAutocompleteTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        names = ['Thịt bò', 'Thịt gà', 'Thịt heo xay', 'Bột ngọt', 'Đường']
+        cls.ingredients = {name: Ingredients.objects.create(name=name, status='approved') for name in names}
+        # Thịt gà được dùng trong hai công thức, thịt bò trong một
+        for index, name in enumerate(['Thịt gà', 'Thịt gà', 'Thịt bò']):
+            recipe = Recipes.objects.create(title=f'Món {index}', instructions='Nấu', author=cls.user, status='public')
+            RecipeIngredients.objects.create(recipe=recipe, ingredient=cls.ingredients[name], quantity='1')
+
+    def setUp(self):
+        ingredient_autocomplete.invalidate()
+
+    def names(self, query, **params):
+        response = self.client.get('/api/ingredients/autocomplete/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data['results']]
+
+    def test_prefix_popularity_and_typos(self):
+        self.assertEqual(self.names('thit'), ['Thịt gà', 'Thịt bò', 'Thịt heo xay'])
+        self.assertEqual(self.names('THỊT', limit=1), ['Thịt gà'])
+        # Khớp cả đầu từ ở giữa tên và chữ "đ"
+        self.assertEqual(self.names('xay'), ['Thịt heo xay'])
+        self.assertEqual(self.names('duong'), ['Đường'])
+        # Sai một ký tự
+        self.assertEqual(self.names('bto ngot'), ['Bột ngọt'])
+        self.assertEqual(self.names(''), [])
+
+        # Chỉ mục đã dựng thì không truy vấn CSDL
+        with self.assertNumQueries(0):
+            self.names('thit heo')
+
+    def test_admin_approval_updates_index(self):
+        from django.contrib.admin.sites import site
+        from .admin import IngredientAdmin
+
+        pending = Ingredients.objects.create(name='Nước mắm', status='pending')
+        self.assertEqual(self.names('nuoc mam'), [])
+        with self.captureOnCommitCallbacks(execute=True), mock.patch.object(IngredientAdmin, 'message_user'):
+            IngredientAdmin(Ingredients, site).make_approved(None, Ingredients.objects.filter(pk=pending.pk))
+        self.assertEqual(self.names('nuoc mam'), ['Nước mắm'])
+
+
+# --- CACHE ĐỀ XUẤT THEO NGƯỜI DÙNG ---
+class SuggestionCacheTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        cls.rice = Ingredients.objects.create(name='Gạo', status='approved', category=Ingredients.Category.CARB)
+        cls.egg = Ingredients.objects.create(name='Trứng', status='approved', category=Ingredients.Category.PROTEIN)
+        cls.recipe = Recipes.objects.create(title='Cơm trứng', instructions='Nấu', author=cls.user, status='public')
+        RecipeIngredients.objects.create(recipe=cls.recipe, ingredient=cls.rice, quantity='1 bát')
+        RecipeIngredients.objects.create(recipe=cls.recipe, ingredient=cls.egg, quantity='2 quả')
+
+    def setUp(self):
+        suggestion_index.invalidate()
+        suggestion_cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def suggest(self):
+        response = self.client.get('/api/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_repeated_request_hits_cache(self):
+        PantryItems.objects.create(user=self.user, ingredient=self.rice, quantity='1')
+        PantryItems.objects.create(user=self.user, ingredient=self.egg, quantity='1')
+        hits = suggestion_cache.hits
+        self.assertEqual(self.suggest(), [self.recipe.id])
+        self.assertEqual(self.suggest(), [self.recipe.id])
+        self.assertEqual(suggestion_cache.hits, hits + 1)
+
+    def test_pantry_change_is_not_served_stale(self):
+        PantryItems.objects.create(user=self.user, ingredient=self.rice, quantity='1')
+        self.assertEqual(self.suggest(), [])
+        response = self.client.post('/api/pantry/bulk/', {'items': [{'ingredient': self.egg.id, 'quantity': '2'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.suggest(), [self.recipe.id])
+
+    def test_lru_eviction(self):
+        cache = SuggestionCache(max_entries=2)
+        for user_id in (1, 2, 3):
+            cache.set((user_id, 'strict'), ())
+        self.assertIsNone(cache.get((1, 'strict')))
+        self.assertEqual(cache.get((3, 'strict')), ())
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+# --- DỮ LIỆU GIẢ LẬP VÀ BỘ ĐO HIỆU NĂNG ---
+class BenchmarkSuiteTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_catalog', users=5, recipes=40, ingredients=30, max_ingredients=8, stdout=StringIO())
+
+    def test_synthetic_catalog_spans_every_category(self):
+        self.assertEqual(Recipes.objects.count(), 40)
+        self.assertEqual(set(Ingredients.objects.values_list('category', flat=True)), set(Ingredients.Category.values))
+        self.assertEqual(RecipeProfiles.objects.count(), 40)
+
+    def test_benchmark_report(self):
+        report = run_benchmarks(password='benchmark123', names=['recipes.list', 'suggestions.flexible', 'pantry.bulk'], iterations=2, warmup=0)
+        self.assertEqual([result['name'] for result in report['results']], ['recipes.list', 'pantry.bulk', 'suggestions.flexible'])
+        for result in report['results']:
+            self.assertEqual(result['status_codes'], [200])
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(report['uncovered_routes'], [])
+
+    def test_serializer_benchmark_is_byte_identical(self):
+        report = run_serializer_benchmark(count=40, iterations=2, warmup=0)
+        self.assertEqual([result['name'] for result in report['results']], ['recipes.all', 'recipes.default', 'my_recipes.all', 'my_recipes.default'])
+        self.assertTrue(all(result['identical'] for result in report['results']))
+
+    def test_render_benchmark_is_byte_identical(self):
+        report = run_render_benchmark(iterations=2, warmup=0, suggestion_page_size=10)
+        self.assertEqual([result['name'] for result in report['results']], ['recipes.detail', 'suggestions.flexible'])
+        for result in report['results']:
+            self.assertTrue(result['identical'])
+            self.assertLess(result['encodings']['gzip']['bytes'], result['bytes'])
+
+
+# --- XUẤT DỮ LIỆU DẠNG LUỒNG ---
+class ExportTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_catalog', users=3, recipes=30, ingredients=20, max_ingredients=6, stdout=StringIO())
+        cls.user = User.objects.filter(pantryitems__isnull=False).first()
+
+    def read(self, response):
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_public_catalog_as_json_and_ndjson(self):
+        public = Recipes.objects.filter(status='public').count()
+        rows = json.loads(self.read(self.client.get('/api/export/recipes/')))
+        self.assertEqual(len(rows), public)
+        self.assertTrue(all(row['status'] == 'public' and 'ingredients' in row for row in rows))
+
+        response = self.client.get('/api/export/recipes/', {'format': 'ndjson'}, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = gzip.decompress(self.read(response)).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], rows)
+
+        # gzip;q=0 nghĩa là không nhận gzip
+        response = self.client.get('/api/export/recipes/', HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(self.read(response)), rows)
+
+    def test_updated_since(self):
+        recipe = Recipes.objects.filter(status='public').first()
+        Recipes.objects.exclude(pk=recipe.pk).update(updated_at=timezone.now() - timedelta(days=10))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = json.loads(self.read(self.client.get('/api/export/recipes/', {'updated_since': since})))
+        self.assertEqual([row['id'] for row in rows], [recipe.id])
+        self.assertEqual(self.client.get('/api/export/recipes/', {'updated_since': 'hôm qua'}).status_code, 400)
+
+    def test_admin_actions_touch_updated_at(self):
+        draft = Recipes.objects.exclude(status='public').first()
+        Recipes.objects.update(updated_at=timezone.now() - timedelta(days=10))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        admin_user = User.objects.create_superuser(username='quan_tri', password='secret')
+        self.client.force_login(admin_user)
+        response = self.client.post('/admin/api/recipes/', {'action': 'make_public', '_selected_action': [draft.pk]})
+        self.assertEqual(response.status_code, 302)
+        rows = json.loads(self.read(self.client.get('/api/export/recipes/', {'updated_since': since})))
+        self.assertEqual([row['id'] for row in rows], [draft.id])
+
+    def test_user_data(self):
+        self.assertEqual(self.client.get('/api/export/me/').status_code, 401)
+        self.client.force_authenticate(self.user)
+        data = json.loads(self.read(self.client.get('/api/export/me/')))
+        self.assertEqual(list(data), ['recipes', 'pantry', 'favorites', 'shopping_list'])
+        self.assertEqual(len(data['recipes']), Recipes.objects.filter(author=self.user).count())
+        self.assertEqual(len(data['pantry']), PantryItems.objects.filter(user=self.user).count())
+
+        lines = [json.loads(line) for line in self.read(self.client.get('/api/export/me/', {'format': 'ndjson'})).splitlines()]
+        self.assertEqual(sum(1 for line in lines if line['type'] == 'pantry'), len(data['pantry']))
+
+
+# --- NHẬP CATALOG HÀNG LOẠT ---
+class CatalogImportTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='secret', is_staff=True)
+        cls.beef = Ingredients.objects.create(name='Thịt bò', status='approved', category=Ingredients.Category.PROTEIN)
+
+    def ndjson(self, count, bad=()):
+        lines = []
+        for index in range(count):
+            record = {'title': f'Món {index}', 'instructions': 'Nấu', 'cooking_time_minutes': '15', 'ingredients': [
+                {'name': ' thịt  BÒ ', 'quantity': '300', 'unit': 'g'},
+                {'name': f'Rau {index % 3}', 'quantity': '1'},
+            ]}
+            lines.append('{không phải json' if index in bad else json.dumps(record, ensure_ascii=False))
+        return BytesIO(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    def test_batches_resolve_and_create_ingredients(self):
+        report = import_catalog(self.ndjson(25, bad={3}), 'ndjson', self.admin, 'test.ndjson', batch_size=10)
+        self.assertEqual((report['records'], report['recipes_created'], report['rows_skipped'], report['batches']), (25, 24, 1, 3))
+        self.assertEqual(report['errors'][0]['record'], 4)
+        self.assertEqual(report['ingredients_created'], 3)
+        self.assertEqual(RecipeIngredients.objects.filter(ingredient=self.beef).count(), 24)
+        self.assertEqual(set(Ingredients.objects.filter(name__startswith='Rau').values_list('status', flat=True)), {'pending'})
+        self.assertEqual(RecipeProfiles.objects.count(), 24)
+
+    def test_created_ingredients_resolve_by_normalized_name(self):
+        # Dòng bị ignore_conflicts bỏ qua vì trùng một tên chỉ khác chữ hoa/thường
+        Ingredients.objects.create(name='HÀNH TÍM', status='approved')
+        importer = CatalogImporter(self.admin)
+        with mock.patch.object(Ingredients.objects, 'bulk_create'):
+            created = importer.create_ingredients({'hành tím': 'hành tím'})
+        self.assertEqual(created, {'hành tím': Ingredients.objects.get(name='HÀNH TÍM').id})
+        with self.assertRaises(ValueError):
+            import_catalog(self.ndjson(1), 'ndjson', self.admin, 'test.ndjson', batch_size=0)
+
+    def test_resume_from_checkpoint(self):
+        class Stop(Exception):
+            pass
+
+        def stop_after_first_batch(report):
+            raise Stop
+
+        with self.assertRaises(Stop):
+            import_catalog(self.ndjson(25), 'ndjson', self.admin, 'test.ndjson', batch_size=10, progress=stop_after_first_batch)
+        checkpoint = CatalogImports.objects.get()
+        self.assertEqual((checkpoint.status, checkpoint.records_done), ('failed', 10))
+
+        report = import_catalog(self.ndjson(25), 'ndjson', self.admin, 'test.ndjson', batch_size=10)
+        self.assertEqual((report['resumed_from'], report['records'], report['total_recipes_created']), (10, 15, 25))
+        self.assertEqual(Recipes.objects.count(), 25)
+        # File đã nhập xong thì không nhập lại
+        self.assertEqual(import_catalog(self.ndjson(25), 'ndjson', self.admin, 'test.ndjson')['records'], 0)
+
+    def test_admin_endpoint_with_csv(self):
+        content = 'title,instructions,difficulty,ingredients\nBò xào,Xào,medium,Thịt bò|200|g; Hành|1\nThiếu,,easy,Hành\n'
+        upload = SimpleUploadedFile('catalog.csv', content.encode('utf-8'), content_type='text/csv')
+        self.assertEqual(self.client.post('/api/import/catalog/', {'file': upload}).status_code, 401)
+        self.client.force_authenticate(self.admin)
+        upload.seek(0)
+        response = self.client.post('/api/import/catalog/', {'file': upload, 'status': 'private'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['recipes_created'], response.data['rows_skipped']), (1, 1))
+        recipe = Recipes.objects.get(title='Bò xào')
+        self.assertEqual((recipe.status, recipe.difficulty, recipe.author_id), ('private', 'medium', self.admin.id))
+
+
+# --- ĐỀ XUẤT TÍNH SẴN ---
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SuggestionWorkerTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        cls.rice = Ingredients.objects.create(name='Gạo', status='approved', category=Ingredients.Category.CARB)
+        cls.egg = Ingredients.objects.create(name='Trứng', status='approved', category=Ingredients.Category.PROTEIN)
+        cls.rice_dish = Recipes.objects.create(title='Cơm trắng', instructions='Nấu', author=User.objects.create_user(username='khach'), status='public')
+        cls.egg_dish = Recipes.objects.create(title='Cơm trứng', instructions='Nấu', author=cls.user, status='public')
+        RecipeIngredients.objects.create(recipe=cls.rice_dish, ingredient=cls.rice, quantity='1 bát')
+        RecipeIngredients.objects.create(recipe=cls.egg_dish, ingredient=cls.rice, quantity='1 bát')
+        RecipeIngredients.objects.create(recipe=cls.egg_dish, ingredient=cls.egg, quantity='2 quả')
+        PantryItems.objects.create(user=cls.user, ingredient=cls.rice, quantity='1')
+
+    def setUp(self):
+        suggestion_index.invalidate()
+        suggestion_cache.clear()
+        self.now = 0.0
+        self.worker = SuggestionWorker(debounce=2, max_delay=10, clock=lambda: self.now)
+        self.client.force_authenticate(self.user)
+
+    def suggest(self, precomputed):
+        # precomputed: có được phục vụ từ kết quả tính sẵn hay không
+        with mock.patch('api.views.rank_suggestions', wraps=rank_suggestions) as compute:
+            response = self.client.get('/api/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(compute.called, not precomputed)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_precomputed_list_is_served_and_refreshed_after_debounce(self):
+        self.assertEqual(self.suggest(precomputed=False), [self.rice_dish.id])
+        self.assertEqual(self.worker.start(), 1)
+        self.assertEqual(self.suggest(precomputed=True), [self.rice_dish.id])
+
+        # Thay đổi của chính người dùng: tính đồng bộ cho tới khi worker tính lại
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/pantry/', {'ingredient': self.egg.id, 'quantity': '2'}, format='json')
+        expected = [self.egg_dish.id, self.rice_dish.id]
+        self.assertEqual(self.suggest(precomputed=False), expected)
+        self.assertEqual(self.worker.run_once(), (1, 0))
+        self.now = 2
+        self.assertEqual(self.worker.run_once(), (0, 1))
+        self.assertEqual(self.suggest(precomputed=True), expected)
+
+    def test_catalog_changes_have_bounded_staleness(self):
+        self.worker.start()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rice_dish.status = 'private'
+            self.rice_dish.save()
+        # Vẫn dùng danh sách tính sẵn nhưng không lộ công thức vừa chuyển sang riêng tư
+        self.assertEqual(self.suggest(precomputed=True), [])
+        with override_settings(SUGGESTION_PRECOMPUTE_MAX_STALENESS=-1):
+            self.assertEqual(self.suggest(precomputed=False), [])
+
+        # Worker gộp thay đổi catalog thành một lần tính lại cho mọi người dùng đang hoạt động
+        self.worker.run_once()
+        self.now = 2
+        self.worker.run_once()
+        self.assertEqual(self.suggest(precomputed=True), [])
+
+    def test_batch_matrix_matches_engine_in_chunks(self):
+        other = User.objects.get(username='khach')
+        pantries = {self.user.id: [self.rice.id, self.egg.id], other.id: [self.rice.id]}
+        matrix = SuggestionMatrix.build()
+        with mock.patch('api.suggestion_batch.SCORE_CHUNK_USERS', 1):
+            results = matrix.score([self.user.id, other.id], pantries, {}, mode='flexible', top_n=5)
+        for user_id, pantry in pantries.items():
+            self.assertEqual(results[user_id], suggestion_index.suggest(user_id, pantry, mode='flexible')[:5])
+        with self.assertRaises(ValueError):
+            matrix.score([self.user.id], pantries, {}, top_n=0)
+
+    def test_queue_coalesces_and_debounces(self):
+        queue = RefreshQueue(debounce=2, max_delay=5)
+        queue.add([1, 2], now=0)
+        queue.add([1], now=1.5)
+        self.assertEqual(queue.pop_due(2), [2])
+        self.assertEqual(queue.pop_due(3), [])
+        queue.add([1], now=4)
+        self.assertEqual(queue.pop_due(5), [1])
+        self.assertEqual(len(queue), 0)
+
+
+# --- GOM TÍN HIỆU KHI XÓA HÀNG LOẠT ---
+class SignalBatchingTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        cls.ingredients = [Ingredients.objects.create(name=f'Nguyên liệu {i}', status='approved') for i in range(3)]
+        cls.recipes = [Recipes.objects.create(title=f'Món {i}', instructions='Nấu', author=cls.user, status='public') for i in range(2)]
+        for recipe in cls.recipes:
+            for ingredient in cls.ingredients:
+                RecipeIngredients.objects.create(recipe=recipe, ingredient=ingredient, quantity='1')
+
+    def test_cascaded_recipe_delete_refreshes_once(self):
+        recipe_id = self.recipes[0].id
+        with mock.patch('api.signals.refresh_recipe_profiles') as refresh:
+            self.recipes[0].delete()
+        refresh.assert_called_once_with([recipe_id])
+
+    def test_ingredient_deletes_are_coalesced_after_commit(self):
+        with mock.patch('api.signals.refresh_recipe_profiles') as refresh:
+            with self.captureOnCommitCallbacks(execute=True), batched_changes():
+                for ingredient in self.ingredients[:2]:
+                    ingredient_id = ingredient.id
+                    ingredient.delete()
+                    # Như ON DELETE CASCADE của database.sql: xóa thẳng, không phát tín hiệu
+                    RecipeIngredients.objects.filter(ingredient_id=ingredient_id)._raw_delete('default')
+        refresh.assert_called_once_with({recipe.id for recipe in self.recipes})
+
+
+# --- ĐỒNG BỘ TĂNG DẦN ---
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_catalog', users=2, recipes=10, ingredients=10, max_ingredients=4, stdout=StringIO())
+        cls.user = User.objects.filter(pantryitems__isnull=False).first()
+        cls.recipe = Recipes.objects.filter(status='public').exclude(favoriterecipes__user=cls.user).first()
+        # Công thức tạo từ trước: lần lưu sau là "updated", không phải "created"
+        Recipes.objects.filter(pk=cls.recipe.pk).update(created_at=timezone.now() - timedelta(days=1))
+        cls.recipe.refresh_from_db()
+
+    def sync(self, cursor=None):
+        response = self.client.get('/api/sync/', {} if cursor is None else {'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_reset_then_deltas(self):
+        self.client.force_authenticate(self.user)
+        first = self.sync()
+        self.assertTrue(first['reset'])
+        cursor = first['cursor']
+
+        pantry_item = PantryItems.objects.filter(user=self.user).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/pantry/{pantry_item.pk}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        data = self.sync(cursor)
+        self.assertFalse(data['reset'])
+        self.assertEqual(data['pantry']['deleted'], [pantry_item.pk])
+        self.assertEqual([recipe['id'] for recipe in data['favorites']['created']], [self.recipe.pk])
+        self.assertEqual(self.sync(data['cursor'])['pantry'], {'created': [], 'updated': [], 'deleted': []})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(self.sync(data['cursor'])['favorites']['deleted'], [self.recipe.pk])
+
+    def test_catalog_changes_are_public(self):
+        cursor = self.sync()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.title = 'Tên mới'
+            self.recipe.save()
+        data = self.sync(cursor)
+        self.assertNotIn('pantry', data)
+        self.assertEqual([recipe['title'] for recipe in data['recipes']['updated']], ['Tên mới'])
+
+        # Công thức chuyển sang riêng tư thì client ẩn danh nhận tombstone
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.status = 'private'
+            self.recipe.save()
+        self.assertEqual(self.sync(data['cursor'])['recipes']['deleted'], [self.recipe.pk])
+
+    def test_other_users_changes_are_hidden_and_old_cursor_resets(self):
+        other = User.objects.exclude(pk=self.user.pk).first()
+        self.client.force_authenticate(other)
+        cursor = self.sync()['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            PantryItems.objects.filter(user=self.user).delete()
+        self.assertEqual(self.sync(cursor)['pantry']['deleted'], [])
+
+        ChangeLogEntries.objects.filter(id__lte=cursor + 1).delete()
+        self.assertTrue(self.sync(0)['reset'])
+        self.assertEqual(self.client.get('/api/sync/', {'cursor': 'abc'}).status_code, 400)
+
+
+# --- VIEW ASYNC (ASGI) ---
+class AsyncViewsTestCase(APITestCase):
+    # Bản async phải trả về đúng nội dung của endpoint đồng bộ tương ứng
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_synthetic_catalog', users=3, recipes=30, ingredients=20, max_ingredients=6, stdout=StringIO())
+        cls.user = User.objects.filter(pantryitems__isnull=False).first()
+        cls.recipe = Recipes.objects.filter(status='public').first()
+
+    def setUp(self):
+        cache.clear()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.client.credentials(HTTP_AUTHORIZATION=self.headers['Authorization'])
+
+    async def assertSameResponse(self, path, params=None, headers=None):
+        expected = await self.async_client.get(f'/api/{path}', params or {}, headers=headers)
+        response = await self.async_client.get(f'/api/async/{path}', params or {}, headers=headers)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content.replace(b'/api/', b'/api/async/'))
+        return response
+
+    async def test_recipe_list(self):
+        response = await self.assertSameResponse('recipes/', {'page_size': 5}, self.headers)
+        await self.assertSameResponse('recipes/', {'ordering': 'cooking_time_minutes'})
+        await self.assertSameResponse('recipes/', {'cursor': response.json()['next'].split('cursor=')[1].split('&')[0], 'page_size': 5})
+        await self.assertSameResponse('recipes/', {'cursor': 'sai'})
+        await self.assertSameResponse('recipes/', {'author': 999999})
+
+    async def test_recipe_detail(self):
+        await self.assertSameResponse(f'recipes/{self.recipe.id}/')
+        await self.assertSameResponse('recipes/999999/', headers=self.headers)
+
+    async def test_suggestions(self):
+        response = await self.assertSameResponse('suggestions/', {'mode': 'flexible', 'exclude': ['1', '2']}, self.headers)
+        self.assertTrue(response.json()['results'])
+        await self.assertSameResponse('suggestions/')
+        await self.assertSameResponse('suggestions/', headers={'Authorization': 'Bearer sai'})
+
+    async def test_queries_are_measured(self):
+        response = await self.async_client.get('/api/async/suggestions/', headers=self.headers)
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+        self.assertEqual((await self.async_client.post('/api/async/recipes/')).status_code, 405)
+
+
+# --- ĐO THỜI GIAN VÀ SỐ CÂU SQL THEO REQUEST ---
+class RequestMetricsTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', email='chef@example.com', password='secret')
+        cls.admin = User.objects.create_user(username='admin', email='admin@example.com', password='secret', is_staff=True)
+        ingredient = Ingredients.objects.create(name='Muối', status='approved', category=Ingredients.Category.STAPLE)
+        PantryItems.objects.create(user=cls.user, ingredient=ingredient, quantity='1')
+
+    def setUp(self):
+        metrics_registry.reset()
+
+    def test_server_timing_header(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/pantry/')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="1 queries", serialize;dur=[\d.]+')
+
+    def test_stats_are_aggregated_per_route(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(3):
+            self.client.get('/api/pantry/')
+        self.client.force_authenticate(self.admin)
+        routes = {(route['method'], route['route']): route for route in self.client.get('/api/stats/requests/').data}
+        pantry = routes[('GET', '/api/pantry/')]
+        self.assertEqual(pantry['count'], 3)
+        self.assertEqual(pantry['queries_max'], 1)
+        self.assertEqual(pantry['duration_histogram']['+Inf'], 3)
+
+        text = self.client.get('/api/metrics/').content.decode('utf-8')
+        self.assertIn('dss_http_request_duration_seconds_count{method="GET",route="/api/pantry/"} 3', text)
+
+    def test_repeated_queries_are_flagged(self):
+        self.client.force_authenticate(self.user)
+        with self.settings(METRICS_N_PLUS_ONE_THRESHOLD=1):
+            self.client.get('/api/pantry/')
+        self.client.force_authenticate(self.admin)
+        routes = {route['route']: route for route in self.client.get('/api/stats/requests/').data}
+        self.assertEqual(routes['/api/pantry/']['n_plus_one_requests'], 1)
+
+    def test_stats_require_admin_or_token(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get('/api/stats/requests/').status_code, 403)
+        self.client.force_authenticate(None)
+        with self.settings(METRICS_TOKEN='bi-mat'):
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='bi-mat').status_code, 200)
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_X_METRICS_TOKEN='sai').status_code, 401)
+
+
+# --- KIỂM TRA CHỈ MỤC ---
+class IndexAuditTestCase(APITestCase):
+
+    def test_sequential_scan_detection(self):
+        postgres_plan = (
+            'Limit  (cost=0.29..8.31 rows=1 width=4)\n'
+            '  ->  Nested Loop\n'
+            '        ->  Seq Scan on recipes  (cost=0.00..35.50 rows=10 width=4)\n'
+            '        ->  Index Scan using recipe_profiles_pkey on recipe_profiles'
+        )
+        self.assertEqual(sequential_scans(postgres_plan), ['recipes'])
+        sqlite_plan = '3 0 0 SCAN recipes\n8 0 0 SEARCH pantry_items USING INDEX x (user_id=?)\n9 0 0 SCAN ingredients USING COVERING INDEX y'
+        self.assertEqual(sequential_scans(sqlite_plan), ['recipes'])
+
+
+# --- CẤU HÌNH CSDL ---
+class DatabaseConfigTestCase(SimpleTestCase):
+
+    def test_sqlite_fallback_without_database_url(self):
+        databases = database.build_databases(Path('/srv/app'), {})
+        self.assertEqual(databases['default']['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertTrue(database.uses_sqlite_fallback(databases))
+
+    def test_database_url_required_outside_development(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database.build_databases(Path('/srv/app'), {}, allow_sqlite=False)
+        databases = database.build_databases(Path('/srv/app'), {'SQLITE_PATH': '/tmp/bench.sqlite3'}, allow_sqlite=False)
+        self.assertEqual(databases['default']['NAME'], '/tmp/bench.sqlite3')
+
+    def test_persistent_connections_and_replicas(self):
+        databases = database.build_databases(Path('/srv/app'), {
+            'DATABASE_URL': 'postgres://u:p@primary:5432/dss?sslmode=require',
+            'DATABASE_REPLICA_URLS': 'postgres://u:p@replica-a/dss, postgres://u:p@replica-b/dss',
+        })
+        self.assertEqual(databases['default']['CONN_MAX_AGE'], 60)
+        self.assertTrue(databases['default']['CONN_HEALTH_CHECKS'])
+        self.assertEqual(databases['default']['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual(database.replica_aliases(databases), ['replica_1', 'replica_2'])
+        self.assertEqual(databases['replica_2']['HOST'], 'replica-b')
+        self.assertEqual(databases['replica_1']['TEST'], {'MIRROR': 'default'})
+
+    def test_native_pool(self):
+        env = {'DATABASE_URL': 'postgres://u:p@primary/dss', 'DB_POOL': 'true', 'DB_POOL_MAX_SIZE': '20'}
+        with mock.patch.object(database, 'pool_available', return_value=True):
+            config = database.build_databases(Path('/srv/app'), env)['default']
+        self.assertEqual(config['OPTIONS']['pool'], {'min_size': 2, 'max_size': 20, 'timeout': 10})
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+        with mock.patch.object(database, 'pool_available', return_value=False), self.assertWarns(UserWarning):
+            config = database.build_databases(Path('/srv/app'), env)['default']
+        self.assertNotIn('pool', config.get('OPTIONS', {}))
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+
+
+# --- ĐIỀU HƯỚNG ĐỌC SANG BẢN SAO ---
+class _FakeHealth:
+    def __init__(self, healthy):
+        self.healthy = healthy
+
+    def is_healthy(self, alias):
+        return alias in self.healthy
+
+
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def route(self, state, healthy=('replica_1', 'replica_2')):
+        router = ReplicaRouter(replicas=['replica_1', 'replica_2'], health=_FakeHealth(healthy))
+        token = _state.set(state)
+        try:
+            return [router.db_for_read(Recipes) for _ in range(3)]
+        finally:
+            _state.reset(token)
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.route(None), ['default'] * 3)
+
+    def test_safe_requests_round_robin_healthy_replicas(self):
+        self.assertEqual(self.route(RoutingState(True)), ['replica_1', 'replica_2', 'replica_1'])
+        self.assertEqual(self.route(RoutingState(True), healthy=('replica_2',)), ['replica_2'] * 3)
+        self.assertEqual(self.route(RoutingState(True), healthy=()), ['default'] * 3)
+
+    def test_write_pins_rest_of_request_to_primary(self):
+        router = ReplicaRouter(replicas=['replica_1'], health=_FakeHealth(['replica_1']))
+        state = RoutingState(True)
+        token = _state.set(state)
+        try:
+            self.assertEqual(router.db_for_read(PantryItems), 'replica_1')
+            self.assertEqual(router.db_for_write(PantryItems), 'default')
+            self.assertEqual(router.db_for_read(PantryItems), 'default')
+        finally:
+            _state.reset(token)
+
+    def test_sticky_after_write(self):
+        cache.clear()
+        seen = []
+
+        def view(request):
+            seen.append(_state.get().use_replica)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        with mock.patch('api.replicas.replica_aliases', return_value=['replica_1']):
+            for method in ('get', 'post', 'get'):
+                request = getattr(factory, method)('/api/pantry/')
+                request.user = mock.Mock(is_authenticated=True, pk=7)
+                middleware(request)
+        self.assertEqual(seen, [True, False, False])
+
+    def test_replicas_require_shared_cache(self):
+        with mock.patch('api.replicas.replica_aliases', return_value=['replica_1']):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+# --- LƯỢNG ĐÃ CHUẨN HÓA ---
+class QuantityParsingTestCase(SimpleTestCase):
+
+    def test_parse_quantity(self):
+        cases = {
+            ('300g', None): (Decimal('300'), 'g'),
+            ('1,5 kg', None): (Decimal('1500'), 'g'),
+            ('1 1/2', 'muỗng canh'): (Decimal('22.5'), 'ml'),
+            ('½ chén', None): (Decimal('125'), 'ml'),
+            ('2-3 quả', None): (Decimal('3'), 'qua'),
+            ('2 trái', None): (Decimal('2'), 'qua'),
+            ('4', None): (Decimal('4'), ''),
+            ('2 bó', None): (Decimal('2'), 'bo'),
+            ('vừa đủ', None): (None, None),
+            ('300 g + 2 quả', None): (None, None),
+            # Dấu chấm nhóm nghìn; dấu phẩy + 3 chữ số là mơ hồ nên bỏ qua
+            ('1.500 g', None): (Decimal('1500'), 'g'),
+            ('2.000.000', None): (Decimal('2000000'), ''),
+            ('1.500,5 g', None): (Decimal('1500.5'), 'g'),
+            ('1.5 kg', None): (Decimal('1500'), 'g'),
+            ('0.500 kg', None): (Decimal('500'), 'g'),
+            ('1.000-1.500 ml', None): (Decimal('1500'), 'ml'),
+            ('1,500 kg', None): (None, None),
+            ('1.2.3 g', None): (None, None),
+            (None, None): (None, None),
+        }
+        for (quantity, unit), expected in cases.items():
+            self.assertEqual(parse_quantity(quantity, unit), expected, (quantity, unit))
+
+
+class QuantityAggregationTestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='chef', password='secret')
+        cls.beef, cls.egg, cls.herb = [Ingredients.objects.create(name=name, status='approved') for name in ('Thịt bò', 'Trứng', 'Rau thơm')]
+        cls.recipes = [Recipes.objects.create(title=f'Món {i}', instructions='Nấu', author=cls.user, status='public') for i in range(2)]
+        RecipeIngredients.objects.create(recipe=cls.recipes[0], ingredient=cls.beef, quantity='300', unit='g')
+        RecipeIngredients.objects.create(recipe=cls.recipes[1], ingredient=cls.beef, quantity='0,5', unit='kg')
+        RecipeIngredients.objects.create(recipe=cls.recipes[0], ingredient=cls.egg, quantity='2', unit='quả')
+        RecipeIngredients.objects.create(recipe=cls.recipes[1], ingredient=cls.egg, quantity='3 trái')
+        RecipeIngredients.objects.create(recipe=cls.recipes[0], ingredient=cls.herb, quantity='1', unit='bó')
+        RecipeIngredients.objects.create(recipe=cls.recipes[1], ingredient=cls.herb, quantity='vừa đủ')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_generate_sums_same_unit_and_subtracts_pantry(self):
+        PantryItems.objects.create(user=self.user, ingredient=self.beef, quantity='200 g')
+        PantryItems.objects.create(user=self.user, ingredient=self.egg, quantity='10 quả')
+        response = self.client.post('/api/shopping-list/generate/', {'recipe_ids': [recipe.id for recipe in self.recipes]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['in_pantry'], [self.egg.id])
+        items = {item['ingredient']: item['quantity'] for item in response.data['items']}
+        self.assertEqual(items, {self.beef.id: '600 g', self.herb.id: '1 bó + vừa đủ'})
+        beef = ShoppingListItems.objects.get(user=self.user, ingredient=self.beef)
+        self.assertEqual((beef.amount, beef.base_unit), (Decimal('600'), 'g'))
+
+    def test_backfill(self):
+        RecipeIngredients.objects.update(amount=None, base_unit=None)
+        scanned, updated = backfill_quantities(RecipeIngredients, batch_size=4)
+        self.assertEqual((scanned, updated), (6, 5))
+        self.assertEqual(
+            sorted(RecipeIngredients.objects.filter(ingredient=self.beef).values_list('amount', 'base_unit')),
+            [(Decimal('300'), 'g'), (Decimal('500'), 'g')],
+        )
+        self.assertEqual(backfill_quantities(RecipeIngredients, batch_size=4), (6, 0))
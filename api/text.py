@@ -0,0 +1,22 @@
+import unicodedata
+
+# 'đ' không tách được dấu bằng NFD nên phải thay thủ công
+_SPECIAL_LETTERS = str.maketrans({'đ': 'd', 'Đ': 'd'})
+
+
+def fold_text(value):
+    # Chuẩn hóa chuỗi tiếng Việt để tìm kiếm: bỏ dấu, chữ thường, gộp khoảng trắng.
+    # Ví dụ: "Bò  Kho Đặc Biệt" -> "bo kho dac biet"
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFD', value.translate(_SPECIAL_LETTERS))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return ' '.join(value.lower().split())
+
+
+def normalize_name(value):
+    # Khóa so khớp tên nguyên liệu khi nhập dữ liệu: giữ dấu (vì "cá" khác "ca") nhưng
+    # thống nhất dạng Unicode, chữ hoa/thường và khoảng trắng. Ví dụ: " Thịt  Bò" -> "thịt bò"
+    if not value:
+        return ''
+    return ' '.join(unicodedata.normalize('NFC', value).casefold().split())
@@ -1,6 +1,8 @@
 from django.urls import path
+from django.views.decorators.cache import never_cache
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import RecipeListCreateView, RecipeDetailUpdateDestroyView, UserRegisterView, LoginView, PantryView, UserDetailView, IngredientListCreateView, PantryDetailView, MyRecipeListView, SubmitReviewView, SuggestionView, FavoriteToggleView, FavoriteListView, ShoppingListView, ShoppingListDetailView
+from .async_views import AsyncRecipeListView, AsyncRecipeDetailView, AsyncSuggestionView
+from .views import RecipeListCreateView, RecipeDetailUpdateDestroyView, UserRegisterView, LoginView, PantryView, UserDetailView, IngredientListCreateView, IngredientAutocompleteView, PantryDetailView, PantryBulkView, MyRecipeListView, SubmitReviewView, SuggestionView, SuggestionCacheStatsView, RequestStatsView, PrometheusMetricsView, FavoriteToggleView, FavoriteListView, RecipeExportView, UserDataExportView, CatalogImportView, SyncView, ShoppingListView, ShoppingListDetailView, ShoppingListGenerateView
 
 urlpatterns = [
     # Các đường dẫn API
@@ -16,20 +18,44 @@ urlpatterns = [
     # Địa chỉ cho danh sách mua sắm
     path('shopping-list/', ShoppingListView.as_view(), name='shopping-list'),
     path('shopping-list/<int:pk>/', ShoppingListDetailView.as_view(), name='shopping-list-detail'),
+    path('shopping-list/generate/', ShoppingListGenerateView.as_view(), name='shopping-list-generate'),
 
     # Địa chỉ cho người dùng
     path('register/', UserRegisterView.as_view(), name='register'),
-    path('login/', LoginView.as_view(), name='login'),
+    # Phản hồi chứa token: no-store để không bị cache và không bị nén (chống BREACH, xem api/compression.py)
+    path('login/', never_cache(LoginView.as_view()), name='login'),
     path('users/me/', UserDetailView.as_view(), name='user-detail'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/refresh/', never_cache(TokenRefreshView.as_view()), name='token_refresh'),
 
     # Địa chỉ cho tủ lạnh (Pantry)
     path('pantry/', PantryView.as_view(), name='pantry'),
     path('pantry/<int:pk>/', PantryDetailView.as_view(), name='pantry-detail'),
+    path('pantry/bulk/', PantryBulkView.as_view(), name='pantry-bulk'),
 
     # Địa chỉ cho nguyên liệu (Ingredients)
     path('ingredients/', IngredientListCreateView.as_view(), name='ingredient-list'),
+    path('ingredients/autocomplete/', IngredientAutocompleteView.as_view(), name='ingredient-autocomplete'),
 
     # Địa chỉ cho công cụ đề xuất
     path('suggestions/', SuggestionView.as_view(), name='suggestions'),
+
+    # Xuất dữ liệu dạng luồng (JSON hoặc NDJSON)
+    path('export/recipes/', RecipeExportView.as_view(), name='export-recipes'),
+    path('export/me/', UserDataExportView.as_view(), name='export-me'),
+
+    # Đồng bộ tăng dần cho client offline
+    path('sync/', SyncView.as_view(), name='sync'),
+
+    # Nhập catalog hàng loạt cho quản trị viên
+    path('import/catalog/', CatalogImportView.as_view(), name='import-catalog'),
+
+    # Bản async (chỉ GET) của các endpoint đọc nhiều nhất, dùng khi chạy dưới ASGI
+    path('async/recipes/', AsyncRecipeListView.as_view(), name='async-recipe-list'),
+    path('async/recipes/<int:pk>/', AsyncRecipeDetailView.as_view(), name='async-recipe-detail'),
+    path('async/suggestions/', AsyncSuggestionView.as_view(), name='async-suggestions'),
+
+    # Địa chỉ thống kê cho quản trị viên
+    path('stats/suggestion-cache/', SuggestionCacheStatsView.as_view(), name='stats-suggestion-cache'),
+    path('stats/requests/', RequestStatsView.as_view(), name='stats-requests'),
+    path('metrics/', PrometheusMetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -3,11 +3,13 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Count, Q, F, Case, When, FloatField, Sum, Value
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from django.db.models import Q, Sum, Count
 # Import các công cụ để bắt lỗi
-from django.db import utils
+from django.db import utils, transaction
+from django.http import HttpResponse
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 
 from .models import Recipes, PantryItems, Ingredients, RecipeIngredients, ShoppingListItems, FavoriteRecipes
 from django.contrib.auth.models import User
@@ -15,25 +17,46 @@ from .serializers import (
     RecipeSerializer, UserSerializer, 
     PantryItemReadSerializer, PantryItemWriteSerializer,
     IngredientSerializer, RecipeCreateSerializer, MyRecipeSerializer,
-    RecipeDetailSerializer, ShoppingListItemSerializer, IngredientContributeSerializer
+    RecipeDetailSerializer, ShoppingListItemSerializer, IngredientContributeSerializer,
+    PantryBulkSerializer, RecipeExportSerializer, FavoriteExportSerializer, ShoppingListGenerateSerializer
 )
 from rest_framework_simplejwt.views import TokenObtainPairView
+from .suggestion_engine import suggestion_index, MODE_STRICT, MODE_FLEXIBLE
+from .suggestion_cache import suggestion_cache, fingerprint
+from .signals import pantry_changed
+from .mixins import QueryShapingMixin, MetricsMixin, CompactListMixin, RECIPE_INGREDIENTS_PREFETCH
+from .pagination import RankedKeysetPagination
+from .search import RecipeSearchFilter
+from .cache import CachedResponseMixin
+from .metrics import metrics_registry, IsAdminOrMetricsToken
+from .catalog_import import import_catalog, detect_format, FORMATS, DEFAULT_BATCH_SIZE
+from .fast_json import FastJSONRenderer
+from .exports import NDJSONRenderer, parse_updated_since, serialized_rows, streaming_export
+from .change_log import Entity, Action, record_changes
+from .sync import parse_cursor, collect_changes
+from .suggestion_worker import load_precomputed
+from .autocomplete import ingredient_autocomplete, DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT
+from .quantities import quantity_fields, format_amount
 
-class UserRegisterView(generics.CreateAPIView):
+class UserRegisterView(MetricsMixin, generics.CreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
 class LoginView(TokenObtainPairView):
     pass
 
-class UserDetailView(generics.RetrieveAPIView):
+class UserDetailView(MetricsMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
     def get_object(self):
         return self.request.user
 
-class IngredientListCreateView(generics.ListCreateAPIView):
+class IngredientListCreateView(CachedResponseMixin, MetricsMixin, generics.ListCreateAPIView):
     queryset = Ingredients.objects.filter(status='approved')
+    cache_namespaces = ('ingredients',)
+    keyset_ordering = ('name',)
+    page_size = 50
+    max_page_size = 200
     
     # Dùng serializer khác nhau cho việc đọc và ghi
     def get_serializer_class(self):
@@ -50,22 +73,46 @@ class IngredientListCreateView(generics.ListCreateAPIView):
         # Logic không đổi, serializer đã lo việc lấy 'category'
         serializer.save(submitted_by=self.request.user, status='pending')
 
-class RecipeListCreateView(generics.ListCreateAPIView):
+class IngredientAutocompleteView(APIView):
+    # Gợi ý tên nguyên liệu đã duyệt khi người dùng gõ: ?q=thit bo&limit=10.
+    # Tìm trong chỉ mục bộ nhớ (api/autocomplete.py): không dấu, theo đầu mỗi từ, chấp nhận
+    # sai một ký tự, nguyên liệu được dùng trong nhiều công thức đứng trước.
+    permission_classes = [AllowAny]
+
+    def get(self, request, format=None):
+        limit = request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() and int(limit) > 0 else AUTOCOMPLETE_DEFAULT_LIMIT
+        results = ingredient_autocomplete.search(request.query_params.get('q', ''), limit)
+        return Response({'results': [{'id': ingredient_id, 'name': name} for ingredient_id, name in results]}, status=status.HTTP_200_OK)
+
+class RecipeListCreateView(CachedResponseMixin, MetricsMixin, CompactListMixin, generics.ListCreateAPIView):
     queryset = Recipes.objects.filter(status='public')
+    cache_namespaces = ('recipes',)
+    # Danh sách không trả instructions (dài) trừ khi ?fields= yêu cầu, ví dụ ?fields=id,title,instructions
+    compact_heavy_fields = ('instructions',)
+    compact_extra_columns = ('created_at', 'cooking_time_minutes')
     
     # Kích hoạt các bộ lọc
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, RecipeSearchFilter, filters.OrderingFilter]
     
     # Các trường có thể lọc chính xác (ví dụ: /api/recipes/?difficulty=easy)
     filterset_fields = ['difficulty', 'author']
     
-    # Các trường có thể tìm kiếm (ví dụ: /api/recipes/?search=bò kho)
-    # ^: tìm kiếm bắt đầu bằng, =: khớp chính xác, @: tìm kiếm toàn văn, $: regex
-    search_fields = ['title', 'description', 'ingredients__ingredient__name']
+    # Tìm kiếm toàn văn, không phân biệt dấu (ví dụ: /api/recipes/?search=bo kho)
+    # trên tiêu đề, mô tả và tên nguyên liệu - xem api/search.py
     
     # Các trường có thể sắp xếp (ví dụ: /api/recipes/?ordering=-created_at)
     ordering_fields = ['cooking_time_minutes', 'created_at']
 
+    # Phân trang keyset, mặc định công thức mới nhất trước
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_keyset_ordering(self):
+        # Khi tìm kiếm thì xếp theo độ liên quan trước
+        if RecipeSearchFilter.get_search_query(self.request):
+            return ('-search_rank',) + self.keyset_ordering
+        return self.keyset_ordering
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return RecipeCreateSerializer
@@ -77,7 +124,9 @@ class RecipeListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, status='private')
 
-class RecipeDetailUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class RecipeDetailUpdateDestroyView(CachedResponseMixin, MetricsMixin, QueryShapingMixin, generics.RetrieveUpdateDestroyAPIView):
+    def get_cache_namespaces(self):
+        return [f"recipe:{self.kwargs['pk']}"]
     def get_serializer_class(self):
         if self.request.method == 'GET':
             return RecipeDetailSerializer
@@ -86,6 +135,11 @@ class RecipeDetailUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         if self.request.method == 'GET':
             return [AllowAny()]
         return [IsAuthenticated()]
+    # RecipeDetailSerializer đọc author.username và ingredient.name của từng dòng
+    def get_select_related_fields(self):
+        return ['author'] if self.request.method == 'GET' else []
+    def get_prefetch_related_fields(self):
+        return [RECIPE_INGREDIENTS_PREFETCH] if self.request.method == 'GET' else []
     def get_queryset(self):
         user = self.request.user
         if self.request.method == 'GET':
@@ -95,9 +149,12 @@ class RecipeDetailUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
                 return Recipes.objects.filter(status='public')
         return Recipes.objects.filter(author=user)
 
-class MyRecipeListView(generics.ListAPIView):
+class MyRecipeListView(MetricsMixin, CompactListMixin, generics.ListAPIView):
     serializer_class = MyRecipeSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
+    compact_heavy_fields = ('instructions',)
+    compact_extra_columns = ('created_at',)
     def get_queryset(self):
         return Recipes.objects.filter(author=self.request.user).order_by('-created_at')
 
@@ -116,9 +173,13 @@ class SubmitReviewView(APIView):
         recipe.save()
         return Response({'message': 'Công thức đã được gửi đi để duyệt thành công.'}, status=status.HTTP_200_OK)
 
-# --- "CÁI BẪY" ĐƯỢC ĐẶT Ở ĐÂY ---
-class PantryView(generics.ListCreateAPIView):
+# --- TỦ LẠNH ---
+class PantryView(MetricsMixin, QueryShapingMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
+    select_related_fields = ['ingredient']
+    keyset_ordering = ('id',)
+    page_size = 50
+    max_page_size = 200
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -136,115 +197,185 @@ class PantryView(generics.ListCreateAPIView):
         if not ingredient_id:
             return Response({'error': 'Ingredient ID is required.'}, status=status.HTTP_400_BAD_REQUEST)
         
-        print("\n--- BẮT ĐẦU CHIẾN DỊCH ĐẶT BẪY TỦ LẠNH ---")
-        print(f"User: {user.id}, Ingredient ID: {ingredient_id}, Quantity: {quantity}")
-        
         try:
-            # Chúng ta sẽ thử thực hiện hành động nguy hiểm này
-            print("Đang chuẩn bị gọi update_or_create...")
             pantry_item, created = PantryItems.objects.update_or_create(
                 user=user,
                 ingredient_id=ingredient_id,
                 defaults={'quantity': quantity}
             )
-            print("--- LƯU THÀNH CÔNG! ---")
-            
-            serializer = PantryItemReadSerializer(pantry_item)
-            status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-            print("--- HOÀN TẤT, CHUẨN BỊ GỬI RESPONSE ---\n")
-            return Response(serializer.data, status=status_code)
-
         except utils.IntegrityError as e:
-            # BẪY SẬP! Bắt được lỗi ràng buộc database
-            print("--- BẪY SẬP! BẮT ĐƯỢC LỖI INTEGRITYERROR ---")
-            print(f"LỜI KHAI CỦA DATABASE: {e}")
-            print("KẾT LUẬN: Rất có thể ingredient_id không hợp lệ hoặc một ràng buộc khác bị vi phạm.")
-            print("--- KẾT THÚC BÁO CÁO ---\n")
+            # Rất có thể ingredient_id không hợp lệ hoặc một ràng buộc khác bị vi phạm
             raise ValidationError({'database_error': f"Lỗi ràng buộc CSDL: {e}"})
-        
-        except Exception as e:
-            # BẪY SẬP! Bắt được một lỗi chung chung khác
-            print("--- BẪY SẬP! BẮT ĐƯỢC MỘT LỖI KHÁC ---")
-            print(f"LOẠI LỖI: {type(e)}")
-            print(f"CHI TIẾT LỖI: {e}")
-            print("--- KẾT THÚC BÁO CÁO ---\n")
-            raise e
-
-class PantryDetailView(generics.RetrieveUpdateDestroyAPIView):
+
+        serializer = PantryItemReadSerializer(pantry_item)
+        status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response(serializer.data, status=status_code)
+
+class PantryBulkView(APIView):
+    # Đồng bộ nhiều nguyên liệu tủ lạnh trong một request và một transaction
+    # (ví dụ sau khi quét cả tủ lạnh trên ứng dụng di động).
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        serializer = PantryBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = {item['ingredient']: item['quantity'] for item in serializer.validated_data['items']}
+        replace = serializer.validated_data['replace']
+        user = request.user
+
+        with transaction.atomic():
+            existing = dict(PantryItems.objects.filter(user=user).values_list('ingredient_id', 'quantity'))
+            created = [ingredient_id for ingredient_id in items if ingredient_id not in existing]
+            updated = [ingredient_id for ingredient_id in items if ingredient_id in existing and existing[ingredient_id] != items[ingredient_id]]
+            unchanged = [ingredient_id for ingredient_id in items if ingredient_id in existing and existing[ingredient_id] == items[ingredient_id]]
+            removed = [ingredient_id for ingredient_id in existing if ingredient_id not in items] if replace else []
+
+            if created or updated:
+                PantryItems.objects.bulk_create(
+                    [
+                        PantryItems(user=user, ingredient_id=ingredient_id, quantity=items[ingredient_id], **quantity_fields(items[ingredient_id]))
+                        for ingredient_id in created + updated
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['user', 'ingredient'],
+                    update_fields=['quantity', 'amount', 'base_unit'],
+                )
+            if removed:
+                PantryItems.objects.filter(user=user, ingredient_id__in=removed).delete()
+            # bulk_create không phát post_save: tự báo thay đổi và ghi nhật ký đồng bộ
+            if created or updated:
+                pantry_changed.send(sender=PantryItems, user_ids=[user.id])
+                changed = dict(PantryItems.objects.filter(user=user, ingredient_id__in=created + updated).values_list('ingredient_id', 'id'))
+                record_changes(Entity.PANTRY, [changed[ingredient_id] for ingredient_id in created if ingredient_id in changed], user.id, Action.CREATED)
+                record_changes(Entity.PANTRY, [changed[ingredient_id] for ingredient_id in updated if ingredient_id in changed], user.id, Action.UPDATED)
+
+        return Response({
+            'created': created,
+            'updated': updated,
+            'removed': removed,
+            'unchanged': unchanged,
+        }, status=status.HTTP_200_OK)
+
+class PantryDetailView(MetricsMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PantryItemWriteSerializer
     permission_classes = [IsAuthenticated]
     def get_queryset(self):
         return PantryItems.objects.filter(user=self.request.user)
 
-class SuggestionView(generics.ListAPIView):
+# --- CÁC BƯỚC CỦA CÔNG CỤ ĐỀ XUẤT (dùng chung cho SuggestionView và api/async_views.py) ---
+def pantry_ingredient_ids_query(user):
+    return PantryItems.objects.filter(user=user, ingredient_id__isnull=False).values_list('ingredient_id', flat=True)
+
+def favorite_author_ids_query(user):
+    return FavoriteRecipes.objects.filter(user=user).values_list('recipe__author_id', flat=True).distinct()
+
+def suggestible_recipes(user):
+    # Như suggestion_engine: công thức công khai và công thức của chính người dùng. Danh sách tính
+    # sẵn có thể cũ vài giây, nên lọc lại khi nạp để không lộ công thức vừa chuyển sang riêng tư
+    return Recipes.objects.filter(Q(status=Recipes.Status.PUBLIC) | Q(author=user))
+
+def parse_excluded_ingredient_ids(query_params):
+    # TÍNH NĂNG TẦNG 4: Lấy "DANH SÁCH ĐEN" từ frontend
+    return [int(value) for value in query_params.getlist('exclude') if value.isdigit()]
+
+def rank_suggestions(user_id, mode, pantry_ingredient_ids, favorite_author_ids, excluded_ingredient_ids):
+    # TÍNH NĂNG TẦNG 2: Chấm điểm bằng chỉ mục đảo trong bộ nhớ (xem api/suggestion_engine.py),
+    # nhớ kết quả theo người dùng cho tới khi tủ lạnh, yêu thích hoặc catalog đổi
+    mode = MODE_STRICT if mode == 'strict' else MODE_FLEXIBLE
+    if not pantry_ingredient_ids and mode == MODE_STRICT:
+        return ()
+    key = (
+        user_id,
+        mode,
+        tuple(sorted(set(excluded_ingredient_ids))),
+        fingerprint(pantry_ingredient_ids),
+        fingerprint(favorite_author_ids),
+        suggestion_index.current_version(),
+    )
+    return suggestion_cache.get_or_compute(key, lambda: suggestion_index.suggest(
+        user_id,
+        pantry_ingredient_ids,
+        favorite_author_ids=favorite_author_ids,
+        excluded_ingredient_ids=excluded_ingredient_ids,
+        mode=mode,
+    ))
+
+class SuggestionView(MetricsMixin, CompactListMixin, generics.ListAPIView):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticated]
+    compact_heavy_fields = ('instructions',)
+    # Phân trang keyset trên (score, id) của danh sách đã xếp hạng
+    pagination_class = RankedKeysetPagination
 
-    def get_queryset(self):
+    def get_ranked(self, precomputed=True):
         user = self.request.user
         mode = self.request.query_params.get('mode', 'strict')
-        pantry_ingredient_ids = list(PantryItems.objects.filter(user=user).values_list('ingredient_id', flat=True))
+        excluded_ingredient_ids = parse_excluded_ingredient_ids(self.request.query_params)
+
+        # Kết quả do suggestion_worker tính sẵn (api/suggestion_worker.py), nếu còn dùng được.
+        # Danh sách đen thay đổi theo từng request nên luôn tính đồng bộ.
+        self.precomputed_truncated = False
+        if precomputed and not excluded_ingredient_ids:
+            result = load_precomputed(user.id, mode)
+            if result is not None:
+                ranked, self.precomputed_truncated = result
+                return ranked
+
+        pantry_ingredient_ids = list(pantry_ingredient_ids_query(user))
 
         if not pantry_ingredient_ids and mode == 'strict':
-            return Recipes.objects.none()
-            
-        # TÍNH NĂNG TẦNG 4: Lấy "DANH SÁCH ĐEN" từ frontend
-        excluded_ingredient_ids = self.request.query_params.getlist('exclude')
+            return []
 
         # TÍNH NĂNG TẦNG 3: Logic Điểm Thiện cảm
-        favorite_author_ids = list(FavoriteRecipes.objects.filter(user=user).values_list('recipe__author_id', flat=True).distinct())
-
-        # TÍNH NĂNG TẦNG 2: Logic Điểm Phạt
-        WEIGHTS = {
-            Ingredients.Category.PROTEIN: 100,
-            Ingredients.Category.CARB: 80,
-            Ingredients.Category.VEGETABLE: 50,
-            Ingredients.Category.SPICE: 10,
-            Ingredients.Category.OTHER: 25,
-        }
-        when_expressions = [When(ingredients__ingredient__category=cat, then=Value(weight)) for cat, weight in WEIGHTS.items()]
+        favorite_author_ids = list(favorite_author_ids_query(user))
 
-        # BƯỚC 1: Mở rộng phạm vi tìm kiếm (public HOẶC của mình)
-        searchable_recipes = Recipes.objects.filter(Q(status='public') | Q(author=user)).distinct()
+        return rank_suggestions(user.id, mode, pantry_ingredient_ids, favorite_author_ids, excluded_ingredient_ids)
 
-        # BƯỚC 2: "BỘ LỌC KIÊNG CỮ"
-        # Áp dụng "DANH SÁCH ĐEN" ngay từ đầu.
-        if excluded_ingredient_ids:
-            searchable_recipes = searchable_recipes.exclude(
-                ingredients__ingredient_id__in=excluded_ingredient_ids
-            )
+    def load_recipes(self, ranked):
+        # Nạp các công thức theo đúng thứ tự xếp hạng, chỉ các cột serializer cần
+        recipes = suggestible_recipes(self.request.user).only(*self.get_compact_columns()).in_bulk([recipe_id for recipe_id, _ in ranked])
+        results = []
+        for recipe_id, score in ranked:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.score = score
+                results.append(recipe)
+        return results
 
-        # BƯỚC 3: "CHIẾN LƯỢC CHIA ĐỂ TRỊ" (Sửa lỗi FieldError)
-        # 3a. Annotate từng thành phần điểm số một cách riêng lẻ
-        recipes_with_components = searchable_recipes.annotate(
-            match_count=Count('ingredients', filter=Q(ingredients__ingredient_id__in=pantry_ingredient_ids) & ~Q(ingredients__ingredient__category=Ingredients.Category.STAPLE)),
-            missing_penalty_score=Sum(
-                Case(*when_expressions, default=Value(25.0), output_field=FloatField()),
-                filter=~Q(ingredients__ingredient_id__in=pantry_ingredient_ids) & ~Q(ingredients__ingredient__category=Ingredients.Category.STAPLE),
-                default=Value(0.0)
-            ),
-            author_bonus=Case(
-                When(author_id__in=favorite_author_ids, then=Value(50.0)),
-                default=Value(0.0),
-                output_field=FloatField()
-            ),
-            missing_count=Count('ingredients', filter=~Q(ingredients__ingredient_id__in=pantry_ingredient_ids) & ~Q(ingredients__ingredient__category=Ingredients.Category.STAPLE))
-        )
+    def get_queryset(self):
+        return self.load_recipes(self.get_ranked())
 
-        # 3b. Dùng một annotate cuối cùng, đơn giản, chỉ để tính toán
-        recipes_with_final_score = recipes_with_components.annotate(
-            score=(
-                (F('match_count') * Value(20.0)) - F('missing_penalty_score') + F('author_bonus')
-            )
-        )
-        
-        # BƯỚC 4: Lọc theo chế độ
-        if mode == 'strict':
-            final_recipes = recipes_with_final_score.filter(missing_count=0)
-        else:
-            final_recipes = recipes_with_final_score.filter(missing_count__lte=2, score__gte=0)
+    def list(self, request, *args, **kwargs):
+        # Chỉ nạp các công thức của trang hiện tại
+        ranked = self.get_ranked()
+        page = self.paginate_queryset(ranked)
+        if page is not None and self.precomputed_truncated and not self.paginator.has_next:
+            # Đã tới cuối phần được lưu sẵn: tính đầy đủ để không cắt cụt danh sách
+            ranked = self.get_ranked(precomputed=False)
+            page = self.paginate_queryset(ranked)
+        if page is not None:
+            serializer = self.get_serializer(self.load_recipes(page), many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(self.load_recipes(ranked), many=True)
+        return Response(serializer.data)
+
+class SuggestionCacheStatsView(APIView):
+    # Số lần trúng/trượt của cache đề xuất trong tiến trình hiện tại, dùng để chọn SUGGESTION_CACHE_SIZE
+    permission_classes = [IsAdminUser]
+    def get(self, request, format=None):
+        return Response(suggestion_cache.stats())
 
-        return final_recipes.order_by('-score')
+class RequestStatsView(APIView):
+    # Histogram thời gian, thời gian CSDL, số câu SQL và dấu hiệu N+1 theo route (api/metrics.py)
+    permission_classes = [IsAdminOrMetricsToken]
+    def get(self, request, format=None):
+        return Response(metrics_registry.snapshot())
+
+class PrometheusMetricsView(APIView):
+    # Cùng số liệu ở định dạng text của Prometheus
+    permission_classes = [IsAdminOrMetricsToken]
+    def get(self, request, format=None):
+        return HttpResponse(metrics_registry.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 # --- CÁC VIEW CÒN LẠI (giữ nguyên) ---
 # ... (FavoriteToggleView, FavoriteListView, ShoppingListView, ShoppingListDetailView)
@@ -276,24 +407,217 @@ class FavoriteToggleView(APIView):
         except Exception as e:
             return Response({'error': 'Đã có lỗi xảy ra khi xóa khỏi danh sách yêu thích.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class FavoriteListView(generics.ListAPIView):
+class FavoriteListView(MetricsMixin, CompactListMixin, generics.ListAPIView):
     serializer_class = RecipeSerializer
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
+    compact_heavy_fields = ('instructions',)
+    compact_extra_columns = ('created_at',)
     def get_queryset(self):
         user = self.request.user
         favorite_recipe_ids = FavoriteRecipes.objects.filter(user=user).values_list('recipe_id', flat=True)
         return Recipes.objects.filter(id__in=favorite_recipe_ids)
 
-class ShoppingListView(generics.ListCreateAPIView):
+class ShoppingListView(MetricsMixin, QueryShapingMixin, generics.ListCreateAPIView):
     serializer_class = ShoppingListItemSerializer
     permission_classes = [IsAuthenticated]
+    select_related_fields = ['ingredient']
     def get_queryset(self):
         return ShoppingListItems.objects.filter(user=self.request.user)
     def perform_create(self, serializer):
         serializer.save(user=self.request.user, is_checked=False)
 
-class ShoppingListDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ShoppingListDetailView(MetricsMixin, QueryShapingMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ShoppingListItemSerializer
     permission_classes = [IsAuthenticated]
+    select_related_fields = ['ingredient']
     def get_queryset(self):
         return ShoppingListItems.objects.filter(user=self.request.user)
+
+def merge_quantities(quantities, max_length=100):
+    # Gộp lượng cần của một nguyên liệu từ nhiều công thức: "300 g + 2 quả" (bỏ trùng, giữ thứ tự)
+    parts = []
+    for quantity, unit in quantities:
+        text = ' '.join(part for part in (quantity or '', unit or '') if part).strip()
+        if text and text not in parts:
+            parts.append(text)
+    return ' + '.join(parts)[:max_length] or None
+
+class ShoppingListGenerateView(APIView):
+    # Tạo danh sách mua sắm từ kế hoạch nấu: {"recipe_ids": [1, 2, 3]}.
+    # Lấy hợp các nguyên liệu của những công thức này (bỏ STAPLE), trừ đi những gì đã có trong
+    # tủ lạnh, rồi gộp vào danh sách hiện tại bằng một lần bulk upsert:
+    #   - chưa có trong danh sách: thêm mới;
+    #   - có nhưng đã đánh dấu mua: bỏ đánh dấu và cập nhật lượng cần;
+    #   - có và chưa mua: giữ nguyên (gọi lại với cùng kế hoạch không nhân đôi số lượng).
+    # Lượng cần được cộng bằng SUM(amount) trong CSDL khi mọi dòng của nguyên liệu cùng một đơn
+    # vị chuẩn (xem api/quantities.py): "300g" + "0,5 kg" -> "800 g". Nếu tủ lạnh ghi lượng cùng
+    # đơn vị mà chưa đủ thì chỉ mua phần còn thiếu. Lượng không đọc được hoặc khác đơn vị thì
+    # ghép chữ như cũ ("300 g + 2 quả").
+    # Số truy vấn cố định, không phụ thuộc số công thức.
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, format=None):
+        serializer = ShoppingListGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipe_ids']
+        user = request.user
+
+        visible_ids = set(
+            Recipes.objects.filter(Q(status='public') | Q(author=user), id__in=recipe_ids).values_list('id', flat=True)
+        )
+        missing_ids = [recipe_id for recipe_id in recipe_ids if recipe_id not in visible_ids]
+        if missing_ids:
+            return Response({'recipe_ids': [f'Công thức không tồn tại: {missing_ids}']}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = (
+            RecipeIngredients.objects.filter(recipe_id__in=recipe_ids)
+            .exclude(ingredient__category=Ingredients.Category.STAPLE)
+        )
+        # Một dòng cho mỗi (nguyên liệu, đơn vị chuẩn); nguyên liệu chỉ có một nhóm đã đọc được hết thì cộng được
+        groups = {}
+        for ingredient_id, base_unit, total, count, parsed in (
+            rows.values_list('ingredient_id', 'base_unit')
+            .annotate(total=Sum('amount'), count=Count('id'), parsed=Count('amount'))
+            .order_by('ingredient_id')
+            .values_list('ingredient_id', 'base_unit', 'total', 'count', 'parsed')
+        ):
+            groups.setdefault(ingredient_id, []).append((base_unit, total, count == parsed))
+        needed = {
+            ingredient_id: (group[0][1], group[0][0]) if len(group) == 1 and group[0][2] else None
+            for ingredient_id, group in groups.items()
+        }
+        texts = {}
+        unsummed = [ingredient_id for ingredient_id, total in needed.items() if total is None]
+        if unsummed:
+            for ingredient_id, quantity, unit in (
+                rows.filter(ingredient_id__in=unsummed).order_by('recipe_id', 'id').values_list('ingredient_id', 'quantity', 'unit')
+            ):
+                texts.setdefault(ingredient_id, []).append((quantity, unit))
+
+        with transaction.atomic():
+            in_pantry = set()
+            for ingredient_id, amount, base_unit in PantryItems.objects.filter(user=user, ingredient_id__in=list(needed)).values_list('ingredient_id', 'amount', 'base_unit'):
+                total = needed[ingredient_id]
+                if total is not None and amount is not None and base_unit == total[1] and amount < total[0]:
+                    needed[ingredient_id] = (total[0] - amount, base_unit)
+                else:
+                    in_pantry.add(ingredient_id)
+            to_buy = [ingredient_id for ingredient_id in needed if ingredient_id not in in_pantry]
+            existing = {
+                ingredient_id: is_checked
+                for ingredient_id, is_checked in ShoppingListItems.objects.filter(user=user, ingredient_id__in=to_buy).values_list('ingredient_id', 'is_checked')
+            }
+            created = [ingredient_id for ingredient_id in to_buy if ingredient_id not in existing]
+            updated = [ingredient_id for ingredient_id in to_buy if existing.get(ingredient_id)]
+            unchanged = [ingredient_id for ingredient_id in to_buy if ingredient_id in existing and not existing[ingredient_id]]
+
+            if created or updated:
+                new_items = []
+                for ingredient_id in created + updated:
+                    if needed[ingredient_id] is None:
+                        quantity = merge_quantities(texts[ingredient_id])
+                        fields = quantity_fields(quantity)
+                    else:
+                        amount, base_unit = needed[ingredient_id]
+                        quantity = format_amount(amount, base_unit)
+                        fields = {'amount': amount, 'base_unit': base_unit}
+                    new_items.append(ShoppingListItems(user=user, ingredient_id=ingredient_id, quantity=quantity, is_checked=False, **fields))
+                ShoppingListItems.objects.bulk_create(
+                    new_items,
+                    update_conflicts=True,
+                    unique_fields=['user', 'ingredient'],
+                    update_fields=['quantity', 'amount', 'base_unit', 'is_checked'],
+                )
+            items = list(ShoppingListItems.objects.filter(user=user, ingredient_id__in=to_buy).select_related('ingredient').order_by('id'))
+            # bulk_create không phát post_save: tự ghi nhật ký đồng bộ
+            item_ids = {item.ingredient_id: item.id for item in items}
+            record_changes(Entity.SHOPPING_LIST, [item_ids[ingredient_id] for ingredient_id in created if ingredient_id in item_ids], user.id, Action.CREATED)
+            record_changes(Entity.SHOPPING_LIST, [item_ids[ingredient_id] for ingredient_id in updated if ingredient_id in item_ids], user.id, Action.UPDATED)
+
+        return Response({
+            'created': created,
+            'updated': updated,
+            'unchanged': unchanged,
+            'in_pantry': sorted(in_pantry),
+            'items': ShoppingListItemSerializer(items, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+# --- XUẤT DỮ LIỆU DẠNG LUỒNG ---
+# ?format=json (mặc định) hoặc ?format=ndjson, ?updated_since=<ISO 8601>; nén gzip nếu client
+# gửi Accept-Encoding: gzip. Dữ liệu được đọc theo khối và ghi dần ra phản hồi (xem api/exports.py).
+class RecipeExportView(APIView):
+    # Toàn bộ công thức công khai kèm nguyên liệu, theo id tăng dần
+    permission_classes = [AllowAny]
+    renderer_classes = [FastJSONRenderer, NDJSONRenderer]
+
+    def get(self, request, format=None):
+        queryset = Recipes.objects.filter(status='public').select_related('author').prefetch_related(RECIPE_INGREDIENTS_PREFETCH).order_by('id')
+        updated_since = parse_updated_since(request)
+        if updated_since is not None:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+        rows = serialized_rows(RecipeExportSerializer, queryset, {'request': request})
+        return streaming_export(request, [('recipes', rows)], 'recipes')
+
+class UserDataExportView(APIView):
+    # Toàn bộ dữ liệu của người dùng hiện tại: công thức của họ, tủ lạnh, yêu thích, danh sách mua sắm.
+    # updated_since lọc công thức theo updated_at và yêu thích theo created_at; tủ lạnh và
+    # danh sách mua sắm không có cột thời gian nên luôn được xuất đầy đủ.
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, NDJSONRenderer]
+
+    def get(self, request, format=None):
+        user = request.user
+        updated_since = parse_updated_since(request)
+        recipes = Recipes.objects.filter(author=user).select_related('author').prefetch_related(RECIPE_INGREDIENTS_PREFETCH).order_by('id')
+        favorites = FavoriteRecipes.objects.filter(user=user).select_related('recipe').order_by('id')
+        if updated_since is not None:
+            recipes = recipes.filter(updated_at__gte=updated_since)
+            favorites = favorites.filter(created_at__gte=updated_since)
+        context = {'request': request}
+        sections = [
+            ('recipes', serialized_rows(RecipeExportSerializer, recipes, context)),
+            ('pantry', serialized_rows(PantryItemReadSerializer, PantryItems.objects.filter(user=user).select_related('ingredient').order_by('id'), context)),
+            ('favorites', serialized_rows(FavoriteExportSerializer, favorites, context)),
+            ('shopping_list', serialized_rows(ShoppingListItemSerializer, ShoppingListItems.objects.filter(user=user).select_related('ingredient').order_by('id'), context)),
+        ]
+        return streaming_export(request, sections, f'user-{user.id}')
+
+# --- ĐỒNG BỘ TĂNG DẦN ---
+class SyncView(APIView):
+    # Thay đổi kể từ ?cursor= (xem api/sync.py): nguyên liệu và công thức công khai cho mọi người,
+    # thêm tủ lạnh, danh sách mua sắm và yêu thích khi đã đăng nhập.
+    # has_more=true thì gọi tiếp ngay với cursor mới.
+    permission_classes = [AllowAny]
+
+    def get(self, request, format=None):
+        return Response(collect_changes(request.user, parse_cursor(request)), status=status.HTTP_200_OK)
+
+# --- NHẬP CATALOG HÀNG LOẠT ---
+class CatalogImportView(APIView):
+    # Quản trị viên tải lên file CSV/NDJSON (trường "file"); xem định dạng trong api/catalog_import.py.
+    # Gửi lại đúng file đó sau khi bị ngắt sẽ tiếp tục từ lô chưa hoàn tất.
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, format=None):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': ['Cần tải lên file CSV hoặc NDJSON.']}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.data.get('format') or detect_format(upload.name)
+        if import_format not in FORMATS:
+            return Response({'format': ['Định dạng phải là csv hoặc ndjson.']}, status=status.HTTP_400_BAD_REQUEST)
+        recipe_status = request.data.get('status') or Recipes.Status.PUBLIC
+        if recipe_status not in Recipes.Status.values:
+            return Response({'status': [f'Trạng thái không hợp lệ: {recipe_status}']}, status=status.HTTP_400_BAD_REQUEST)
+        batch_size = request.data.get('batch_size', '')
+        batch_size = int(batch_size) if str(batch_size).isdigit() and int(batch_size) > 0 else DEFAULT_BATCH_SIZE
+
+        report = import_catalog(
+            upload.file, import_format, request.user,
+            source_name=upload.name,
+            status=recipe_status,
+            batch_size=batch_size,
+            restart=str(request.data.get('restart', '')).lower() in ('1', 'true'),
+        )
+        return Response(report, status=status.HTTP_200_OK)
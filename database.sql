@@ -135,6 +135,8 @@ CREATE TABLE IF NOT EXISTS public.pantry_items
     ingredient_id integer NOT NULL,
     quantity character varying(100) COLLATE pg_catalog."default",
     created_at timestamp with time zone DEFAULT now(),
+    amount numeric(12, 3),
+    base_unit character varying(20) COLLATE pg_catalog."default",
     CONSTRAINT pantry_items_pkey PRIMARY KEY (id),
     CONSTRAINT pantry_items_user_id_ingredient_id_key UNIQUE (user_id, ingredient_id)
 );
@@ -146,6 +148,8 @@ CREATE TABLE IF NOT EXISTS public.recipe_ingredients
     ingredient_id integer NOT NULL,
     quantity character varying(100) COLLATE pg_catalog."default" NOT NULL,
     unit character varying(50) COLLATE pg_catalog."default",
+    amount numeric(12, 3),
+    base_unit character varying(20) COLLATE pg_catalog."default",
     CONSTRAINT recipe_ingredients_pkey PRIMARY KEY (id),
     CONSTRAINT recipe_ingredients_recipe_id_ingredient_id_key UNIQUE (recipe_id, ingredient_id)
 );
@@ -173,6 +177,8 @@ CREATE TABLE IF NOT EXISTS public.shopping_list_items
     is_checked boolean DEFAULT false,
     created_at timestamp with time zone DEFAULT now(),
     quantity character varying(100) COLLATE pg_catalog."default",
+    amount numeric(12, 3),
+    base_unit character varying(20) COLLATE pg_catalog."default",
     CONSTRAINT shopping_list_items_pkey PRIMARY KEY (id),
     CONSTRAINT shopping_list_items_user_id_ingredient_id_key UNIQUE (user_id, ingredient_id)
 );